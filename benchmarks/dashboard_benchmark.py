@@ -0,0 +1,85 @@
+"""
+Benchmark of the stacked nutrient charts on synthetic plans.
+
+Reports the build time, the time plotly needs to serialize the figure and
+the size of the JSON payload sent to the browser, which dominates the
+render time in the browser.
+
+Run from the repository root:
+    python -m benchmarks.dashboard_benchmark --foods 10 50 200 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.visualization.dashboard import (
+    DEFAULT_MAX_STACKED_FOODS,
+    MACRONUTRIENT_CATEGORIES,
+    MICRONUTRIENT_CATEGORIES,
+    create_absolute_stacked_macronutrient_figure,
+    create_normalized_stacked_micronutrient_figure,
+)
+
+
+def create_synthetic_contributions(n_foods, seed=0):
+    # Shaped like the result of aggregate_nutrient_contributions
+    rng = np.random.default_rng(seed)
+    macros = [n for category in MACRONUTRIENT_CATEGORIES.values() for n in category]
+    micros = [n for category in MICRONUTRIENT_CATEGORIES.values() for n in category]
+
+    macro_abs = pd.DataFrame(rng.exponential(10, (n_foods, len(macros))), columns=macros)
+    micro_abs = pd.DataFrame(rng.exponential(5, (n_foods, len(micros))), columns=micros)
+    micro_norm = pd.DataFrame(rng.exponential(200 / n_foods, (n_foods, len(micros))), columns=micros)
+    return {
+        "food_names": [f"Food {i}" for i in range(n_foods)],
+        "macro_abs": macro_abs,
+        "micro_abs": micro_abs,
+        "micro_norm": micro_norm,
+        "macro_abs_total": macro_abs.sum(),
+        "micro_abs_total": micro_abs.sum(),
+        "micro_norm_total": micro_norm.sum(),
+    }
+
+
+def benchmark_stacked_figures(n_foods, max_foods):
+    contributions = create_synthetic_contributions(n_foods)
+
+    start = time.perf_counter()
+    figures = [
+        create_absolute_stacked_macronutrient_figure(contributions, max_foods=max_foods),
+        create_normalized_stacked_micronutrient_figure(contributions, max_foods=max_foods),
+    ]
+    built = time.perf_counter()
+    payload = [fig.to_json() for fig in figures]
+    serialized = time.perf_counter()
+
+    return {
+        "foods": n_foods,
+        "traces": sum(len(fig.data) for fig in figures),
+        "build_seconds": built - start,
+        "json_seconds": serialized - built,
+        "json_kib": sum(len(data) for data in payload) / 2**10,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--foods", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--max_foods", type=int, default=DEFAULT_MAX_STACKED_FOODS)
+    args = parser.parse_args()
+
+    print(
+        f"{'foods':>6} {'grouped':>8} {'traces':>7} {'build s':>8} "
+        f"{'json s':>7} {'json KiB':>9}"
+    )
+    for n_foods in args.foods:
+        for max_foods in [None, args.max_foods]:
+            result = benchmark_stacked_figures(n_foods, max_foods)
+            print(
+                f"{result['foods']:>6} {str(max_foods is not None):>8} "
+                f"{result['traces']:>7} {result['build_seconds']:>8.3f} "
+                f"{result['json_seconds']:>7.3f} {result['json_kib']:>9.0f}"
+            )
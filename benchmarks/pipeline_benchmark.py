@@ -0,0 +1,490 @@
+"""
+End-to-end benchmark of the mealplan pipeline, with a baseline gate.
+
+Every stage from loading the catalog to the workbooks is timed in the order
+the Mealplan Generator runs them, on the shipped catalog and on synthetic
+catalogs resampled from it. The image downloads are answered with synthetic
+images of their url, so the benchmark never hits the network. The mealplan
+table starts from an empty thumbnail cache on every repeat, the shopping list
+export finds the thumbnails cached like in the app.
+
+The timings depend on the machine, so the baselines are recorded on the
+machine the benchmark is compared on and are not committed:
+    python -m benchmarks.pipeline_benchmark --save_baseline
+
+Later runs are compared against them and exit with an error if the median
+of a stage is slower than --max_ratio times its baseline, by more than the
+noise of the stage. Without a baseline the timings are only printed:
+    python -m benchmarks.pipeline_benchmark --max_ratio 1.5
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import requests
+import yaml
+
+from benchmarks.shopping_list_benchmark import create_synthetic_image, warm_image_cache
+from benchmarks.startup_benchmark import DEFERRED_MODULES
+from src.nutrition.formulas import calculate_nutrient_goals
+from src.nutrition.optimization import (
+    build_diet_model,
+    calculate_relative_nutrient_df,
+    create_absolute_optimization_results_summary,
+    create_normalized_optimization_results_summary,
+    save_optimization_results,
+)
+from src.nutrition.solver_telemetry import code_version, solve_with_statistics
+from src.service.optimization_worker import DEFAULT_PROFILE, load_catalog
+from src.sheets.export_jobs import build_mealplan_export, build_shopping_list_export
+from src.streamlit.mealplan_output import (
+    create_meaplan_from_optimizer_results,
+    merge_optimizer_results,
+)
+from src.visualization.dashboard import (
+    aggregate_nutrient_contributions,
+    create_absolute_stacked_macronutrient_figure,
+    create_absolute_summed_macronutrient_figure,
+    create_normalized_stacked_micronutrient_figure,
+    create_normalized_summed_micronutrient_figure,
+)
+
+DEFAULT_BASELINE_DIR = "benchmarks/baselines"
+DEFAULT_MAX_RATIO = 1.5
+# Slowdowns by less than this are noise and never fail the gate ...
+DEFAULT_MIN_SECONDS = 0.05
+# ... nor are slowdowns by less than this many times the spread of a stage
+DEFAULT_NOISE_SPREADS = 3
+
+
+class SyntheticImageAdapter(requests.adapters.BaseAdapter):
+    # Answers every request with the synthetic image of its url, so the
+    # downloads, thumbnails and cache writes run without the network
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response._content = create_synthetic_image(request.url)
+        return response
+
+    def close(self):
+        pass
+
+
+def create_synthetic_image_session():
+    session = requests.Session()
+    session.mount("http://", SyntheticImageAdapter())
+    session.mount("https://", SyntheticImageAdapter())
+    return session
+
+
+def create_synthetic_catalog(df, n_foods, seed=0):
+    # Foods of the shipped catalog resampled with scaled nutrients and prices,
+    # every food gets its own name as the results are merged on it
+    rng = np.random.default_rng(seed)
+    synthetic_df = df.iloc[rng.integers(0, len(df), n_foods)].reset_index(drop=True)
+    nutrients = [col for col in synthetic_df.columns if col[0] != "Non Nutrient Data"]
+    synthetic_df[nutrients] = synthetic_df[nutrients] * rng.lognormal(
+        0, 0.2, (n_foods, len(nutrients))
+    )
+    price = ("Non Nutrient Data", "Price per 100g")
+    synthetic_df[price] = synthetic_df[price] * rng.lognormal(0, 0.2, n_foods)
+    name = ("Non Nutrient Data", "FDC Name")
+    synthetic_df[name] = [
+        f"{food_name} ({food_idx})"
+        for food_idx, food_name in enumerate(synthetic_df[name])
+    ]
+    return synthetic_df
+
+
+def write_catalog(df, path):
+    # Same flat column names as data/nutrition_data.csv
+    flat_df = df.copy()
+    flat_df.columns = [".".join(col) for col in df.columns]
+    flat_df.to_csv(path, index=False)
+
+
+def import_deferred_modules():
+    # The app imports these at first use, they are loaded before the timings
+    # as their import time is measured by benchmarks.startup_benchmark
+    for module in DEFERRED_MODULES:
+        importlib.import_module(module)
+
+
+def time_stage(timings, stage, repeat, function, *args, setup=None, **kwargs):
+    # The seconds of all repeat calls are kept, the gate compares their
+    # median and spread. setup runs untimed before every call and returns
+    # further keyword arguments. The result of the last call is returned
+    seconds = []
+    for _ in range(repeat):
+        call_kwargs = dict(kwargs, **setup()) if setup is not None else kwargs
+        start = time.perf_counter()
+        result = function(*args, **call_kwargs)
+        seconds.append(time.perf_counter() - start)
+    timings[stage] = seconds
+    return result
+
+
+def run_pipeline(
+    data_path, configs, image_options, cold_cache_dir, repeat=5, time_limit=120
+):
+    """
+    Time every stage of the pipeline on the catalog at data_path with the
+    default profile of the Mealplan Generator page.
+
+    The solve runs once, it takes seconds and the stages after it need its
+    result. The default catalogs solve to optimality well within time_limit,
+    a solve stopped by it takes about time_limit and cannot regress. Every
+    other stage runs repeat times.
+
+    Parameters:
+    - image_options (dict): Passed to load_thumbnails, with a warm cache_dir
+      and the session the missing images are downloaded with.
+    - cold_cache_dir (str): Emptied before every repeat of the mealplan
+      table, which downloads and renders all of its images.
+
+    Returns:
+    - dict: The seconds of every repeat of every stage in pipeline order,
+      the solver status and the number of foods of the catalog and of the
+      plan.
+    """
+    import pulp as pl
+
+    timings = {}
+    profile = DEFAULT_PROFILE
+    unit_size = profile["optimization_unit_size"]
+
+    df = time_stage(timings, "load_catalog", repeat, load_catalog, data_path)
+    rdi_dict = calculate_nutrient_goals(
+        weight=profile["weight"],
+        height=profile["height"],
+        age=profile["age"],
+        calorie_adjustment=profile["calorie_adjustment"],
+        activity_scale=profile["activity_scale"],
+        gender=profile["gender"],
+    )
+    time_stage(
+        timings,
+        "relative_nutrient_df",
+        repeat,
+        calculate_relative_nutrient_df,
+        df,
+        rdi_dict,
+        unit_size,
+    )
+
+    # The two steps of optimize_diet, without its streamlit messages
+    model, relative_df, food_vars = time_stage(
+        timings,
+        "build_model",
+        repeat,
+        build_diet_model,
+        daily_food_budget=profile["daily_food_budget"],
+        cost_factor=profile["cost_factor"],
+        time_factor=profile["time_factor"],
+        insulin_factor=profile["insulin_factor"],
+        fullness_factor=profile["fullness_factor"],
+        df=df,
+        rdi_dict=rdi_dict,
+        food_constraints=profile["food_constraints"],
+        optimization_unit_size=unit_size,
+        macro_tolerance=profile["macro_tolerance"],
+        micro_tolerance=profile["micro_tolerance"],
+    )
+    time_stage(timings, "solve", 1, solve_with_statistics, model, time_limit)
+    status = pl.LpStatus[model.status]
+    if status != "Optimal":
+        raise RuntimeError(
+            f"The benchmark model of {data_path} is {status}, "
+            "raise the time limit or use a smaller synthetic catalog"
+        )
+
+    normalized_results_df, _, _ = time_stage(
+        timings,
+        "normalized_summary",
+        repeat,
+        create_normalized_optimization_results_summary,
+        relative_df,
+        rdi_dict,
+        food_vars,
+    )
+    absolute_results_df = time_stage(
+        timings,
+        "absolute_summary",
+        repeat,
+        create_absolute_optimization_results_summary,
+        df,
+        rdi_dict,
+        food_vars,
+        unit_size,
+    )
+    flat_normalized_df = save_optimization_results(None, normalized_results_df)
+    flat_absolute_df = save_optimization_results(None, absolute_results_df)
+
+    merged_df = time_stage(
+        timings,
+        "merge_results",
+        repeat,
+        merge_optimizer_results,
+        df,
+        flat_normalized_df,
+        unit_size,
+        directory=None,
+    )
+
+    def empty_cold_cache():
+        shutil.rmtree(cold_cache_dir, ignore_errors=True)
+        return {"image_options": dict(image_options, cache_dir=cold_cache_dir)}
+
+    time_stage(
+        timings,
+        "mealplan_table",
+        repeat,
+        create_meaplan_from_optimizer_results,
+        df,
+        flat_normalized_df,
+        unit_size,
+        directory=None,
+        streamlit_mealplan_columns=configs["app"]["streamlit_mealplan_columns"],
+        setup=empty_cold_cache,
+        merged_df=merged_df,
+    )
+
+    contributions = time_stage(
+        timings,
+        "nutrient_contributions",
+        repeat,
+        aggregate_nutrient_contributions,
+        flat_absolute_df,
+        flat_normalized_df,
+    )
+    for build_figure in [
+        create_absolute_summed_macronutrient_figure,
+        create_absolute_stacked_macronutrient_figure,
+        create_normalized_summed_micronutrient_figure,
+        create_normalized_stacked_micronutrient_figure,
+    ]:
+        stage = build_figure.__name__[len("create_") :]
+        time_stage(timings, stage, repeat, build_figure, contributions)
+
+    spreadsheet_config = configs["spreadsheet"]
+    time_stage(
+        timings,
+        "mealplan_export",
+        repeat,
+        build_mealplan_export,
+        merged_df,
+        spreadsheet_columns=spreadsheet_config["columns"],
+        output_path=None,
+        meal_targets=spreadsheet_config["meal_targets"],
+        meal_compatibility=spreadsheet_config["meal_compatibility"],
+        portions=spreadsheet_config["meal_portions"],
+    )
+    time_stage(
+        timings,
+        "shopping_list_export",
+        repeat,
+        build_shopping_list_export,
+        merged_df,
+        shopping_list_columns=configs["shopping"]["columns"],
+        output_path=None,
+        image_options=image_options,
+        weeks=configs["shopping"]["weeks"],
+        start_date=datetime(2024, 1, 1),
+    )
+
+    return {
+        "stages": timings,
+        "solver_status": pl.LpSolution[model.sol_status],
+        "foods": len(df),
+        "plan_foods": len(merged_df),
+    }
+
+
+def baseline_path(baseline_dir, catalog):
+    return os.path.join(baseline_dir, f"{catalog}.json")
+
+
+def save_baseline(path, catalog, result, time_limit):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    baseline = {
+        "catalog": catalog,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "code_version": code_version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time_limit": time_limit,
+        **result,
+    }
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2)
+        file.write("\n")
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def spread(seconds):
+    return max(seconds) - min(seconds) if seconds else 0
+
+
+def compare_to_baseline(
+    stages,
+    baseline_stages,
+    max_ratio=DEFAULT_MAX_RATIO,
+    min_seconds=DEFAULT_MIN_SECONDS,
+    noise_spreads=DEFAULT_NOISE_SPREADS,
+):
+    """
+    Compare the stage timings of a run to those of its baseline.
+
+    Parameters:
+    - stages, baseline_stages (dict): The seconds of every repeat by stage.
+    - max_ratio (float): A stage regressed if its median is slower than this
+      many times the baseline median ...
+    - min_seconds (float): ... by more than these seconds ...
+    - noise_spreads (float): ... and by more than this many times the larger
+      spread of the repeats in the run and the baseline.
+
+    Returns:
+    - list: Dicts with the stage, its median seconds, the baseline median
+      (None for stages without a baseline), their ratio and if it regressed.
+    """
+    rows = []
+    for stage, seconds in stages.items():
+        baseline_seconds = baseline_stages.get(stage)
+        median = statistics.median(seconds)
+        baseline = statistics.median(baseline_seconds) if baseline_seconds else None
+        ratio = median / baseline if baseline else None
+        noise = max(min_seconds, noise_spreads * spread(seconds))
+        if baseline_seconds:
+            noise = max(noise, noise_spreads * spread(baseline_seconds))
+        rows.append(
+            {
+                "stage": stage,
+                "seconds": median,
+                "baseline": baseline,
+                "ratio": ratio,
+                "regressed": ratio is not None
+                and ratio > max_ratio
+                and median - baseline > noise,
+            }
+        )
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'stage':<42} {'ms':>10} {'baseline ms':>12} {'ratio':>7}"]
+    for row in rows:
+        baseline = "-" if row["baseline"] is None else f"{row['baseline'] * 1000:.1f}"
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}"
+        lines.append(
+            f"{row['stage']:<42} {row['seconds'] * 1000:>10.1f} {baseline:>12} "
+            f"{ratio:>7}" + ("  REGRESSED" if row["regressed"] else "")
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages.")
+    parser.add_argument("--data_path", type=str, default="data/nutrition_data.csv")
+    parser.add_argument(
+        "--synthetic_foods",
+        type=int,
+        nargs="*",
+        default=[500],
+        help="Sizes of the synthetic catalogs, none to only run the shipped one",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--time_limit", type=float, default=120, help="Seconds of every solve"
+    )
+    parser.add_argument("--baseline_dir", type=str, default=DEFAULT_BASELINE_DIR)
+    parser.add_argument(
+        "--save_baseline", action="store_true", help="Replace the baselines"
+    )
+    parser.add_argument("--max_ratio", type=float, default=DEFAULT_MAX_RATIO)
+    parser.add_argument("--min_seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument("--noise_spreads", type=float, default=DEFAULT_NOISE_SPREADS)
+    args = parser.parse_args()
+
+    configs = {}
+    for name, path in [
+        ("app", "config/app_config.yaml"),
+        ("spreadsheet", "config/spreadsheet_config.yaml"),
+        ("shopping", "config/shopping_list_config.yaml"),
+    ]:
+        with open(path, "r") as f:
+            configs[name] = yaml.safe_load(f)
+
+    import_deferred_modules()
+    regressions = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shipped_df = load_catalog(args.data_path)
+        catalogs = [("shipped", args.data_path)]
+        for n_foods in args.synthetic_foods:
+            path = os.path.join(temp_dir, f"synthetic_{n_foods}.csv")
+            write_catalog(create_synthetic_catalog(shipped_df, n_foods), path)
+            catalogs.append((f"synthetic_{n_foods}", path))
+
+        # The images of the shipped catalog, which the synthetic ones reuse,
+        # are cached for the shopping list export
+        image_options = {
+            "cache_dir": os.path.join(temp_dir, "images"),
+            "session": create_synthetic_image_session(),
+        }
+        warm_image_cache(
+            image_options["cache_dir"],
+            shipped_df[("Non Nutrient Data", "Image URL")].dropna(),
+        )
+
+        for catalog, path in catalogs:
+            result = run_pipeline(
+                path,
+                configs,
+                image_options,
+                os.path.join(temp_dir, "cold_images"),
+                repeat=args.repeat,
+                time_limit=args.time_limit,
+            )
+            print(
+                f"\n{catalog}: {result['foods']} foods, {result['plan_foods']} in "
+                f"the plan, {result['solver_status']}"
+            )
+            path = baseline_path(args.baseline_dir, catalog)
+            baseline = None if args.save_baseline else load_baseline(path)
+            rows = compare_to_baseline(
+                result["stages"],
+                baseline["stages"] if baseline else {},
+                max_ratio=args.max_ratio,
+                min_seconds=args.min_seconds,
+                noise_spreads=args.noise_spreads,
+            )
+            print(format_comparison(rows))
+            if args.save_baseline:
+                save_baseline(path, catalog, result, args.time_limit)
+                print(f"Saved the baseline {path}")
+            elif baseline is None:
+                print(f"No baseline {path}, record one with --save_baseline")
+            regressions.extend(
+                f"{catalog} {row['stage']}" for row in rows if row["regressed"]
+            )
+
+    if regressions:
+        print(f"\nRegressed beyond {args.max_ratio}x: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,105 @@
+"""
+Benchmark of the shopping list workbook export on synthetic plans.
+
+Run from the repository root:
+    python -m benchmarks.shopping_list_benchmark --items 100 1000 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import yaml
+from PIL import Image
+
+from src.images.cache import write_cached_thumbnails
+from src.images.thumbnails import create_thumbnails, url_hash
+from src.sheets.shoppinglist_spreadsheet import create_shopping_list_sheet
+
+
+def create_synthetic_shopping_plan(n_items, shopping_list_columns, seed=0):
+    # Flat column DataFrame shaped like output/merged/merged_optimization_result.csv
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "Non Nutrient Data.Image URL": [
+                f"https://example.invalid/{i % 500}.jpg" for i in range(n_items)
+            ],
+            "Shopping List.Product Name": [f"Food {i}" for i in range(n_items)],
+            "Shopping List.Optimal Weekly Quantity (g)": rng.integers(50, 3000, n_items),
+            "Shopping List.Product Package Weight (g)": rng.integers(100, 1000, n_items),
+            "Shopping List.Average Weekly Price (EUR)": rng.uniform(0.5, 20, n_items).round(2),
+        }
+    )
+    return df[shopping_list_columns]
+
+
+def create_synthetic_image(url, size=(600, 600)):
+    # Smooth random colors seeded by the url, every url gets its own image
+    rng = np.random.default_rng(int(url_hash(url)[:16], 16))
+    img = Image.fromarray(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8))
+    output = BytesIO()
+    img.resize(size, Image.BILINEAR).save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def warm_image_cache(cache_dir, urls):
+    # Every synthetic url is served from the cache with thumbnails of its own
+    # image, the benchmark never hits the network
+    for url in set(urls):
+        write_cached_thumbnails(
+            cache_dir, url, create_thumbnails(create_synthetic_image(url))
+        )
+
+
+def benchmark_shopping_list_export(n_items, shopping_list_columns, cache_dir):
+    df = create_synthetic_shopping_plan(n_items, shopping_list_columns)
+    warm_image_cache(cache_dir, df["Non Nutrient Data.Image URL"])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    wb_io = create_shopping_list_sheet(
+        df,
+        shopping_list_columns=shopping_list_columns,
+        output_path=None,
+        image_options={"cache_dir": cache_dir},
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": n_items,
+        "seconds": elapsed,
+        "peak_mib": peak / 2**20,
+        "size_kib": len(wb_io.getvalue()) / 2**10,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--shopping_config", type=str, default="config/shopping_list_config.yaml"
+    )
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    with open(args.shopping_config, "r") as f:
+        shopping_config = yaml.safe_load(f)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"{'items':>8} {'seconds':>9} {'peak MiB':>9} {'xlsx KiB':>9} {'ms/item':>8}")
+        for n_items in args.items:
+            result = benchmark_shopping_list_export(
+                n_items, shopping_config["columns"], os.path.join(cache_dir, "images")
+            )
+            print(
+                f"{result['items']:>8} {result['seconds']:>9.2f} "
+                f"{result['peak_mib']:>9.1f} {result['size_kib']:>9.0f} "
+                f"{1000 * result['seconds'] / result['items']:>8.3f}"
+            )
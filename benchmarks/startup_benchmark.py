@@ -0,0 +1,195 @@
+"""
+Import-time profile of the app startup path, with a budget.
+
+The modules app.py and the pages import at the top are imported in a fresh
+interpreter with -X importtime, after the modules streamlit itself loads
+before any page runs. Reports the slowest app imports and fails if the
+startup path exceeds the budget or loads a module that should only be
+imported at first use, e.g. plotly before a chart is shown.
+
+With --first_page the first run of every script is timed in a fresh
+interpreter, like the first session of a new replica.
+
+Run from the repository root:
+    python -m benchmarks.startup_benchmark --budget_ms 100 --first_page
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+
+STARTUP_SCRIPTS = [
+    "app.py",
+    "pages/Mealplan Generator.py",
+    "pages/Catalog Explorer.py",
+    "pages/Solver Telemetry.py",
+]
+# Loaded by the streamlit server before any page runs, not part of the budget
+BASELINE_MODULES = ["streamlit", "pandas", "numpy", "yaml"]
+# Heavy modules the startup path must not load, they are imported where a
+# chart, an export, an image or a solve needs them
+DEFERRED_MODULES = [
+    "plotly.express",
+    "plotly.subplots",
+    "openpyxl",
+    "PIL.Image",
+    "requests",
+    "pulp",
+]
+DEFAULT_BUDGET_MS = 100
+START_MARKER = "startup imports"
+
+
+def startup_imports(scripts):
+    """
+    Returns:
+    - list: The source of every import statement at the top level of the
+      scripts, in order and without duplicates.
+    """
+    statements = []
+    for script in scripts:
+        with open(script, "r") as file:
+            source = file.read()
+        for node in ast.parse(source).body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statement = ast.get_source_segment(source, node)
+                if statement not in statements:
+                    statements.append(statement)
+    return statements
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time: self [us] | cumulative | package",
+    # the nesting of the package name shows which import triggered it
+    modules = []
+    started = False
+    for line in stderr.splitlines():
+        if START_MARKER in line:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return modules
+
+
+def profile_startup(statements):
+    """
+    Import the statements in a fresh interpreter.
+
+    Returns:
+    - dict: The wall time of the imports, the -X importtime entries of the
+      modules they loaded and the deferred modules that were loaded.
+    """
+    code = "\n".join(
+        [
+            "import json, sys, time",
+            *[f"import {module}" for module in BASELINE_MODULES],
+            f"print({START_MARKER!r}, file=sys.stderr, flush=True)",
+            "start = time.perf_counter()",
+            *statements,
+            "seconds = time.perf_counter() - start",
+            f"loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]",
+            "print(json.dumps({'seconds': seconds, 'loaded': loaded}))",
+        ]
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result["modules"] = parse_importtime(process.stderr)
+    return result
+
+
+def run_first_page(script, data_path, timeout=120):
+    # Runs in the fresh interpreter of time_first_page, the pages get the
+    # catalog that app.py would have loaded into the session state
+    import time
+
+    import pandas as pd
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(script, default_timeout=timeout)
+    if script != "app.py":
+        df = pd.read_csv(data_path)
+        df.columns = pd.MultiIndex.from_tuples([tuple(c.split(".")) for c in df.columns])
+        at.session_state["data"] = df
+    start = time.perf_counter()
+    at.run()
+    print(time.perf_counter() - start)
+
+
+def time_first_page(script, data_path):
+    """
+    Returns:
+    - float: Seconds of the first run of the script in a fresh interpreter,
+      like the first session of a new replica.
+    """
+    code = (
+        "from benchmarks.startup_benchmark import run_first_page; "
+        f"run_first_page({script!r}, {data_path!r})"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(process.stdout.strip().splitlines()[-1])
+
+
+def format_profile(result, top):
+    # Only the imports of the startup statements themselves, not their children
+    top_level = [m for m in result["modules"] if m["depth"] == 0]
+    lines = [f"{'module':<45} {'cumulative ms':>14}"]
+    for module in sorted(top_level, key=lambda m: -m["cumulative_ms"])[:top]:
+        lines.append(f"{module['module']:<45} {module['cumulative_ms']:>14.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the startup imports.")
+    parser.add_argument("--scripts", nargs="+", default=STARTUP_SCRIPTS)
+    parser.add_argument("--budget_ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--first_page", action="store_true", help="Also time the first run"
+    )
+    parser.add_argument("--data_path", type=str, default="data/nutrition_data.csv")
+    args = parser.parse_args()
+
+    statements = startup_imports(args.scripts)
+    results = [profile_startup(statements) for _ in range(args.repeat)]
+    startup_ms = statistics.median(result["seconds"] for result in results) * 1000
+
+    print(format_profile(results[0], args.top))
+    print(f"\nStartup imports: {startup_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if args.first_page:
+        for script in args.scripts:
+            seconds = time_first_page(script, args.data_path)
+            print(f"First run of {script}: {seconds * 1000:.0f} ms")
+
+    failures = []
+    if startup_ms > args.budget_ms:
+        failures.append(f"the startup imports take {startup_ms:.1f} ms")
+    loaded = sorted(set(m for result in results for m in result["loaded"]))
+    if loaded:
+        failures.append(f"the startup path imports {', '.join(loaded)}")
+    if failures:
+        print("Over budget: " + "; ".join(failures))
+        sys.exit(1)
@@ -0,0 +1,89 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import streamlit as st
+from src.streamlit.cached_state import load_yaml_config
+from src.streamlit.data_input import streamlit_dataset_upload
+from src.visualization.dashboard import nutrition_scatter_plot
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config", type=str, default="config/app_config.yaml")
+parser.add_argument("--data_path", type=str, default="data/nutrition_data.csv")
+args = parser.parse_args()
+
+st.set_page_config(page_title="Catalog Explorer", page_icon="🔎", layout="wide")
+st.title("🔎 Catalog Explorer")
+
+config = load_yaml_config(os.path.join(os.path.dirname(__file__), "..", args.config))
+explorer_config = config["catalog_explorer"]
+
+df = streamlit_dataset_upload(default_data_path=args.data_path)
+if df is None:
+    st.stop()
+
+# Every numeric catalog column can be plotted, e.g. price vs. protein vs. iron
+numeric_columns = [
+    col for col in df.columns if pd.api.types.is_numeric_dtype(df[col].dtype)
+]
+
+
+def column_label(col):
+    return ", ".join(col)
+
+
+def default_index(col):
+    return numeric_columns.index(col) if col in numeric_columns else 0
+
+
+col_1, col_2, col_3 = st.columns(3)
+with col_1:
+    x_col = st.selectbox(
+        "X axis",
+        numeric_columns,
+        index=default_index(("Non Nutrient Data", "Price per 100g")),
+        format_func=column_label,
+    )
+with col_2:
+    y_col = st.selectbox(
+        "Y axis",
+        numeric_columns,
+        index=default_index(("Macronutrient", "Protein [G]")),
+        format_func=column_label,
+    )
+with col_3:
+    z_col = st.selectbox(
+        "Color",
+        numeric_columns,
+        index=default_index(("Energy", "Energy [KCAL]")),
+        format_func=column_label,
+    )
+
+
+def range_filter(col):
+    # Narrowing the range below max_points foods switches to single foods
+    values = df[col].to_numpy(dtype=float)
+    low, high = float(np.nanmin(values)), float(np.nanmax(values))
+    if low == high:
+        return np.ones(len(values), dtype=bool)
+    selected_low, selected_high = st.slider(
+        column_label(col), low, high, (low, high), key=f"range_{column_label(col)}"
+    )
+    return (values >= selected_low) & (values <= selected_high)
+
+
+with st.expander("Filter"):
+    mask = range_filter(x_col) & range_filter(y_col)
+
+fig = nutrition_scatter_plot(
+    df,
+    x_col,
+    y_col,
+    z_col,
+    title="Food Catalog",
+    max_points=explorer_config["max_points"],
+    bins=explorer_config["bins"],
+    mask=mask,
+)
+st.plotly_chart(fig, use_container_width=True)
@@ -1,20 +1,8 @@
 import streamlit as st
 import os
-import yaml
 import streamlit as st
-import openpyxl
-import pandas as pd
-import io
 import argparse
-from src.visualization.dashboard import (
-    create_absolute_summed_macronutrient_figure,
-    create_normalized_stacked_micronutrient_figure,
-    create_normalized_summed_micronutrient_figure,
-    create_absolute_stacked_macronutrient_figure,
-)
-from src.nutrition.optimization import create_absolute_optimization_results_summary
-from src.sheets.shoppinglist_spreadsheet import create_shopping_list_sheet
-from src.sheets.mealplan_spreadsheet import create_mealplan_spreadsheet
+from src.visualization.dashboard import aggregate_nutrient_contributions
 from src.streamlit.page_config import set_page_config
 from src.streamlit.data_input import streamlit_dataset_upload
 from src.streamlit.references import display_calorie_change_studies
@@ -29,18 +17,54 @@ from src.streamlit.page_interaction import (
     determine_daily_calorie_change,
     manage_constraints,
     input_current_user_stats,
+    apply_nutrient_ranges,
+)
+from src.streamlit.mealplan_output import merge_optimizer_results
+from src.streamlit.result_sections import (
+    store_optimization_result,
+    get_optimization_result,
+    mealplan_section,
+    nutritional_breakdown_section,
+    detailed_breakdown_section,
+    spreadsheet_section,
+    shopping_list_section,
+    submit_mealplan_exports,
+    submit_shopping_list_exports,
 )
-from src.streamlit.mealplan_output import (
-    display_mealplan_in_streamlit,
-    create_meaplan_from_optimizer_results,
+from src.visualization.figure_cache import get_figure_cache
+from src.utils.hashing import hash_values
+from src.utils.tracing import configure_json_logs
+from src.sheets.export_formats import available_export_formats
+from src.sheets.export_jobs import get_export_cache
+from src.streamlit.cached_state import cached_nutrient_goals, load_yaml_config
+from src.streamlit.session_workspace import get_session_workspace
+from src.streamlit.rerun_profile import (
+    profile_step,
+    show_rerun_profile,
+    start_rerun_profile,
+    track_background_trace,
 )
-from src.nutrition.formulas import calculate_nutrient_goals
-from src.nutrition.optimization import save_optimization_results
 from src.nutrition.optimization import (
-    optimize_diet,
+    build_diet_model,
+    create_absolute_optimization_results_summary,
     create_normalized_optimization_results_summary,
+    save_optimization_results,
+)
+from src.nutrition.solver_jobs import SolverJob
+from src.nutrition.solver_telemetry import get_telemetry_store
+from src.streamlit.solver_progress import (
+    SOLVER_JOB_KEY,
+    finished_solver_result,
+    solver_progress_section,
+)
+from src.streamlit.live_mode import (
+    live_settings_key,
+    live_solver_section,
+    request_live_solve,
+    store_start_solution,
+    LIVE_REQUEST_KEY,
+    LIVE_SETTINGS_KEY,
 )
-from src.visualization.dashboard import visualize_optimization_result_nutrient_breakdown
 
 
 parser = argparse.ArgumentParser()
@@ -55,21 +79,31 @@ args = parser.parse_args()
 
 
 css = set_page_config()
+start_rerun_profile()
 
 df = st.session_state["data"]
 
 
-with open(os.path.join(os.path.dirname(__file__), "..", args.config), "r") as file:
-    config = yaml.safe_load(file)
+# Parsed once per process, see src/streamlit/cached_state.py
+config = load_yaml_config(os.path.join(os.path.dirname(__file__), "..", args.config))
 
 
 if "debug" not in st.session_state:
     st.session_state["debug"] = config["debug"]
 
-optimization_path = os.path.join(
-    config["mealplan_path"], "merged_optimization_result.csv"
+# Every span is also written to stderr as a JSON line if enabled
+configure_json_logs(config["tracing"]["json_logs"])
+
+# Every solve is recorded for the Solver Telemetry page if enabled
+telemetry = (
+    get_telemetry_store(config["solver_telemetry"]["path"])
+    if config["solver_telemetry"]["enabled"]
+    else None
 )
 
+# Size the process-wide export and figure caches before they are first used
+get_export_cache(max_bytes=config["export_cache_bytes"])
+get_figure_cache(max_bytes=config["figure_cache_bytes"])
 
 # Accessing the variables
 selected_body_type = config["selected_body_type"]
@@ -78,16 +112,20 @@ show_micronutrient_health_outcomes_bool = config[
     "show_micronutrient_health_outcomes_bool"
 ]
 image_path = config["image_path"]
-normalized_raw_output_path = config["normalized_raw_output_path"]
-absolute_raw_output_path = config["absolute_raw_output_path"]
-output_path = config["output_path"]
-mealplan_path = config["mealplan_path"]
+
+# Every session writes into its own workspace, the paths are None if the
+# session keeps its results in memory only
+workspace = get_session_workspace(config["session_workspace"])
+relative_raw_output_path = workspace.path(config["relative_raw_output_path"])
+normalized_raw_output_path = workspace.path(config["normalized_raw_output_path"])
+absolute_raw_output_path = workspace.path(config["absolute_raw_output_path"])
+mealplan_path = workspace.path(config["mealplan_path"])
 upload_spreadsheet = config["upload_spreadsheet"]
 upload_shopping_list = config["upload_shopping_list"]
 
 
 st.markdown("### 1. Your Situation")
-with st.expander("Situation"):
+with profile_step("Situation"), st.expander("Situation"):
     if selected_body_type:
         image_dir = os.path.join(os.path.dirname(__file__), "..", image_path)
         selected_body_type = user_input_body_type(image_dir)
@@ -102,7 +140,7 @@ with st.expander("Situation"):
 
     display_calorie_change_studies()
 
-    rdi_dict = calculate_nutrient_goals(
+    rdi_dict = cached_nutrient_goals(
         weight=weight,
         height=height,
         age=age,
@@ -114,7 +152,7 @@ with st.expander("Situation"):
     initialize_macro_rdi_session_state(rdi_dict)
 
 st.markdown("### 2. Energy & Macros")
-with st.expander("Energy Intake"):
+with profile_step("Energy Intake"), st.expander("Energy Intake"):
     st.write(
         "You will receive a mealplan with a total energy intake within the following range:"
     )
@@ -123,7 +161,7 @@ with st.expander("Energy Intake"):
     )
     energy_intake, constant_kcal = user_input_energy(rdi_dict)
 
-with st.expander("Macronutrients Ratio"):
+with profile_step("Macronutrients Ratio"), st.expander("Macronutrients Ratio"):
     st.write(
         "You will receive a mealplan with macronutrients within the following range:"
     )
@@ -139,7 +177,7 @@ with st.expander("Macronutrients Ratio"):
             macro_ranges, NUTRIENTS, slider_range=(0, 600), constant_kcal=constant_kcal
         )
 
-with st.expander("Macronutrients Health Threats"):
+with profile_step("Macronutrients Health Threats"), st.expander("Macronutrients Health Threats"):
     st.write(
         "You will receive a mealplan that caps the following unhealthy macronutrients within the following range:"
     )
@@ -156,7 +194,7 @@ with st.expander("Macronutrients Health Threats"):
 
 
 st.markdown("### 3. Fiber Intake")
-with st.expander("Fiber Intake"):
+with profile_step("Fiber Intake"), st.expander("Fiber Intake"):
     st.write(
         "You will receive a mealplan that contains fiber within the following range:"
     )
@@ -173,7 +211,7 @@ with st.expander("Fiber Intake"):
 
 
 st.markdown("### 4. Micronutrients")
-with st.expander("Micronutrients"):
+with profile_step("Micronutrients"), st.expander("Micronutrients"):
 
     micro_ranges = {}
     st.write(
@@ -195,7 +233,7 @@ with st.expander("Micronutrients"):
 
 
 st.markdown("### 5. Optimization Settings")
-with st.expander("Optimization Settings"):
+with profile_step("Optimization Settings"), st.expander("Optimization Settings"):
     col_1, col_2 = st.columns([1, 1])
     with col_1:
         (
@@ -209,116 +247,160 @@ with st.expander("Optimization Settings"):
         ) = user_input_optimization_settings()
 
 st.markdown("### 6. Food Preferences")
-with st.expander("Food Preferences"):
+with profile_step("Food Preferences"), st.expander("Food Preferences"):
     manage_constraints()
 
-if st.button("Optimize Diet"):
-    relative_df, food_vars = optimize_diet(
-        daily_food_budget=daily_food_budget,
-        cost_factor=cost_factor,
-        time_factor=time_factor,
-        insulin_factor=insulin_factor,
-        fullness_factor=fullness_factor,
-        df=df,
-        rdi_dict=rdi_dict,
-        food_constraints=st.session_state.food_constraints,
-        optimization_unit_size=optimization_unit_size,
-        macro_tolerance=0,
-        micro_tolerance=micro_tolerance,
-    )
-
-    relative_df.to_csv("output/raw/relative_df.csv")
-
-    # THESE RESULTS ARE RELATIVE TO THE RDI BOUNDS AND DEPEND ON optimization_unit_size!!!
-    normalized_results_df, summary_df, total_df = (
-        create_normalized_optimization_results_summary(relative_df, rdi_dict, food_vars)
-    )
-
-    absolute_results_df = create_absolute_optimization_results_summary(
-        df, rdi_dict, food_vars, optimization_unit_size
-    )
-    # THESE RESULTS ARE RELATIVE TO THE RDI BOUNDS AND DEPEND ON optimization_unit_size!!!
-    flat_column_normalized_result_df = save_optimization_results(
-        normalized_raw_output_path, normalized_results_df
-    )
-
-    flat_column_absolute_result_df = save_optimization_results(
-        absolute_raw_output_path, absolute_results_df
-    )
+# Every solve uses the ranges chosen on the sliders
+solve_settings = dict(
+    daily_food_budget=daily_food_budget,
+    cost_factor=cost_factor,
+    time_factor=time_factor,
+    insulin_factor=insulin_factor,
+    fullness_factor=fullness_factor,
+    df=df,
+    rdi_dict=apply_nutrient_ranges(rdi_dict, energy_intake, micro_ranges),
+    food_constraints=dict(st.session_state.food_constraints),
+    optimization_unit_size=optimization_unit_size,
+    macro_tolerance=0,
+    micro_tolerance=micro_tolerance,
+)
 
-    st.markdown("### Optimization Results")
+live_mode = st.toggle(
+    "Live Mode",
+    key="live_mode",
+    help="Re-optimize automatically shortly after a setting changes, "
+    "with a short solver time limit",
+)
 
-    if show_mealplan:
-        with st.expander("Your Optimized Daily Food Plan"):
-            merged_df = create_meaplan_from_optimizer_results(
-                df,
-                flat_column_normalized_result_df,
-                optimization_unit_size,
-                directory=mealplan_path,
-                streamlit_mealplan_columns=config["streamlit_mealplan_columns"],
+if st.button("Optimize Diet"):
+    # The solve runs in the solver pool, the page only polls its progress
+    previous_job = st.session_state.get(SOLVER_JOB_KEY)
+    if previous_job is not None:
+        previous_job.cancel()
+    st.session_state[SOLVER_JOB_KEY] = SolverJob(
+        build_diet_model,
+        time_limit=config["solver_time_limit"],
+        telemetry=telemetry,
+        **solve_settings,
+    ).start()
+    track_background_trace(st.session_state[SOLVER_JOB_KEY].trace)
+    # Live mode does not solve these settings again
+    st.session_state[LIVE_SETTINGS_KEY] = live_settings_key(solve_settings)
+    st.session_state.pop(LIVE_REQUEST_KEY, None)
+elif live_mode:
+    request_live_solve(solve_settings)
+
+solver_job = st.session_state.get(SOLVER_JOB_KEY)
+solved = None
+if solver_job is not None and solver_job.done():
+    del st.session_state[SOLVER_JOB_KEY]
+    solved = finished_solver_result(solver_job)
+
+with profile_step("Read Solution"):
+    if solved is not None:
+        relative_df = solved["normalized_df"]
+        food_vars = solved["food_vars"]
+        # The settings the job was started with, the sliders may have moved since
+        rdi_dict = solver_job.kwargs["rdi_dict"]
+        optimization_unit_size = solver_job.kwargs["optimization_unit_size"]
+        store_start_solution(food_vars)
+
+        if relative_raw_output_path is not None:
+            os.makedirs(os.path.dirname(relative_raw_output_path), exist_ok=True)
+            relative_df.to_csv(relative_raw_output_path)
+
+        # THESE RESULTS ARE RELATIVE TO THE RDI BOUNDS AND DEPEND ON optimization_unit_size!!!
+        normalized_results_df, summary_df, total_df = (
+            create_normalized_optimization_results_summary(
+                relative_df, rdi_dict, food_vars
             )
-            display_mealplan_in_streamlit(merged_df)
+        )
 
-    with st.expander("Nutritional Breakdown"):
-        abs_sum_fig = create_absolute_summed_macronutrient_figure(
-            absolute_raw_output_path
+        absolute_results_df = create_absolute_optimization_results_summary(
+            df, rdi_dict, food_vars, optimization_unit_size
+        )
+        # THESE RESULTS ARE RELATIVE TO THE RDI BOUNDS AND DEPEND ON optimization_unit_size!!!
+        flat_column_normalized_result_df = save_optimization_results(
+            normalized_raw_output_path, normalized_results_df
         )
 
-        norm_sum_fig = create_normalized_summed_micronutrient_figure(
-            absolute_raw_output_path, normalized_raw_output_path
+        flat_column_absolute_result_df = save_optimization_results(
+            absolute_raw_output_path, absolute_results_df
         )
-        st.plotly_chart(abs_sum_fig)
-        st.plotly_chart(norm_sum_fig)
 
-    with st.expander("Fully Detailed Nutritional Breakdown"):
-        abs_stacked_fig = create_absolute_stacked_macronutrient_figure(
-            absolute_raw_output_path
+        # Per-food and total nutrient matrices shared by all dashboard figures
+        contributions = aggregate_nutrient_contributions(
+            flat_column_absolute_result_df, flat_column_normalized_result_df
         )
-        norm_stacked_fig = create_normalized_stacked_micronutrient_figure(
-            absolute_raw_output_path, normalized_raw_output_path
+        # Figures are built once per solution, see src/visualization/figure_cache.py
+        result_hash = hash_values(
+            flat_column_absolute_result_df, flat_column_normalized_result_df
         )
-        st.plotly_chart(abs_stacked_fig)
-        st.plotly_chart(norm_stacked_fig)
-
-    if upload_spreadsheet:
-        with open(args.spreadsheet_config, "r") as f:
-            spreadsheet_config = yaml.safe_load(f)
-            output_path = config["output_path"]
-
-            wb = create_mealplan_spreadsheet(
-                optimization_path,
-                spreadsheet_columns=spreadsheet_config["columns"],
-                output_path=config["output_path"],
-            )
 
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)  # Move the cursor to the beginning of the BytesIO object
+        merged_df = merge_optimizer_results(
+            df,
+            flat_column_normalized_result_df,
+            optimization_unit_size,
+            directory=mealplan_path,
+        )
 
-            # Add a download button
-            st.download_button(
-                label="CLICK HERE TO DOWNLOAD: mealplan.xlsx",
-                data=output,
-                file_name="mealplan.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        # The workbooks are built in the background as soon as the solution
+        # exists, their sections only show the downloads
+        export_formats = available_export_formats(
+            config.get("export_formats", ["xlsx"])
+        )
+        exports = {}
+        if upload_spreadsheet:
+            exports["mealplan"] = submit_mealplan_exports(
+                merged_df,
+                config,
+                load_yaml_config(args.spreadsheet_config),
+                export_formats,
+            )
+        if upload_shopping_list:
+            exports["shopping_list"] = submit_shopping_list_exports(
+                merged_df,
+                config,
+                load_yaml_config(args.shopping_config),
+                export_formats,
             )
 
-    if upload_shopping_list:
-        with open(args.shopping_config, "r") as f:
-            shopping_config = yaml.safe_load(f)
-
-        df = pd.read_csv(shopping_config["paths"]["data"])
-
-        wb_io = create_shopping_list_sheet(
-            df,
-            shopping_list_columns=shopping_config["columns"],
-            output_path=shopping_config["paths"]["output"],
+        store_optimization_result(
+            flat_column_normalized_result_df=flat_column_normalized_result_df,
+            flat_column_absolute_result_df=flat_column_absolute_result_df,
+            optimization_unit_size=optimization_unit_size,
+            merged_df=merged_df,
+            contributions=contributions,
+            result_hash=result_hash,
+            exports=exports,
         )
 
-        # Add a download button
-        st.download_button(
-            label="CLICK HERE TO DOWNLOAD: shopping_list.xlsx",
-            data=wb_io,
-            file_name="shopping_list.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+# Shown after the results were read, a live solve started here reuses the
+# variables of the previous one
+if live_mode:
+    live_solver_section(
+        config["live_mode"]["debounce_seconds"],
+        config["live_mode"]["time_limit"],
+        telemetry=telemetry,
+    )
+elif SOLVER_JOB_KEY in st.session_state:
+    solver_progress_section(st.session_state[SOLVER_JOB_KEY])
+
+# Every section is only rendered once it is switched on, and switching one
+# section only reruns that section. The exports are already being built
+with profile_step("Results"):
+    optimization_result = get_optimization_result()
+    if optimization_result is not None:
+        st.markdown("### Optimization Results")
+
+        if show_mealplan:
+            mealplan_section(optimization_result, df, config)
+        nutritional_breakdown_section(optimization_result)
+        detailed_breakdown_section(optimization_result, config["max_stacked_foods"])
+
+        if "mealplan" in optimization_result["exports"]:
+            spreadsheet_section(optimization_result["exports"]["mealplan"])
+        if "shopping_list" in optimization_result["exports"]:
+            shopping_list_section(optimization_result["exports"]["shopping_list"])
+
+show_rerun_profile()
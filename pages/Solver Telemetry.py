@@ -0,0 +1,118 @@
+import os
+import argparse
+import time
+import pandas as pd
+import streamlit as st
+from src.streamlit.cached_state import load_yaml_config
+from src.nutrition.solver_telemetry import (
+    get_telemetry_store,
+    slowest_configurations,
+    telemetry_outliers,
+    telemetry_percentiles,
+)
+from src.visualization.dashboard import solver_telemetry_figure
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config", type=str, default="config/app_config.yaml")
+args = parser.parse_args()
+
+st.set_page_config(page_title="Solver Telemetry", page_icon="📈", layout="wide")
+st.title("📈 Solver Telemetry")
+
+config = load_yaml_config(os.path.join(os.path.dirname(__file__), "..", args.config))
+telemetry_path = config["solver_telemetry"]["path"]
+
+METRICS = ["solve_seconds", "build_seconds", "nodes", "gap"]
+GROUPINGS = {
+    "Day": "D",
+    "Week": "W",
+    "Code version": "code_version",
+    "Dataset": "dataset_hash",
+    "Source": "source",
+}
+
+
+def markdown_table(df, index_label):
+    # Small tables as markdown, numbers with 3 significant digits
+    def cell(value):
+        if isinstance(value, float):
+            return f"{value:.3g}"
+        if isinstance(value, pd.Timestamp):
+            return value.strftime("%Y-%m-%d %H:%M")
+        return str(value)
+
+    lines = [
+        "| " + " | ".join([index_label] + [str(col) for col in df.columns]) + " |",
+        "| " + " | ".join(["---"] * (len(df.columns) + 1)) + " |",
+    ]
+    for index, row in df.iterrows():
+        lines.append("| " + " | ".join(cell(v) for v in [index] + list(row)) + " |")
+    return "\n".join(lines)
+
+
+if not os.path.exists(telemetry_path):
+    st.info(
+        f"No solves were recorded yet in {telemetry_path}, enable "
+        "solver_telemetry in the app config and run an optimization."
+    )
+    st.stop()
+
+col_1, col_2, col_3 = st.columns(3)
+with col_1:
+    metric = st.selectbox("Metric", METRICS)
+with col_2:
+    grouping = st.selectbox("Group by", list(GROUPINGS))
+with col_3:
+    days = st.number_input("Last days (0 for all)", min_value=0, value=30)
+
+since = time.time() - days * 86400 if days else None
+telemetry_df = get_telemetry_store(telemetry_path).load(since=since)
+telemetry_df = telemetry_df.dropna(subset=[metric])
+if telemetry_df.empty:
+    st.info("No solves were recorded in this period.")
+    st.stop()
+
+values = telemetry_df[metric]
+metric_cols = st.columns(5)
+metric_cols[0].metric("Solves", len(telemetry_df))
+for metric_col, quantile in zip(metric_cols[1:], [0.5, 0.9, 0.99]):
+    metric_col.metric(f"p{quantile * 100:g}", f"{values.quantile(quantile):.3g}")
+metric_cols[4].metric("Max", f"{values.max():.3g}")
+
+outliers_df = telemetry_outliers(telemetry_df, column=metric)
+st.plotly_chart(
+    solver_telemetry_figure(telemetry_df, metric, outliers_df),
+    use_container_width=True,
+)
+
+st.subheader("Percentiles")
+st.markdown(
+    markdown_table(
+        telemetry_percentiles(telemetry_df, column=metric, by=GROUPINGS[grouping]),
+        grouping,
+    )
+)
+
+st.subheader("Outliers")
+st.caption(
+    "Solves far slower than usual by the robust z-score of the logarithm, "
+    "e.g. after a dataset or code change or for pathological settings."
+)
+if outliers_df.empty:
+    st.write("No outliers.")
+else:
+    st.markdown(
+        markdown_table(
+            outliers_df.set_index("recorded_at")[
+                ["source", "input_hash", "status", metric, "nodes", "gap", "score"]
+            ],
+            "Recorded at",
+        )
+    )
+
+st.subheader("Slowest Configurations")
+st.caption("Inputs with the slowest median, the same input hash means the same settings.")
+st.markdown(
+    markdown_table(slowest_configurations(telemetry_df, column=metric), "Input hash")
+)
@@ -0,0 +1,138 @@
+import argparse
+import functools
+import json
+import os
+import zipfile
+
+import pandas as pd
+
+from src.images.loader import (
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_TIMEOUT,
+    fetch_image_contents,
+)
+from src.images.thumbnails import THUMBNAIL_EXTENSION, create_thumbnails, url_hash
+
+DEFAULT_ARCHIVE_PATH = "data/image_archive.zip"
+INDEX_NAME = "index.json"
+
+
+def archive_member_name(key, variant):
+    return f"images/{key}_{variant}.{THUMBNAIL_EXTENSION}"
+
+
+def build_image_archive(
+    df,
+    archive_path=DEFAULT_ARCHIVE_PATH,
+    session=None,
+    timeout=DEFAULT_TIMEOUT,
+    max_workers=DEFAULT_MAX_WORKERS,
+):
+    """
+    Download the image of every food in the catalog and pack all thumbnail
+    variants into a single archive indexed by food.
+
+    Parameters:
+    - df (pd.DataFrame): Catalog with MultiIndex columns as loaded by the app.
+    - archive_path (str): Path of the zip archive, replaced atomically.
+    - session, timeout, max_workers: Passed to fetch_image_contents.
+
+    Returns:
+    - dict: The archive index, foods without a readable image are left out.
+    """
+    foods = df[("Non Nutrient Data", "FDC Name")].tolist()
+    urls = df[("Non Nutrient Data", "Image URL")].tolist()
+
+    contents = fetch_image_contents(
+        urls, session=session, timeout=timeout, max_workers=max_workers
+    )
+
+    directory = os.path.dirname(archive_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    index = {"foods": {}}
+    tmp_path = f"{archive_path}.tmp"
+    # Thumbnails are already compressed, so they are stored as is
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        written_keys = set()
+        for food, url, content in zip(foods, urls, contents):
+            if not isinstance(url, str):
+                continue
+            key = url_hash(url)
+            if key not in written_keys:
+                thumbnails = create_thumbnails(content)
+                if thumbnails is None:
+                    continue
+                for variant, thumbnail in thumbnails.items():
+                    archive.writestr(archive_member_name(key, variant), thumbnail)
+                written_keys.add(key)
+            index["foods"][food] = {"url": url, "key": key}
+
+        archive.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False))
+    os.replace(tmp_path, archive_path)
+    return index
+
+
+@functools.lru_cache(maxsize=4)
+def _open_image_archive(archive_path, mtime_ns):
+    # Keyed by modification time so a rebuilt archive is picked up
+    archive = zipfile.ZipFile(archive_path, "r")
+    index = json.loads(archive.read(INDEX_NAME))
+    keys_by_url = {entry["url"]: entry["key"] for entry in index["foods"].values()}
+    return archive, keys_by_url
+
+
+def open_image_archive(archive_path):
+    # Returns (None, {}) if the archive has not been built
+    try:
+        mtime_ns = os.stat(archive_path).st_mtime_ns
+    except OSError:
+        return None, {}
+    return _open_image_archive(archive_path, mtime_ns)
+
+
+def read_archived_thumbnails(archive_path, urls, variant):
+    """
+    Look up the thumbnails of urls in the prefetched archive.
+
+    Returns:
+    - list: Thumbnail bytes (or None if not archived) in the order of urls.
+    """
+    archive, keys_by_url = open_image_archive(archive_path)
+    thumbnails = []
+    for url in urls:
+        key = keys_by_url.get(url) if isinstance(url, str) else None
+        if key is None:
+            thumbnails.append(None)
+            continue
+        try:
+            thumbnails.append(archive.read(archive_member_name(key, variant)))
+        except KeyError:
+            thumbnails.append(None)
+    return thumbnails
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Prefetch all catalog images into a local archive."
+    )
+    parser.add_argument("--data_path", type=str, default="data/nutrition_data.csv")
+    parser.add_argument("--archive_path", type=str, default=DEFAULT_ARCHIVE_PATH)
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT[1])
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data_path)
+    df.columns = pd.MultiIndex.from_tuples([tuple(c.split(".")) for c in df.columns])
+
+    index = build_image_archive(
+        df,
+        archive_path=args.archive_path,
+        timeout=args.timeout,
+        max_workers=args.max_workers,
+    )
+    print(
+        f"Archived images of {len(index['foods'])} / {len(df)} foods "
+        f"to {args.archive_path}"
+    )
@@ -0,0 +1,150 @@
+import os
+import uuid
+
+from src.images.loader import (
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_TIMEOUT,
+    fetch_image_contents,
+)
+from src.images.archive import read_archived_thumbnails
+from src.images.thumbnails import THUMBNAIL_EXTENSION, create_thumbnails, url_hash
+from src.utils.tracing import traced
+
+DEFAULT_CACHE_DIR = "output/image_cache"
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def thumbnail_path(cache_dir, url, variant):
+    key = url_hash(url)
+    # Shard by the first two hex digits to keep directories small
+    return os.path.join(cache_dir, key[:2], f"{key}_{variant}.{THUMBNAIL_EXTENSION}")
+
+
+def read_cached_thumbnail(cache_dir, url, variant):
+    path = thumbnail_path(cache_dir, url, variant)
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    # Mark as recently used for the eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return content
+
+
+def write_cached_thumbnails(cache_dir, url, thumbnails):
+    for variant, content in thumbnails.items():
+        path = thumbnail_path(cache_dir, url, variant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a unique temporary file first so concurrent sessions never
+        # read a partially written thumbnail
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        try:
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            # Removed by an eviction of another session, the thumbnail is
+            # rendered again on its next miss
+            continue
+
+
+def evict_cached_thumbnails(cache_dir, max_cache_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Delete the least recently used thumbnails until the cache fits into
+    max_cache_bytes. The temporary files other sessions are still writing
+    are never deleted.
+    """
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for file in files:
+            if not file.endswith(f".{THUMBNAIL_EXTENSION}"):
+                continue
+            path = os.path.join(root, file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_cache_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+
+
+@traced()
+def load_thumbnails(
+    urls,
+    variant,
+    cache_dir=DEFAULT_CACHE_DIR,
+    max_cache_bytes=DEFAULT_MAX_CACHE_BYTES,
+    session=None,
+    timeout=DEFAULT_TIMEOUT,
+    max_workers=DEFAULT_MAX_WORKERS,
+    archive_path=None,
+):
+    """
+    Load the encoded thumbnails of urls from the prefetched image archive or
+    the disk cache, downloading and rendering only the missing ones.
+
+    On a miss all variants are rendered from the same download, so the other
+    consumers of the image are served from the cache as well.
+
+    Parameters:
+    - urls (iterable): Image urls.
+    - variant (str): Key of src.images.thumbnails.THUMBNAIL_VARIANTS.
+    - cache_dir (str): Directory of the cache, shared between sessions.
+    - max_cache_bytes (int): Size the cache is evicted down to after new writes.
+    - session, timeout, max_workers: Passed to fetch_image_contents.
+    - archive_path (str): Archive built by src.images.archive, looked up first.
+
+    Returns:
+    - list: Thumbnail bytes (or None if the image is unavailable) in the order of urls.
+    """
+    urls = list(urls)
+    unique_urls = list(dict.fromkeys(url for url in urls if isinstance(url, str)))
+
+    thumbnails = {}
+    if archive_path is not None:
+        archived = read_archived_thumbnails(archive_path, unique_urls, variant)
+        thumbnails = {
+            url: content
+            for url, content in zip(unique_urls, archived)
+            if content is not None
+        }
+
+    missing_urls = []
+    for url in unique_urls:
+        if url in thumbnails:
+            continue
+        content = read_cached_thumbnail(cache_dir, url, variant)
+        if content is None:
+            missing_urls.append(url)
+        else:
+            thumbnails[url] = content
+
+    if missing_urls:
+        contents = fetch_image_contents(
+            missing_urls, session=session, timeout=timeout, max_workers=max_workers
+        )
+        for url, content in zip(missing_urls, contents):
+            rendered = create_thumbnails(content)
+            if rendered is None:
+                continue  # Not cached, the next run retries the download
+            write_cached_thumbnails(cache_dir, url, rendered)
+            thumbnails[url] = rendered[variant]
+
+        evict_cached_thumbnails(cache_dir, max_cache_bytes)
+
+    return [thumbnails.get(url) for url in urls]
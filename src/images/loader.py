@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout in seconds for a single image request
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_MAX_WORKERS = 8
+
+
+def create_image_session(max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Create a requests session whose connection pool is large enough for
+    max_workers concurrent image downloads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_image_content(url, session, timeout=DEFAULT_TIMEOUT):
+    # Returns None if the url is missing, the request fails or times out
+    if not isinstance(url, str) or not url:
+        return None
+    try:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    except requests.RequestException:
+        return None
+
+
+def fetch_image_contents(
+    urls, session=None, timeout=DEFAULT_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS
+):
+    """
+    Download the raw bytes of all urls concurrently.
+
+    Parameters:
+    - urls (iterable): Image urls, duplicates are only downloaded once.
+    - session (requests.Session): Session to reuse, a pooled one is created if None.
+    - timeout (float or tuple): Per request timeout passed to requests.
+    - max_workers (int): Upper bound of concurrent downloads.
+
+    Returns:
+    - list: The image bytes (or None on failure) in the order of urls.
+    """
+    urls = list(urls)
+    unique_urls = list(dict.fromkeys(url for url in urls if isinstance(url, str)))
+    if not unique_urls:
+        return [None] * len(urls)
+
+    owns_session = session is None
+    if owns_session:
+        session = create_image_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(unique_urls)))
+        ) as executor:
+            contents = executor.map(
+                lambda url: fetch_image_content(url, session, timeout), unique_urls
+            )
+            content_by_url = dict(zip(unique_urls, contents))
+    finally:
+        if owns_session:
+            session.close()
+
+    return [content_by_url.get(url) for url in urls]
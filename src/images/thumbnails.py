@@ -0,0 +1,74 @@
+import hashlib
+from io import BytesIO
+
+from PIL import Image
+
+# Pre-rendered sizes of every product image:
+# - ui: mealplan table in streamlit (st.image(..., width=60))
+# - sheet: product column of the shopping list workbooks (22% of the original)
+THUMBNAIL_VARIANTS = {
+    "ui": {"width": 60},
+    "sheet": {"scale": 0.22},
+}
+THUMBNAIL_FORMAT = "JPEG"
+THUMBNAIL_EXTENSION = "jpg"
+THUMBNAIL_QUALITY = 85
+BACKGROUND_COLOR = (255, 255, 255)
+
+
+def url_hash(url):
+    # Content address of an image in the cache and the archive
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def thumbnail_size(size, variant):
+    width, height = size
+    spec = THUMBNAIL_VARIANTS[variant]
+    if "width" in spec:
+        scale = spec["width"] / width
+    else:
+        scale = spec["scale"]
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_thumbnail(img):
+    # Flatten transparency onto a white background, the workbooks are white too
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, BACKGROUND_COLOR)
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    output = BytesIO()
+    img.save(output, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, optimize=True)
+    return output.getvalue()
+
+
+def create_thumbnails(content, variants=THUMBNAIL_VARIANTS):
+    """
+    Decode the raw image bytes once and render every thumbnail variant.
+
+    Returns:
+    - dict: Encoded thumbnail bytes per variant, or None if content is not an image.
+    """
+    if content is None:
+        return None
+    try:
+        img = Image.open(BytesIO(content))
+        img.load()
+    except Exception:
+        return None
+
+    return {
+        variant: encode_thumbnail(
+            img.resize(thumbnail_size(img.size, variant), Image.LANCZOS)
+        )
+        for variant in variants
+    }
+
+
+def create_placeholder_thumbnail(variant, size=(152, 152), color=(238, 238, 238)):
+    img = Image.new("RGB", thumbnail_size(size, variant), color)
+    return encode_thumbnail(img)
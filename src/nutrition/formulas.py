@@ -1,3 +1,5 @@
+from src.utils.tracing import traced
+
 micro_goals = {
     "Calcium [MG]": {"lower_bound": 1000, "upper_bound": 2500},
     "Choline [MG]": {"lower_bound": 550, "upper_bound": 3500},
@@ -31,6 +33,7 @@ micro_goals = {
 }
 
 
+@traced()
 def calculate_nutrient_goals(
     weight=89,
     height=180,
@@ -0,0 +1,154 @@
+import numpy as np
+
+# The meals and their share of the daily kcal and macros are configured as
+# meal_targets in config/spreadsheet_config.yaml
+
+
+def assign_portions_to_meals(
+    nutrients, targets, compatible, portions=4, max_passes=20
+):
+    """
+    Split every food into equal portions and distribute them over the meals
+    so that the nutrients of each meal are as close as possible to its target.
+
+    The error of a meal plan is the squared deviation of every meal and
+    nutrient from the target, relative to the daily total of the nutrient.
+    Portions are first assigned greedily, largest first, to the compatible
+    meal with the smallest error increase. Then single portions are moved
+    between meals as long as a move reduces the error.
+
+    Parameters:
+    - nutrients (np.ndarray): Daily nutrients of each food (foods x nutrients).
+    - targets (np.ndarray): Share of the daily total per meal (meals x nutrients).
+    - compatible (np.ndarray): Whether a food may be eaten at a meal (foods x meals).
+    - portions (int): Number of portions every food is split into.
+    - max_passes (int): Upper bound of local search passes over all portions.
+
+    Returns:
+    - np.ndarray: Number of portions of each food per meal (foods x meals).
+    """
+    nutrients = np.asarray(nutrients, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    compatible = np.asarray(compatible, dtype=bool).copy()
+    n_foods, n_meals = compatible.shape
+
+    # Foods without a compatible meal may be eaten at any meal
+    compatible[~compatible.any(axis=1)] = True
+
+    totals = nutrients.sum(axis=0)
+    scale = np.where(totals > 0, totals, 1)
+    portion_nutrients = nutrients / portions / scale
+    meal_targets = targets * totals / scale
+
+    counts = np.zeros((n_foods, n_meals), dtype=int)
+    meal_nutrients = np.zeros((n_meals, nutrients.shape[1]))
+
+    def error_increase(food):
+        # Error change of adding one portion of food to every meal
+        delta = portion_nutrients[food]
+        deviation = meal_nutrients - meal_targets
+        return ((deviation + delta) ** 2).sum(axis=1) - (deviation**2).sum(axis=1)
+
+    # Greedy construction, largest portions first
+    order = np.argsort(-portion_nutrients.sum(axis=1), kind="stable")
+    for food in order:
+        for _ in range(portions):
+            increase = np.where(compatible[food], error_increase(food), np.inf)
+            meal = int(np.argmin(increase))
+            counts[food, meal] += 1
+            meal_nutrients[meal] += portion_nutrients[food]
+
+    # Local search, move single portions to a better meal
+    for _ in range(max_passes):
+        improved = False
+        for food in order:
+            delta = portion_nutrients[food]
+            for source in np.flatnonzero(counts[food]):
+                deviation = meal_nutrients - meal_targets
+                removal = ((deviation[source] - delta) ** 2).sum() - (
+                    deviation[source] ** 2
+                ).sum()
+                addition = ((deviation + delta) ** 2).sum(axis=1) - (
+                    deviation**2
+                ).sum(axis=1)
+                change = np.where(compatible[food], removal + addition, np.inf)
+                change[source] = np.inf
+                target = int(np.argmin(change))
+                if change[target] < -1e-12:
+                    counts[food, source] -= 1
+                    counts[food, target] += 1
+                    meal_nutrients[source] -= delta
+                    meal_nutrients[target] += delta
+                    improved = True
+        if not improved:
+            break
+
+    return counts
+
+
+def compatible_meals(categories, meal_times, meal_compatibility=None):
+    # Foods of categories missing from meal_compatibility fit every meal
+    meal_compatibility = meal_compatibility or {}
+    return np.array(
+        [
+            [meal in meal_compatibility.get(category, meal_times) for meal in meal_times]
+            for category in categories
+        ],
+        dtype=bool,
+    )
+
+
+def assign_meal_times(
+    df,
+    meal_targets,
+    meal_compatibility=None,
+    categories=None,
+    portions=4,
+):
+    """
+    Split the foods of a mealplan over the meals of meal_targets.
+
+    Parameters:
+    - df (pd.DataFrame): One row per food with a "Food" column and the
+      nutrient columns of meal_targets, in daily amounts.
+    - meal_targets (dict): Share of the daily nutrients per meal and nutrient,
+      the meals in the order they are eaten.
+    - meal_compatibility (dict): Allowed meals per food category.
+    - categories (iterable): Food category of each row of df.
+    - portions (int): Number of portions every food is split into.
+
+    Returns:
+    - pd.DataFrame: One row per food and meal with the nutrients scaled to the
+      portions eaten at that meal and a "Meal Time" column.
+    """
+    meal_times = list(meal_targets)
+    nutrient_columns = list(next(iter(meal_targets.values())))
+    targets = np.array(
+        [[meal_targets[meal][col] for col in nutrient_columns] for meal in meal_times]
+    )
+
+    df = df.reset_index(drop=True)
+    if categories is None:
+        categories = [None] * len(df)
+    compatible = compatible_meals(list(categories), meal_times, meal_compatibility)
+
+    counts = assign_portions_to_meals(
+        df[nutrient_columns].fillna(0).to_numpy(),
+        targets,
+        compatible,
+        portions=portions,
+    )
+
+    # One row per food and meal it is eaten at, in the order of the meals
+    food_idx, meal_idx = np.nonzero(counts)
+    order = np.lexsort((food_idx, meal_idx))
+    food_idx, meal_idx = food_idx[order], meal_idx[order]
+
+    assigned_df = df.iloc[food_idx].reset_index(drop=True)
+    fractions = counts[food_idx, meal_idx] / portions
+    numeric_columns = assigned_df.select_dtypes("number").columns
+    assigned_df[numeric_columns] = (
+        assigned_df[numeric_columns].astype(float).mul(fractions, axis=0)
+    )
+    assigned_df["Meal Time"] = [meal_times[meal] for meal in meal_idx]
+    return assigned_df
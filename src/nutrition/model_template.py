@@ -0,0 +1,203 @@
+import threading
+
+import numpy as np
+import pulp as pl
+
+from src.nutrition.optimization import calculate_relative_nutrient_df
+from src.utils.tracing import traced
+
+# Large enough to never bind, used for upper bounds a nutrient does not have
+UNBOUNDED = 1e9
+
+
+def flatten_rdi_bounds(rdi_dict):
+    # Same flattening as calculate_relative_nutrient_df
+    flat_rdi_lower_bound = {}
+    flat_rdi_upper_bound = {}
+    for category, nutrients in rdi_dict.items():
+        for nutrient, bounds in nutrients.items():
+            if bounds["lower_bound"] is not None and bounds["lower_bound"] > 0:
+                flat_rdi_lower_bound[(category, nutrient)] = bounds["lower_bound"]
+            if "upper_bound" in bounds and bounds["upper_bound"] is not None:
+                flat_rdi_upper_bound[(category, nutrient)] = bounds["upper_bound"]
+    return flat_rdi_lower_bound, flat_rdi_upper_bound
+
+
+def constraint_structure(columns, rdi_dict):
+    """
+    The nutrient constraints build_diet_model creates for these goals.
+
+    Returns:
+    - tuple: (nutrient, has_min, has_max) per constrained catalog column.
+    """
+    flat_rdi_lower_bound, flat_rdi_upper_bound = flatten_rdi_bounds(rdi_dict)
+    structure = []
+    for col in columns:
+        if col[0] in ("Energy", "Macronutrient") and col in flat_rdi_lower_bound:
+            structure.append((col, True, col in flat_rdi_upper_bound))
+        elif col[0] == "Micronutrient":
+            structure.append((col, True, col in flat_rdi_upper_bound))
+    return tuple(structure)
+
+
+def constraint_bounds(nutrient, rdi_dict, tolerance):
+    """
+    Right hand sides of the min and max constraint of a nutrient in absolute
+    units, equivalent to the relative constraints of build_diet_model.
+    """
+    flat_rdi_lower_bound, flat_rdi_upper_bound = flatten_rdi_bounds(rdi_dict)
+    # build_diet_model scales each nutrient by this bound, raw values by 100
+    scale = flat_rdi_lower_bound.get(nutrient, flat_rdi_upper_bound.get(nutrient, 100))
+    lower = scale * (100 - tolerance) / 100
+    if nutrient not in flat_rdi_upper_bound:
+        return lower, UNBOUNDED
+    upper_bound_goal = (
+        flat_rdi_upper_bound[nutrient] / flat_rdi_lower_bound[nutrient]
+    ) * 100
+    return lower, scale * (upper_bound_goal + tolerance) / 100
+
+
+class DietModelTemplate:
+    """
+    The diet model of one catalog and unit size, built once and updated in
+    place for new goals, factors, budget and food constraints.
+
+    The nutrient constraints are kept in absolute units, so new goals only
+    change their right hand sides.
+
+    Parameters:
+    - df (pd.DataFrame): The food catalog with MultiIndex columns.
+    - optimization_unit_size (int): Grams per unit of a decision variable.
+    - rdi_dict (dict): Goals that fix which nutrients are constrained, see
+      constraint_structure.
+    """
+
+    @traced("build_model_template")
+    def __init__(self, df, optimization_unit_size, rdi_dict):
+        self.df = df
+        self.optimization_unit_size = optimization_unit_size
+        self.structure = constraint_structure(df.columns, rdi_dict)
+        # Jobs sharing a template build and solve it one after the other
+        self.lock = threading.Lock()
+
+        self.model = pl.LpProblem("Diet_Optimization", pl.LpMinimize)
+        self.food_vars = pl.LpVariable.dicts(
+            "Food", df.index, lowBound=0, cat=pl.LpInteger
+        )
+        variables = [self.food_vars[i] for i in df.index]
+        unit_factor = optimization_unit_size / 100
+
+        price = df[("Non Nutrient Data", "Price per 100g")].to_numpy(dtype=float)
+        self.budget_constraint = (
+            pl.LpAffineExpression(zip(variables, unit_factor * price)) <= 0
+        )
+        self.model += (self.budget_constraint, "Budget_Constraint")
+
+        # The constraints are kept to change their right hand sides in build_model
+        self.nutrient_constraints = {}
+        for nutrient, has_min, has_max in self.structure:
+            # Nutrient amount per unit of every food
+            coefficients = unit_factor * df[nutrient].to_numpy(dtype=float)
+            expression = pl.LpAffineExpression(zip(variables, coefficients))
+            min_constraint = expression >= 0
+            self.model += (min_constraint, f"{nutrient}_min")
+            max_constraint = None
+            if has_max:
+                max_constraint = expression <= 0
+                self.model += (max_constraint, f"{nutrient}_max")
+            self.nutrient_constraints[nutrient] = (min_constraint, max_constraint)
+
+    def matches(self, df, optimization_unit_size, rdi_dict):
+        return (
+            df is self.df
+            and optimization_unit_size == self.optimization_unit_size
+            and constraint_structure(df.columns, rdi_dict) == self.structure
+        )
+
+    @traced("update_model_template")
+    def build_model(
+        self,
+        daily_food_budget,
+        cost_factor,
+        time_factor,
+        insulin_factor,
+        fullness_factor,
+        df,
+        rdi_dict,
+        food_constraints,
+        optimization_unit_size,
+        macro_tolerance=0,
+        micro_tolerance=10,
+    ):
+        """
+        Set the goals, factors, budget and food constraints of the model,
+        a drop-in replacement for build_diet_model.
+
+        Returns:
+        - tuple: The pulp model, the normalized nutrient DataFrame and the
+          decision variable of every food.
+        """
+        if not self.matches(df, optimization_unit_size, rdi_dict):
+            raise ValueError(
+                "The catalog, unit size or constrained nutrients differ from "
+                "the ones the model template was built for"
+            )
+        normalized_df, _, _ = calculate_relative_nutrient_df(
+            df, rdi_dict, self.optimization_unit_size, 100
+        )
+        unit_factor = self.optimization_unit_size / 100
+
+        # pulp stores "expression <= rhs" as "expression - rhs <= 0"
+        self.budget_constraint.constant = -daily_food_budget
+        for nutrient, (min_constraint, max_constraint) in (
+            self.nutrient_constraints.items()
+        ):
+            tolerance = (
+                micro_tolerance if nutrient[0] == "Micronutrient" else macro_tolerance
+            )
+            lower, upper = constraint_bounds(nutrient, rdi_dict, tolerance)
+            min_constraint.constant = -lower
+            if max_constraint is not None:
+                max_constraint.constant = -upper
+
+        # The objective uses the normalized energy, like build_diet_model
+        normalized_kcal = normalized_df[("Energy", "Energy [KCAL]")].to_numpy(
+            dtype=float
+        )
+        coefficients = (
+            cost_factor
+            * unit_factor
+            * df[("Non Nutrient Data", "Price per 100g")].to_numpy(dtype=float)
+            + time_factor
+            * df[("Non Nutrient Data", "Preparation Time")].to_numpy(dtype=float)
+            + insulin_factor
+            * df[("Non Nutrient Data", "Insulin Index")].to_numpy(dtype=float)
+            * unit_factor
+            * normalized_kcal
+            * 4.184
+            / 1000
+            + fullness_factor
+            * df[("Non Nutrient Data", "Fullness Factor")].to_numpy(dtype=float)
+            * unit_factor
+            * normalized_kcal
+        )
+        variables = [self.food_vars[i] for i in df.index]
+        self.model.setObjective(pl.LpAffineExpression(zip(variables, coefficients)))
+
+        # The variables are shared by all builds, so the start solution or
+        # result of an earlier solve is never read as the result of this one
+        for variable in variables:
+            variable.varValue = None
+
+        # Food constraints become variable bounds instead of extra constraints
+        names = df[("Non Nutrient Data", "FDC Name")].to_numpy()
+        for variable in variables:
+            variable.lowBound, variable.upBound = 0, None
+        for food_name, (min_amt, max_amt) in food_constraints.items():
+            for i in df.index[np.flatnonzero(names == food_name)]:
+                if min_amt is not None:
+                    self.food_vars[i].lowBound = min_amt
+                if max_amt is not None:
+                    self.food_vars[i].upBound = max_amt
+
+        return self.model, normalized_df, self.food_vars
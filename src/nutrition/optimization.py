@@ -1,7 +1,15 @@
-import pulp as pl
+import os
+import time
 import pandas as pd
+import streamlit as st
+from src.nutrition.solver_telemetry import record_solve, solve_with_statistics
+from src.utils.tracing import traced
+
+# pulp is imported where a model is built or solved, so pages that only
+# edit inputs never load it
 
 
+@traced()
 def calculate_relative_nutrient_df(df, rdi_dict, optimization_unit_size=100, goal=100):
 
     ################
@@ -40,11 +48,8 @@ def calculate_relative_nutrient_df(df, rdi_dict, optimization_unit_size=100, goa
     return percentage_df, flat_rdi_lower_bound, flat_rdi_upper_bound
 
 
-import pulp as pl
-import streamlit as st
-
-
-def optimize_diet(
+@traced()
+def build_diet_model(
     daily_food_budget,
     cost_factor,
     time_factor,
@@ -57,6 +62,15 @@ def optimize_diet(
     macro_tolerance=0,
     micro_tolerance=10,
 ):
+    """
+    Build the diet model without solving it, see optimize_diet.
+
+    Returns:
+    - tuple: The pulp model, the normalized nutrient DataFrame and the
+      decision variable of every food.
+    """
+    import pulp as pl
+
     goal = 100
     normalized_df, flat_rdi_lower_bound, flat_rdi_upper_bound = (
         calculate_relative_nutrient_df(df, rdi_dict, optimization_unit_size, goal)
@@ -207,8 +221,56 @@ def optimize_diet(
                 f"{nutrient}_max",
             )
 
-    # Solve the model
-    model.solve()
+    return model, normalized_df, food_vars
+
+
+def optimize_diet(
+    daily_food_budget,
+    cost_factor,
+    time_factor,
+    insulin_factor,
+    fullness_factor,
+    df,
+    rdi_dict,
+    food_constraints,
+    optimization_unit_size,
+    macro_tolerance=0,
+    micro_tolerance=10,
+    telemetry=None,
+):
+    import pulp as pl
+
+    settings = dict(
+        daily_food_budget=daily_food_budget,
+        cost_factor=cost_factor,
+        time_factor=time_factor,
+        insulin_factor=insulin_factor,
+        fullness_factor=fullness_factor,
+        df=df,
+        rdi_dict=rdi_dict,
+        food_constraints=food_constraints,
+        optimization_unit_size=optimization_unit_size,
+        macro_tolerance=macro_tolerance,
+        micro_tolerance=micro_tolerance,
+    )
+    start = time.perf_counter()
+    model, normalized_df, food_vars = build_diet_model(**settings)
+    build_seconds = time.perf_counter() - start
+
+    # Solve the model, the CBC log has the node count and gap for the telemetry
+    start = time.perf_counter()
+    statistics = solve_with_statistics(model)
+    record_solve(
+        telemetry,
+        "optimize_diet",
+        model,
+        settings,
+        status=pl.LpStatus[model.status],
+        solution_status=pl.LpSolution[model.sol_status],
+        build_seconds=build_seconds,
+        solve_seconds=time.perf_counter() - start,
+        **statistics,
+    )
 
     # Display the result
     if pl.LpStatus[model.status] == "Optimal":
@@ -222,13 +284,14 @@ def optimize_diet(
     return normalized_df, food_vars
 
 
+@traced()
 def create_absolute_optimization_results_summary(
     df, rdi_dict, food_vars=None, optimization_unit_size=1
 ):
     if not (food_vars is None):
         results = []
         for i in df.index:
-            quantity = pl.value(food_vars[i])
+            quantity = food_vars[i].value()
             if (
                 quantity is not None and quantity > 0
             ):  # Only consider food items with a non-zero quantity
@@ -257,6 +320,7 @@ def create_absolute_optimization_results_summary(
         return result_df
 
 
+@traced()
 def create_normalized_optimization_results_summary(df, rdi_dict, food_vars=None):
     """
     THESE RESULTS ARE RELATIVE TO THE RDI BOUNDS and depend on optimization unit size!!!
@@ -266,7 +330,7 @@ def create_normalized_optimization_results_summary(df, rdi_dict, food_vars=None)
     if not (food_vars is None):
         results = []
         for i in df.index:
-            quantity = pl.value(food_vars[i])
+            quantity = food_vars[i].value()
             if (
                 quantity is not None and quantity > 0
             ):  # Only consider food items with a non-zero quantity
@@ -378,5 +442,10 @@ def save_optimization_results(output_path, results_df):
     flat_column_normalized_result_df.columns = [
         f"{col[0]}.{col[1]}" for col in flat_column_normalized_result_df.columns
     ]
-    flat_column_normalized_result_df.to_csv(output_path, index=False, encoding="utf-8")
+    # Without an output path the results only stay in memory
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        flat_column_normalized_result_df.to_csv(
+            output_path, index=False, encoding="utf-8"
+        )
     return flat_column_normalized_result_df
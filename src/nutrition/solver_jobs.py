@@ -0,0 +1,336 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from src.nutrition.solver_telemetry import build_settings, read_solve, record_solve
+from src.utils.tracing import Trace, run_in_trace, span
+
+DEFAULT_SOLVER_WORKERS = 2
+
+QUEUED = "queued"
+BUILDING = "building"
+SOLVING = "solving"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+# One pool per process, every worker runs at most one CBC process so
+# concurrent solves queue up instead of taking every CPU core
+_solver_executor = None
+
+
+def get_solver_executor(max_workers=DEFAULT_SOLVER_WORKERS):
+    global _solver_executor
+    if _solver_executor is None:
+        _solver_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="solver"
+        )
+    return _solver_executor
+
+
+# CBC log lines with the solver progress
+MODEL_SIZE_PATTERN = re.compile(
+    r"Problem \S+ has (\d+) rows, (\d+) columns and (\d+) elements"
+)
+CONTINUOUS_PATTERN = re.compile(r"Continuous objective value is (\S+)")
+ROOT_CUTS_PATTERN = re.compile(r"Cbc0013I .* changed objective from \S+ to (\S+)")
+INCUMBENT_PATTERN = re.compile(r"Cbc00(?:04|12|16)I Integer solution of (\S+)")
+NODES_PATTERN = re.compile(
+    r"Cbc0010I After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+)"
+)
+# Summary lines once the search ended, completed or stopped by the time limit
+COMPLETED_PATTERN = re.compile(
+    r"Cbc0001I Search completed - best objective (\S+), "
+    r"took \d+ iterations and (\d+) nodes"
+)
+PARTIAL_PATTERN = re.compile(
+    r"Partial search - best objective (\S+) \(best possible (\S+)\), "
+    r"took \d+ iterations and (\d+) nodes"
+)
+NO_SOLUTION = 1e50
+
+
+def parse_cbc_progress(line):
+    """
+    Read the model size, incumbent objective and bound from a CBC log line.
+
+    Returns:
+    - dict: The values found in the line, empty for other lines.
+    """
+    match = MODEL_SIZE_PATTERN.search(line)
+    if match:
+        rows, columns, elements = map(int, match.groups())
+        return {"rows": rows, "columns": columns, "elements": elements}
+
+    match = CONTINUOUS_PATTERN.search(line) or ROOT_CUTS_PATTERN.search(line)
+    if match:
+        return {"bound": float(match.group(1))}
+
+    match = INCUMBENT_PATTERN.search(line)
+    if match:
+        return {"incumbent": float(match.group(1))}
+
+    match = COMPLETED_PATTERN.search(line)
+    if match:
+        objective = float(match.group(1))
+        return {
+            "incumbent": objective,
+            "bound": objective,
+            "nodes": int(match.group(2)),
+        }
+
+    match = PARTIAL_PATTERN.search(line)
+    if match:
+        progress = {"bound": float(match.group(2)), "nodes": int(match.group(3))}
+        incumbent = float(match.group(1))
+        if incumbent < NO_SOLUTION:
+            progress["incumbent"] = incumbent
+        return progress
+
+    match = NODES_PATTERN.search(line)
+    if match:
+        progress = {"nodes": int(match.group(1)), "bound": float(match.group(3))}
+        incumbent = float(match.group(2))
+        if incumbent < NO_SOLUTION:
+            progress["incumbent"] = incumbent
+        return progress
+    return {}
+
+
+def relative_gap(incumbent, bound):
+    if incumbent is None or bound is None:
+        return None
+    return abs(incumbent - bound) / max(abs(incumbent), 1e-9)
+
+
+def solution_values(food_vars):
+    # Portable between models, build_diet_model and the model template use
+    # the same variable names
+    return {
+        variable.name: variable.varValue
+        for variable in food_vars.values()
+        if variable.varValue is not None
+    }
+
+
+class SolverJob:
+    """
+    Build and solve a diet model in the solver worker pool.
+
+    CBC runs as a subprocess whose log is parsed for the progress, so a
+    job can report the incumbent objective and gap while it runs and can be
+    cancelled by killing the subprocess.
+
+    Parameters:
+    - build_model (callable): Returns (model, normalized_df, food_vars),
+      e.g. src.nutrition.optimization.build_diet_model.
+    - time_limit (float): Seconds after which CBC stops with its best
+      solution, None for no limit.
+    - start_values (dict): Variable name to value, passed to CBC as a start
+      solution, e.g. the previous mealplan. See solution_values.
+    - options (list): Further CBC command line arguments, e.g.
+      ["-cuts", "off"].
+    - lock (threading.Lock): Held while the model is built and solved, for
+      jobs sharing one model, see src/nutrition/model_template.py.
+    - telemetry (TelemetryStore): Records the finished solve, see
+      src/nutrition/solver_telemetry.py.
+    - telemetry_source (str): What started the job, recorded with it.
+    """
+
+    def __init__(
+        self,
+        build_model,
+        *args,
+        time_limit=None,
+        start_values=None,
+        options=None,
+        lock=None,
+        telemetry=None,
+        telemetry_source="app",
+        **kwargs,
+    ):
+        self.build_model = build_model
+        self.args = args
+        self.kwargs = kwargs
+        self.time_limit = time_limit
+        self.start_values = start_values
+        self.options = list(options or [])
+        self.model_lock = lock
+        self.telemetry = telemetry
+        self.telemetry_source = telemetry_source
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._process = None
+        self._progress = {"state": QUEUED}
+        self._start_time = None
+        self._future = None
+        # The build and solve are traced as their own request
+        self.trace = Trace("solver job", time_limit=time_limit)
+
+    def start(self, executor=None):
+        self._future = (executor or get_solver_executor()).submit(
+            run_in_trace, self.trace, self._run
+        )
+        return self
+
+    @property
+    def progress(self):
+        # Snapshot of the state, model size, incumbent, bound, gap and elapsed time
+        with self._lock:
+            progress = dict(self._progress)
+        if self._start_time is not None and "elapsed" not in progress:
+            progress["elapsed"] = time.monotonic() - self._start_time
+        progress["gap"] = relative_gap(progress.get("incumbent"), progress.get("bound"))
+        return progress
+
+    def done(self):
+        return self._future is not None and self._future.done()
+
+    def result(self, timeout=None):
+        """
+        Returns:
+        - dict: "normalized_df", "food_vars", the pulp "status" and
+          "solution_status" strings, None if the job was cancelled. A solve
+          stopped by the time limit has the solution status
+          "Solution Found" instead of "Optimal Solution Found".
+        """
+        return self._future.result(timeout=timeout)
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def _update(self, **values):
+        with self._lock:
+            self._progress.update(values)
+
+    def _finish(self, state, **values):
+        self._update(state=state, elapsed=time.monotonic() - self._start_time, **values)
+
+    def _run(self):
+        self._start_time = time.monotonic()
+        if self._cancelled.is_set():
+            self._finish(CANCELLED)
+            return None
+        try:
+            with self.model_lock or nullcontext():
+                self._update(state=BUILDING)
+                model, normalized_df, food_vars = self.build_model(
+                    *self.args, **self.kwargs
+                )
+                build_seconds = time.monotonic() - self._start_time
+                self._update(
+                    state=SOLVING,
+                    rows=len(model.constraints),
+                    columns=len(model.variables()),
+                )
+                with span("cbc_solve"):
+                    solved = self._solve(model)
+                solve_seconds = time.monotonic() - self._start_time - build_seconds
+                solve_fields = None
+                if solved is not None and self.telemetry is not None:
+                    # Read while holding the lock, the next job changes a
+                    # shared model. The hashes and the write happen after it
+                    solve_fields = read_solve(model, solved[1])
+        except Exception as e:
+            self._finish(FAILED, error=str(e))
+            raise
+
+        if solve_fields is not None:
+            self._record_telemetry(solve_fields, solved, build_seconds, solve_seconds)
+
+        if solved is None:
+            self._finish(CANCELLED)
+            return None
+        status, solution_status = solved
+        self._finish(FINISHED, status=status, solution_status=solution_status)
+        return {
+            "normalized_df": normalized_df,
+            "food_vars": food_vars,
+            "status": status,
+            "solution_status": solution_status,
+        }
+
+    def _record_telemetry(self, solve_fields, solved, build_seconds, solve_seconds):
+        progress = self.progress
+        record_solve(
+            self.telemetry,
+            self.telemetry_source,
+            None,
+            build_settings(self.build_model, self.args, self.kwargs),
+            status=solved[0],
+            solution_status=solved[1],
+            build_seconds=build_seconds,
+            solve_seconds=solve_seconds,
+            nodes=progress.get("nodes"),
+            gap=progress["gap"],
+            time_limit=self.time_limit,
+            warm_start=self.start_values,
+            solve_fields=solve_fields,
+        )
+
+    def _solve(self, model):
+        # Mirrors PULP_CBC_CMD.solve_CBC, but keeps the process handle and log
+        import pulp as pl
+
+        solver = pl.PULP_CBC_CMD(msg=False)
+        tmp_mps, tmp_sol, tmp_mst = solver.create_tmp_files(
+            model.name, "mps", "sol", "mst"
+        )
+        variables, variable_names, constraint_names, _ = model.writeMPS(
+            tmp_mps, rename=1
+        )
+        # CBC block-buffers its log when writing to a pipe, stdbuf makes the
+        # progress arrive line by line where it is available
+        args = [solver.path, tmp_mps]
+        if shutil.which("stdbuf"):
+            args = ["stdbuf", "-oL"] + args
+        if self.start_values:
+            for variable in variables:
+                variable.varValue = self.start_values.get(variable.name, 0)
+            solver.writesol(tmp_mst, model, variables, variable_names, constraint_names)
+            args += ["-mips", tmp_mst]
+        if self.time_limit is not None:
+            args += ["-sec", str(self.time_limit)]
+        args += self.options
+        args += ["-branch", "-printingOptions", "all", "-solution", tmp_sol]
+
+        try:
+            with self._lock:
+                if self._cancelled.is_set():
+                    return None
+                self._process = subprocess.Popen(
+                    args,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    stdin=subprocess.DEVNULL,
+                    text=True,
+                )
+            for line in self._process.stdout:
+                progress = parse_cbc_progress(line)
+                if progress:
+                    self._update(**progress)
+            self._process.wait()
+
+            if self._cancelled.is_set():
+                return None
+            if not os.path.exists(tmp_sol):
+                raise pl.PulpSolverError(
+                    f"CBC exited with code {self._process.returncode} without a solution"
+                )
+            status, values, _, _, _, sol_status = solver.readsol_MPS(
+                tmp_sol, model, variables, variable_names, constraint_names
+            )
+            model.assignVarsVals(values)
+            model.assignStatus(status, sol_status)
+            return pl.LpStatus[model.status], pl.LpSolution[model.sol_status]
+        finally:
+            solver.delete_tmp_files(tmp_mps, tmp_sol, tmp_mst)
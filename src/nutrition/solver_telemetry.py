@@ -0,0 +1,374 @@
+"""
+Solver telemetry in a local SQLite database, one row per solve.
+
+Every solve of the app, the service and the batch runner can record the
+model size, the solver status, the build and solve time, the CBC node
+count and gap and a hash of its inputs. The report functions summarize
+the solve times over time, per code version or dataset, and find the
+outliers and the configurations that are slow to solve.
+
+Print a report from the repository root:
+    python -m src.nutrition.solver_telemetry --by code_version
+"""
+
+import argparse
+import inspect
+import logging
+import os
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from src.utils.hashing import hash_dataframe, hash_values
+
+DEFAULT_TELEMETRY_PATH = "output/telemetry/solver_telemetry.sqlite"
+COLUMNS = {
+    "recorded_at": "REAL",  # unix time
+    "source": "TEXT",  # app, live, service, batch, ...
+    "input_hash": "TEXT",  # goals, factors, budget and food constraints
+    "dataset_hash": "TEXT",
+    "code_version": "TEXT",
+    "variables": "INTEGER",
+    "integer_variables": "INTEGER",
+    "constraints": "INTEGER",
+    "nonzeros": "INTEGER",
+    "status": "TEXT",
+    "solution_status": "TEXT",
+    "objective": "REAL",
+    "build_seconds": "REAL",
+    "solve_seconds": "REAL",
+    "nodes": "INTEGER",
+    "gap": "REAL",
+    "time_limit": "REAL",
+    "warm_start": "INTEGER",
+}
+
+logger = logging.getLogger(__name__)
+
+_telemetry_stores = {}
+_telemetry_stores_lock = threading.Lock()
+_code_version = None
+# Hashes of the loaded catalogs by id, removed with the catalog
+_dataset_hashes = {}
+
+
+class TelemetryStore:
+    """
+    SQLite table of solves, safe to share between threads and processes.
+
+    Every record opens its own short connection, the database runs in WAL
+    mode so the app and the service workers can write at the same time.
+
+    Parameters:
+    - path (str): The database file, created with its directory if missing.
+    """
+
+    def __init__(self, path=DEFAULT_TELEMETRY_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = ", ".join(f"{name} {kind}" for name, kind in COLUMNS.items())
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS solves (id INTEGER PRIMARY KEY, {columns})"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS solves_recorded_at ON solves (recorded_at)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, **values):
+        unknown = set(values) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown telemetry columns: {', '.join(sorted(unknown))}")
+        values.setdefault("recorded_at", time.time())
+        names = list(values)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    f"INSERT INTO solves ({', '.join(names)}) "
+                    f"VALUES ({', '.join('?' * len(names))})",
+                    [values[name] for name in names],
+                )
+        finally:
+            connection.close()
+
+    def load(self, since=None):
+        """
+        Returns:
+        - pd.DataFrame: The recorded solves, recorded after the unix time
+          since if given, with recorded_at as a datetime column.
+        """
+        query = "SELECT * FROM solves"
+        params = []
+        if since is not None:
+            query += " WHERE recorded_at >= ?"
+            params.append(since)
+        connection = self._connect()
+        try:
+            df = pd.read_sql_query(
+                query + " ORDER BY recorded_at", connection, params=params
+            )
+        finally:
+            connection.close()
+        df["recorded_at"] = pd.to_datetime(df["recorded_at"], unit="s")
+        return df
+
+
+def get_telemetry_store(path=DEFAULT_TELEMETRY_PATH):
+    # One store per database and process
+    with _telemetry_stores_lock:
+        if path not in _telemetry_stores:
+            _telemetry_stores[path] = TelemetryStore(path)
+        return _telemetry_stores[path]
+
+
+def code_version():
+    # The git revision of the code, read once per process
+    global _code_version
+    if _code_version is None:
+        try:
+            _code_version = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            _code_version = "unknown"
+    return _code_version
+
+
+def model_statistics(model):
+    """
+    Returns:
+    - dict: Number of variables, integer variables, constraints and
+      non-zero coefficients of the constraints of a pulp model.
+    """
+    variables = model.variables()
+    return {
+        "variables": len(variables),
+        "integer_variables": sum(variable.cat == "Integer" for variable in variables),
+        "constraints": len(model.constraints),
+        "nonzeros": sum(len(constraint) for constraint in model.constraints.values()),
+    }
+
+
+def dataset_hash(df):
+    # Hashed once per loaded catalog, a catalog is not changed after loading
+    key = id(df)
+    hashed = _dataset_hashes.get(key)
+    if hashed is None:
+        hashed = hash_dataframe(df)[:16]
+        _dataset_hashes[key] = hashed
+        weakref.finalize(df, _dataset_hashes.pop, key, None)
+    return hashed
+
+
+def input_hashes(settings):
+    """
+    Hash the inputs of a solve, the catalog separately so a changed dataset
+    can be told apart from changed user settings.
+
+    Parameters:
+    - settings (dict): The keyword arguments of build_diet_model.
+
+    Returns:
+    - dict: "input_hash" and "dataset_hash".
+    """
+    settings = dict(settings)
+    df = settings.pop("df", None)
+    return {
+        "input_hash": hash_values(settings)[:16],
+        "dataset_hash": dataset_hash(df) if df is not None else None,
+    }
+
+
+def build_settings(build_model, args, kwargs):
+    # The arguments of a build_diet_model call by name, however it was called
+    return dict(inspect.signature(build_model).bind_partial(*args, **kwargs).arguments)
+
+
+def solve_with_statistics(model, time_limit=None):
+    """
+    Solve a model with CBC and read the node count and bound from its log.
+
+    Returns:
+    - dict: "nodes" and "gap" of the solve, None if not in the log.
+    """
+    import pulp as pl
+
+    # solver_jobs records its solves with this module
+    from src.nutrition.solver_jobs import parse_cbc_progress, relative_gap
+
+    log_file, log_path = tempfile.mkstemp(suffix=".log")
+    os.close(log_file)
+    try:
+        model.solve(pl.PULP_CBC_CMD(msg=False, timeLimit=time_limit, logPath=log_path))
+        progress = {}
+        with open(log_path, "r") as file:
+            for line in file:
+                progress.update(parse_cbc_progress(line))
+    finally:
+        os.remove(log_path)
+    return {
+        "nodes": progress.get("nodes"),
+        "gap": relative_gap(progress.get("incumbent"), progress.get("bound")),
+    }
+
+
+def read_solve(model, solution_status):
+    """
+    The objective and size of a solved model, see record_solve.
+
+    Returns:
+    - dict: The objective (None without a solution) and model_statistics.
+    """
+    objective = None
+    if solution_status in ("Optimal Solution Found", "Solution Found"):
+        objective = model.objective.value()
+    return dict(objective=objective, **model_statistics(model))
+
+
+def record_solve(
+    store,
+    source,
+    model,
+    settings,
+    status,
+    solution_status,
+    build_seconds,
+    solve_seconds,
+    nodes=None,
+    gap=None,
+    time_limit=None,
+    warm_start=False,
+    solve_fields=None,
+):
+    """
+    Record a solve, errors are logged and never raised so telemetry cannot
+    break a solve.
+
+    Parameters:
+    - store (TelemetryStore): Where the solve is recorded, nothing is
+      recorded if None.
+    - source (str): What started the solve, e.g. "app" or "service".
+    - model (pulp.LpProblem): The solved model, None with solve_fields.
+    - settings (dict): The keyword arguments of build_diet_model.
+    - solve_fields (dict): read_solve of the model, for a model shared with
+      other solves that was read right after its solve. The model is not
+      read again then.
+    """
+    if store is None:
+        return
+    try:
+        if solve_fields is None:
+            solve_fields = read_solve(model, solution_status)
+        store.record(
+            source=source,
+            code_version=code_version(),
+            status=status,
+            solution_status=solution_status,
+            build_seconds=build_seconds,
+            solve_seconds=solve_seconds,
+            nodes=nodes,
+            gap=gap,
+            time_limit=time_limit,
+            warm_start=int(bool(warm_start)),
+            **solve_fields,
+            **input_hashes(settings),
+        )
+    except Exception:
+        logger.exception("Failed to record the solver telemetry")
+
+
+def telemetry_percentiles(df, column="solve_seconds", by="D"):
+    """
+    Percentiles of a telemetry column over time or per group.
+
+    Parameters:
+    - by (str): A pandas frequency like "D" or "W" to group by the time of
+      the solves, or a column like "code_version" or "dataset_hash".
+
+    Returns:
+    - pd.DataFrame: Number of solves, p50, p90, p99 and max per group.
+    """
+    if by in df.columns:
+        groups = df.groupby(by, sort=False)[column]
+    else:
+        groups = df.set_index("recorded_at")[column].resample(by)
+    summary = groups.agg(
+        solves="count",
+        p50=lambda values: values.quantile(0.5),
+        p90=lambda values: values.quantile(0.9),
+        p99=lambda values: values.quantile(0.99),
+        max="max",
+    )
+    return summary[summary["solves"] > 0]
+
+
+def telemetry_outliers(df, column="solve_seconds", threshold=3.5):
+    """
+    Solves far slower than usual, by the robust z-score of the log solve
+    time, as solve times are heavily skewed.
+
+    Returns:
+    - pd.DataFrame: The outlying solves, slowest first, with their "score".
+    """
+    values = np.log(df[column].clip(lower=1e-3))
+    median = values.median()
+    mad = (values - median).abs().median()
+    if not mad > 0:
+        return df.iloc[:0].assign(score=pd.Series(dtype=float))
+    scores = 0.6745 * (values - median) / mad
+    outliers = df.assign(score=scores)[scores > threshold]
+    return outliers.sort_values(column, ascending=False)
+
+
+def slowest_configurations(df, column="solve_seconds", top=10):
+    """
+    Returns:
+    - pd.DataFrame: The input hashes with the slowest median solve time,
+      with their number of solves, worst time, mean gap and statuses.
+    """
+    grouped = df.groupby("input_hash")
+    summary = pd.DataFrame(
+        {
+            "solves": grouped.size(),
+            "median": grouped[column].median(),
+            "max": grouped[column].max(),
+            "mean_gap": grouped["gap"].mean(),
+            "statuses": grouped["status"].agg(lambda s: ", ".join(sorted(set(s)))),
+        }
+    )
+    return summary.sort_values("median", ascending=False).head(top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the solver telemetry.")
+    parser.add_argument("--path", type=str, default=DEFAULT_TELEMETRY_PATH)
+    parser.add_argument("--by", type=str, default="D", help="Frequency or column")
+    parser.add_argument("--days", type=float, default=None, help="Only recent solves")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days else None
+    df = TelemetryStore(args.path).load(since=since)
+    print(f"{len(df)} solves\n")
+    if len(df):
+        print(telemetry_percentiles(df, by=args.by).to_string(), "\n")
+        print("Outliers:")
+        print(telemetry_outliers(df).to_string(), "\n")
+        print("Slowest configurations:")
+        print(slowest_configurations(df).to_string())
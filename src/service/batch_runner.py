@@ -0,0 +1,244 @@
+"""
+Optimize many user profiles without the Streamlit app, e.g. for nightly
+plan generation.
+
+Profiles are read from a JSONL file (one profile per line) or from a
+directory of .json files (one profile per file). A profile has the fields of
+DEFAULT_PROFILE in src/service/optimization_worker.py and an optional
+"name" used for its output files.
+
+Run from the repository root:
+    python -m src.service.batch_runner --profiles profiles.jsonl --workers 4 --xlsx
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.nutrition.solver_telemetry import DEFAULT_TELEMETRY_PATH
+from src.service.optimization_worker import (
+    catalog_food_names,
+    init_worker,
+    optimize_profile,
+    parse_profile,
+)
+
+DEFAULT_OUTPUT_DIR = "output/batch"
+
+
+def decode_profile(text):
+    # A profile that is not valid JSON fails on its own, not the whole batch
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+
+def read_profiles(path):
+    """
+    Returns:
+    - list: (name, payload) of every profile in the JSONL file or directory,
+      the names are unique. The payload of a profile that is not valid JSON
+      is the ValueError, see run_batch.
+    """
+    if os.path.isdir(path):
+        profiles = []
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(path, file_name), "r") as file:
+                    payload = decode_profile(file.read())
+                profiles.append((os.path.splitext(file_name)[0], payload))
+    else:
+        with open(path, "r") as file:
+            profiles = [
+                (f"profile_{line_idx}", decode_profile(line))
+                for line_idx, line in enumerate(file, start=1)
+                if line.strip()
+            ]
+    # A name in the profile overrides the file name or line number, it is
+    # used in file names so only word characters, dots and dashes are kept
+    named_profiles = []
+    used_names = set()
+    for name, payload in profiles:
+        name = re.sub(
+            r"[^\w.-]",
+            "_",
+            str(payload.pop("name", name) if isinstance(payload, dict) else name),
+        )
+        # Profiles sharing a name would overwrite each other's outputs, the
+        # later ones are numbered
+        unique_name = name
+        suffix = 2
+        while unique_name in used_names:
+            unique_name = f"{name}_{suffix}"
+            suffix += 1
+        used_names.add(unique_name)
+        named_profiles.append((unique_name, payload))
+    return named_profiles
+
+
+def write_plan_outputs(name, result, output_dir, xlsx=False):
+    # Plan and totals as CSV, everything as JSON and optionally one workbook
+    plan_df = pd.DataFrame(result["plan"], columns=["food", "quantity_g", "price_eur"])
+    totals_df = pd.DataFrame(
+        [
+            {"category": category, "nutrient": nutrient, "total": total}
+            for category, nutrients in result["totals"].items()
+            for nutrient, total in nutrients.items()
+        ],
+        columns=["category", "nutrient", "total"],
+    )
+    plan_df.to_csv(os.path.join(output_dir, f"{name}_plan.csv"), index=False)
+    totals_df.to_csv(os.path.join(output_dir, f"{name}_totals.csv"), index=False)
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as file:
+        json.dump(result, file, indent=2)
+    if xlsx:
+        with pd.ExcelWriter(os.path.join(output_dir, f"{name}.xlsx")) as writer:
+            plan_df.to_excel(writer, sheet_name="Plan", index=False)
+            totals_df.to_excel(writer, sheet_name="Totals", index=False)
+    return plan_df
+
+
+def error_row(name, error):
+    return {"name": name, "status": "Error", "error": str(error), "seconds": 0}
+
+
+def run_profile(name, payload, output_dir, time_limit=None, xlsx=False):
+    """
+    Optimize one profile in a worker process and write its outputs.
+
+    Returns:
+    - dict: The summary row of the profile.
+    """
+    start = time.perf_counter()
+    try:
+        profile = parse_profile(payload, catalog_food_names())
+        result = optimize_profile(
+            profile, time_limit=time_limit, telemetry_source="batch"
+        )
+    except Exception as e:
+        return error_row(name, e)
+
+    row = {
+        "name": name,
+        "status": result["status"],
+        "solution_status": result["solution_status"],
+        "objective": result["objective"],
+    }
+    if result["status"] == "Optimal":
+        plan_df = write_plan_outputs(name, result, output_dir, xlsx=xlsx)
+        row["foods"] = len(plan_df)
+        row["price_eur"] = plan_df["price_eur"].sum()
+        row["energy_kcal"] = result["totals"]["Energy"]["Energy [KCAL]"]
+    row.update(
+        {f"{step}_seconds": seconds for step, seconds in result["timings"].items()}
+    )
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def run_batch(
+    profiles,
+    data_path,
+    output_dir,
+    workers=2,
+    time_limit=None,
+    xlsx=False,
+    telemetry_path=None,
+):
+    """
+    Optimize the profiles in parallel, each worker process loads the catalog
+    once and reuses one model template for all of its profiles.
+
+    Returns:
+    - pd.DataFrame: One summary row per profile, also written to
+      summary.csv in output_dir. The solves are recorded in the
+      telemetry database at telemetry_path if given.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rows = [None] * len(profiles)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(data_path, telemetry_path),
+    ) as executor:
+        futures = {}
+        for profile_idx, (name, payload) in enumerate(profiles):
+            if isinstance(payload, ValueError):
+                rows[profile_idx] = error_row(name, payload)
+                print(f"{name}: Error ({payload})")
+                continue
+            future = executor.submit(
+                run_profile, name, payload, output_dir, time_limit, xlsx
+            )
+            futures[future] = profile_idx
+        for future in as_completed(futures):
+            row = future.result()
+            # The summary keeps the order of the profiles
+            rows[futures[future]] = row
+            print(f"{row['name']}: {row['status']} ({row['seconds']:.2f} s)")
+
+    summary_df = pd.DataFrame(rows)
+    summary_df.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    return summary_df
+
+
+def format_batch_summary(summary_df, wall_seconds):
+    latencies = summary_df.loc[summary_df["status"] != "Error", "seconds"].to_numpy()
+    lines = [
+        f"Profiles: {len(summary_df)} "
+        f"({(summary_df['status'] == 'Optimal').sum()} optimal, "
+        f"{(summary_df['status'] == 'Error').sum()} errors)",
+        f"Wall time: {wall_seconds:.2f} s, "
+        f"throughput: {len(summary_df) / wall_seconds:.2f} profiles/s",
+    ]
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        lines.append(
+            f"Latency per profile: p50 {p50:.2f} s, p90 {p90:.2f} s, "
+            f"p99 {p99:.2f} s, max {latencies.max():.2f} s"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize a batch of profiles.")
+    parser.add_argument(
+        "--profiles",
+        type=str,
+        required=True,
+        help="JSONL file or directory of .json profiles",
+    )
+    parser.add_argument("--data_path", type=str, default="data/nutrition_data.csv")
+    parser.add_argument("--output_dir", type=str, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--time_limit", type=float, default=300, help="Seconds per profile"
+    )
+    parser.add_argument("--xlsx", action="store_true", help="Also write workbooks")
+    parser.add_argument(
+        "--telemetry_path",
+        type=str,
+        default=DEFAULT_TELEMETRY_PATH,
+        help="SQLite database the solves are recorded in, empty to disable",
+    )
+    args = parser.parse_args()
+
+    profiles = read_profiles(args.profiles)
+    start = time.perf_counter()
+    summary_df = run_batch(
+        profiles,
+        args.data_path,
+        args.output_dir,
+        workers=args.workers,
+        time_limit=args.time_limit,
+        xlsx=args.xlsx,
+        telemetry_path=args.telemetry_path or None,
+    )
+    print(format_batch_summary(summary_df, time.perf_counter() - start))
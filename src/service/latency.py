@@ -0,0 +1,65 @@
+import bisect
+import threading
+
+# Upper bucket bounds in milliseconds, the last bucket holds everything above
+DEFAULT_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class LatencyHistogram:
+    """
+    Thread-safe histogram of request latencies with fixed buckets.
+
+    Parameters:
+    - buckets_ms (list): Sorted upper bounds of the buckets in milliseconds.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = list(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._sum_ms = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets_ms, milliseconds)] += 1
+            self._sum_ms += milliseconds
+            self._count += 1
+
+    def percentile(self, q):
+        # Upper bound of the bucket the q-th latency falls into
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets_ms + [None], counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        """
+        Returns:
+        - dict: The count per bucket ("le" None for the overflow bucket),
+          the total count, the mean and the p50, p90 and p99 bucket bounds.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            sum_ms = self._sum_ms
+        return {
+            "buckets": [
+                {"le_ms": bound, "count": bucket_count}
+                for bound, bucket_count in zip(self.buckets_ms + [None], counts)
+            ],
+            "count": count,
+            "mean_ms": sum_ms / count if count else None,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+        }
@@ -0,0 +1,244 @@
+import time
+
+import pandas as pd
+import pulp as pl
+
+from src.nutrition.formulas import calculate_nutrient_goals
+from src.nutrition.model_template import DietModelTemplate
+from src.nutrition.optimization import create_absolute_optimization_results_summary
+from src.nutrition.solver_telemetry import (
+    get_telemetry_store,
+    record_solve,
+    solve_with_statistics,
+)
+
+# The defaults of the Mealplan Generator page
+DEFAULT_PROFILE = {
+    "gender": "male",
+    "age": 24,
+    "height": 180,
+    "weight": 86,
+    "calorie_adjustment": 0,
+    "activity_scale": 0.5,
+    "daily_food_budget": 10,
+    "cost_factor": 5,
+    "time_factor": 3,
+    "insulin_factor": 0,
+    "fullness_factor": 0,
+    "optimization_unit_size": 1,
+    "macro_tolerance": 0,
+    "micro_tolerance": 0,
+    "food_constraints": {},
+}
+NUMERIC_FIELDS = [
+    "age",
+    "height",
+    "weight",
+    "calorie_adjustment",
+    "activity_scale",
+    "daily_food_budget",
+    "cost_factor",
+    "time_factor",
+    "insulin_factor",
+    "fullness_factor",
+    "optimization_unit_size",
+    "macro_tolerance",
+    "micro_tolerance",
+]
+
+# Every worker process loads the catalog once and keeps one model template
+_catalog = None
+_food_names = None
+_model_template = None
+_telemetry = None
+
+
+def load_catalog(data_path):
+    df = pd.read_csv(data_path)
+    df.columns = pd.MultiIndex.from_tuples([tuple(c.split(".")) for c in df.columns])
+    return df
+
+
+def init_worker(data_path, telemetry_path=None):
+    # Initializer of the worker processes, solves are recorded in the
+    # telemetry database if a path is given
+    global _catalog, _food_names, _telemetry
+    _catalog = load_catalog(data_path)
+    _food_names = frozenset(_catalog[("Non Nutrient Data", "FDC Name")])
+    _telemetry = get_telemetry_store(telemetry_path) if telemetry_path else None
+
+
+def worker_ready():
+    return _catalog is not None
+
+
+def catalog_food_names():
+    # The names food_constraints may refer to, see parse_profile
+    return _food_names
+
+
+def parse_profile(payload, food_names=None):
+    """
+    Validate a user profile and fill in the defaults of missing fields.
+
+    Parameters:
+    - payload (dict): The profile fields, see DEFAULT_PROFILE.
+    - food_names (set): The foods of the catalog, food_constraints of other
+      foods are rejected. None skips the check.
+
+    Raises:
+    - ValueError: For unknown fields or foods and values of the wrong type.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The profile must be a JSON object")
+    unknown = set(payload) - set(DEFAULT_PROFILE)
+    if unknown:
+        raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+
+    profile = dict(DEFAULT_PROFILE, **payload)
+    for field in NUMERIC_FIELDS:
+        value = profile[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{field} must be a number")
+    if profile["gender"] not in ("male", "female"):
+        raise ValueError("gender must be 'male' or 'female'")
+    if profile["optimization_unit_size"] <= 0:
+        raise ValueError("optimization_unit_size must be positive")
+    if not isinstance(profile["food_constraints"], dict):
+        raise ValueError("food_constraints must map food names to [min, max]")
+    for food_name, limits in profile["food_constraints"].items():
+        if not isinstance(limits, (list, tuple)) or len(limits) != 2:
+            raise ValueError(f"The constraint of {food_name} must be [min, max]")
+    if food_names is not None:
+        unknown = set(profile["food_constraints"]) - set(food_names)
+        if unknown:
+            raise ValueError(
+                f"Unknown foods in food_constraints: {', '.join(sorted(unknown))}"
+            )
+    return profile
+
+
+def get_model_template(df, optimization_unit_size, rdi_dict):
+    # Rebuilt only for another unit size or set of constrained nutrients
+    global _model_template
+    if _model_template is None or not _model_template.matches(
+        df, optimization_unit_size, rdi_dict
+    ):
+        _model_template = DietModelTemplate(df, optimization_unit_size, rdi_dict)
+    return _model_template
+
+
+def summarize_plan(df, rdi_dict, food_vars, optimization_unit_size):
+    """
+    Returns:
+    - tuple: The foods of the plan with their quantity and price, and the
+      nutrient totals of the plan by category like the rdi_dict.
+    """
+    absolute_results_df = create_absolute_optimization_results_summary(
+        df, rdi_dict, food_vars, optimization_unit_size
+    )
+    plan = []
+    totals = {}
+    if absolute_results_df.empty:
+        return plan, totals
+
+    quantities = absolute_results_df[("Non Nutrient Data", "Optimal Quantity")]
+    grams = quantities * optimization_unit_size
+    prices = grams * absolute_results_df[("Non Nutrient Data", "Price per 100g")] / 100
+    for name, quantity, price in zip(
+        absolute_results_df[("Non Nutrient Data", "FDC Name")], grams, prices
+    ):
+        plan.append(
+            {"food": name, "quantity_g": float(quantity), "price_eur": float(price)}
+        )
+
+    for category, nutrient in absolute_results_df.columns:
+        if category != "Non Nutrient Data":
+            totals.setdefault(category, {})[nutrient] = float(
+                absolute_results_df[(category, nutrient)].sum()
+            )
+    return plan, totals
+
+
+def optimize_profile(profile, time_limit=None, df=None, telemetry_source="service"):
+    """
+    Compute the nutrient goals of a profile and the optimal mealplan for them.
+
+    Parameters:
+    - profile (dict): A profile returned by parse_profile.
+    - time_limit (float): Seconds after which CBC stops with its best plan.
+    - df (pd.DataFrame): The catalog, the one of the worker process if None.
+    - telemetry_source (str): Recorded with the solve if the worker process
+      has a telemetry database.
+
+    Returns:
+    - dict: The solver status, objective, plan, nutrient totals, goals and
+      the seconds spent in every step.
+    """
+    df = _catalog if df is None else df
+    timings = {}
+    start = time.perf_counter()
+
+    rdi_dict = calculate_nutrient_goals(
+        weight=profile["weight"],
+        height=profile["height"],
+        age=profile["age"],
+        calorie_adjustment=profile["calorie_adjustment"],
+        activity_scale=profile["activity_scale"],
+        gender=profile["gender"],
+    )
+    timings["goals"] = time.perf_counter() - start
+
+    step_start = time.perf_counter()
+    template = get_model_template(df, profile["optimization_unit_size"], rdi_dict)
+    settings = dict(
+        daily_food_budget=profile["daily_food_budget"],
+        cost_factor=profile["cost_factor"],
+        time_factor=profile["time_factor"],
+        insulin_factor=profile["insulin_factor"],
+        fullness_factor=profile["fullness_factor"],
+        df=df,
+        rdi_dict=rdi_dict,
+        food_constraints=profile["food_constraints"],
+        optimization_unit_size=profile["optimization_unit_size"],
+        macro_tolerance=profile["macro_tolerance"],
+        micro_tolerance=profile["micro_tolerance"],
+    )
+    model, _, food_vars = template.build_model(**settings)
+    timings["build"] = time.perf_counter() - step_start
+
+    step_start = time.perf_counter()
+    statistics = solve_with_statistics(model, time_limit=time_limit)
+    timings["solve"] = time.perf_counter() - step_start
+    record_solve(
+        _telemetry,
+        telemetry_source,
+        model,
+        settings,
+        status=pl.LpStatus[model.status],
+        solution_status=pl.LpSolution[model.sol_status],
+        build_seconds=timings["build"],
+        solve_seconds=timings["solve"],
+        time_limit=time_limit,
+        **statistics,
+    )
+
+    step_start = time.perf_counter()
+    status = pl.LpStatus[model.status]
+    plan, totals = [], {}
+    if status == "Optimal":
+        plan, totals = summarize_plan(
+            df, rdi_dict, food_vars, profile["optimization_unit_size"]
+        )
+    timings["summary"] = time.perf_counter() - step_start
+    timings["total"] = time.perf_counter() - start
+
+    return {
+        "status": status,
+        "solution_status": pl.LpSolution[model.sol_status],
+        "objective": pl.value(model.objective) if status == "Optimal" else None,
+        "plan": plan,
+        "totals": totals,
+        "goals": rdi_dict,
+        "timings": timings,
+    }
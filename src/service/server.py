@@ -0,0 +1,246 @@
+"""
+Headless HTTP/JSON service around the diet optimization.
+
+Endpoints:
+- POST /optimize: A user profile (see DEFAULT_PROFILE in
+  src/service/optimization_worker.py) with an optional "time_limit" in
+  seconds. Returns the plan, nutrient totals, goals and timings.
+- GET /metrics/latency: Latency histogram of the /optimize requests.
+- GET /health: Worker pool size and the requests in flight.
+
+Run from the repository root:
+    python -m src.service.server --config config/service_config.yaml
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+from src.service.latency import LatencyHistogram
+from src.service.optimization_worker import (
+    catalog_food_names,
+    init_worker,
+    optimize_profile,
+    parse_profile,
+    worker_ready,
+)
+
+MAX_BODY_BYTES = 1024 * 1024
+# Extra seconds for CBC to write its solution after the time limit
+TIMEOUT_GRACE = 5
+
+
+class OptimizationService:
+    """
+    Process pool running the optimizations, with admission control.
+
+    At most workers requests run and max_queue wait, further requests are
+    rejected right away instead of queuing without bound. A request is only
+    submitted once a worker is free, so its time limit starts when it runs.
+    A request that waits longer than request_timeout for a worker, or runs
+    longer than its time limit, is answered with a timeout. CBC stops at the
+    same time limit so the worker is free again shortly after.
+
+    Parameters:
+    - data_path (str): The food catalog, loaded once per worker process.
+    - workers (int): Number of worker processes.
+    - max_queue (int): Requests that may wait for a free worker.
+    - request_timeout (float): Maximum seconds per request.
+    - telemetry_path (str): SQLite database the solves are recorded in, see
+      src/nutrition/solver_telemetry.py. None records nothing.
+    """
+
+    def __init__(
+        self,
+        data_path,
+        workers=2,
+        max_queue=8,
+        request_timeout=60,
+        telemetry_path=None,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(data_path, telemetry_path),
+        )
+        # Start the workers and load the catalog before the first request
+        for future in [self.executor.submit(worker_ready) for _ in range(workers)]:
+            future.result()
+        self.food_names = self.executor.submit(catalog_food_names).result()
+        self.latency = LatencyHistogram()
+        self.responses = {}
+        self._admission = threading.BoundedSemaphore(workers + max_queue)
+        self._free_workers = threading.BoundedSemaphore(workers)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._admission.release()
+
+    def _worker_done(self, future):
+        # Called when the worker is done, also for requests that timed out
+        self._free_workers.release()
+        self._release()
+
+    def _record(self, status_code, start):
+        self.latency.observe(time.perf_counter() - start)
+        with self._lock:
+            self.responses[status_code] = self.responses.get(status_code, 0) + 1
+
+    def optimize(self, payload):
+        """
+        Returns:
+        - tuple: The HTTP status code and the JSON response body.
+        """
+        start = time.perf_counter()
+        try:
+            if not isinstance(payload, dict):
+                raise ValueError("The request must be a JSON object")
+            payload = dict(payload)
+            time_limit = payload.pop("time_limit", self.request_timeout)
+            if not isinstance(time_limit, (int, float)) or time_limit <= 0:
+                raise ValueError("time_limit must be a positive number")
+            profile = parse_profile(payload, self.food_names)
+        except ValueError as e:
+            self._record(400, start)
+            return 400, {"error": str(e)}
+        time_limit = min(time_limit, self.request_timeout)
+
+        if not self._admission.acquire(blocking=False):
+            self._record(503, start)
+            return 503, {"error": "Too many requests, try again later"}
+        with self._lock:
+            self._in_flight += 1
+        # The time limit starts once a worker is free, a request still waiting
+        # after request_timeout is dropped before it reaches the pool
+        if not self._free_workers.acquire(timeout=self.request_timeout):
+            self._release()
+            self._record(504, start)
+            return 504, {
+                "error": f"No free worker within {self.request_timeout} seconds"
+            }
+        queue_seconds = time.perf_counter() - start
+        future = self.executor.submit(optimize_profile, profile, time_limit)
+        future.add_done_callback(self._worker_done)
+
+        try:
+            result = future.result(timeout=time_limit + TIMEOUT_GRACE)
+        except FutureTimeoutError:
+            self._record(504, start)
+            return 504, {"error": f"No result within {time_limit} seconds"}
+        except Exception as e:
+            self._record(500, start)
+            return 500, {"error": f"The optimization failed: {e}"}
+
+        result["timings"]["queue"] = queue_seconds
+        result["timings"]["request"] = time.perf_counter() - start
+        status_code = 200 if result["status"] == "Optimal" else 422
+        self._record(status_code, start)
+        return status_code, result
+
+    def health(self):
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "request_timeout": self.request_timeout,
+        }
+
+    def latency_metrics(self):
+        with self._lock:
+            responses = {str(code): count for code, count in self.responses.items()}
+        return dict(self.latency.snapshot(), responses=responses)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class OptimizationRequestHandler(BaseHTTPRequestHandler):
+    # The service is attached to the server, see create_server
+    def send_json(self, status_code, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self.send_json(200, service.health())
+        elif self.path == "/metrics/latency":
+            self.send_json(200, service.latency_metrics())
+        else:
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/optimize":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {"error": "Request body too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self.send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        status_code, body = self.server.service.optimize(payload)
+        headers = {"Retry-After": "1"} if status_code == 503 else None
+        self.send_json(status_code, body, headers)
+
+    def log_message(self, format, *args):
+        # Latencies are in /metrics/latency, keep stderr quiet
+        pass
+
+
+def create_server(service, host="127.0.0.1", port=8000):
+    server = ThreadingHTTPServer((host, port), OptimizationRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the optimization service.")
+    parser.add_argument("--config", type=str, default="config/service_config.yaml")
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as file:
+        config = yaml.safe_load(file)
+
+    service = OptimizationService(
+        config["data_path"],
+        workers=config["workers"],
+        max_queue=config["max_queue"],
+        request_timeout=config["request_timeout"],
+        telemetry_path=config["telemetry_path"],
+    )
+    server = create_server(service, config["host"], args.port or config["port"])
+    print(f"Serving on http://{config['host']}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
@@ -0,0 +1,132 @@
+import functools
+import importlib
+import io
+import logging
+import time
+
+from src.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def write_json(df, sheet_name=None):
+    # Compact records, one object per row
+    return df.to_json(orient="records", force_ascii=False).encode("utf-8")
+
+
+def write_parquet(df, sheet_name=None):
+    output = io.BytesIO()
+    df.to_parquet(output, index=False)
+    return output.getvalue()
+
+
+def write_constant_memory_xlsx(df, sheet_name="Sheet1"):
+    """
+    Plain xlsx with a bold header, written row by row with xlsxwriter in
+    constant memory mode. No images, tables or conditional formatting.
+    """
+    try:
+        import xlsxwriter
+    except ImportError as e:
+        raise ImportError(
+            "The xlsx_fast export format requires XlsxWriter: pip install XlsxWriter"
+        ) from e
+
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(
+        output, {"constant_memory": True, "in_memory": True, "nan_inf_to_errors": True}
+    )
+    ws = wb.add_worksheet(sheet_name)
+    ws.write_row(0, 0, list(df.columns), wb.add_format({"bold": True}))
+    for row_idx, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        ws.write_row(row_idx, 0, row)
+    wb.close()
+    return output.getvalue()
+
+
+# Data only formats, the styled workbooks are built by src.sheets.export_jobs.
+# Formats with "requires" need an optional package outside requirements.txt
+EXPORT_FORMATS = {
+    "json": {
+        "writer": write_json,
+        "suffix": "",
+        "extension": "json",
+        "mime": "application/json",
+    },
+    "parquet": {
+        "writer": write_parquet,
+        "suffix": "",
+        "extension": "parquet",
+        "mime": "application/vnd.apache.parquet",
+        "requires": "pyarrow",
+    },
+    "xlsx_fast": {
+        "writer": write_constant_memory_xlsx,
+        "suffix": "_data",
+        "extension": "xlsx",
+        "mime": XLSX_MIME,
+        "requires": "xlsxwriter",
+    },
+}
+STYLED_XLSX = "xlsx"
+
+
+@functools.lru_cache(maxsize=None)
+def export_format_available(export_format):
+    # Imported once per process, only for the formats that are configured
+    module = EXPORT_FORMATS.get(export_format, {}).get("requires")
+    if module is None:
+        return True
+    try:
+        importlib.import_module(module)
+    except Exception:
+        logger.warning(f"The {export_format} export needs {module}, it is hidden")
+        return False
+    return True
+
+
+def available_export_formats(export_formats):
+    # The configured formats without those whose optional package is missing
+    return [
+        export_format
+        for export_format in export_formats
+        if export_format == STYLED_XLSX or export_format_available(export_format)
+    ]
+
+
+def export_file_name(name, export_format):
+    # e.g. mealplan.xlsx, mealplan.json, mealplan_data.xlsx
+    if export_format == STYLED_XLSX:
+        return f"{name}.xlsx"
+    spec = EXPORT_FORMATS[export_format]
+    return f"{name}{spec['suffix']}.{spec['extension']}"
+
+
+def export_mime(export_format):
+    if export_format == STYLED_XLSX:
+        return XLSX_MIME
+    return EXPORT_FORMATS[export_format]["mime"]
+
+
+@traced()
+def write_table(df, export_format, sheet_name="Sheet1"):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {export_format}, expected one of "
+            f"{[STYLED_XLSX] + list(EXPORT_FORMATS)}"
+        )
+    return EXPORT_FORMATS[export_format]["writer"](df, sheet_name=sheet_name)
+
+
+def timed_export(build_export, *args, **kwargs):
+    """
+    Run an export builder and measure it.
+
+    Returns:
+    - dict: The exported bytes as "data" and the build time as "seconds".
+    """
+    start = time.perf_counter()
+    data = build_export(*args, **kwargs)
+    return {"data": data, "seconds": time.perf_counter() - start}
@@ -0,0 +1,178 @@
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.sheets.export_formats import STYLED_XLSX, timed_export, write_table
+from src.utils.hashing import hash_dataframe, hash_values
+from src.utils.lru_cache import BoundedCache
+from src.utils.tracing import Trace, run_in_trace, traced
+
+DEFAULT_EXPORT_WORKERS = 2
+DEFAULT_EXPORT_CACHE_BYTES = 64 * 1024 * 1024
+
+# One pool per process, shared by all sessions so concurrent users queue up
+# instead of spawning threads without bound
+_export_executor = None
+
+
+def get_export_executor(max_workers=DEFAULT_EXPORT_WORKERS):
+    global _export_executor
+    if _export_executor is None:
+        _export_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="export"
+        )
+    return _export_executor
+
+
+# Finished export bytes by plan hash, shared by all sessions of the process
+_export_cache = None
+_pending_exports = {}
+_pending_exports_lock = threading.Lock()
+
+
+def get_export_cache(max_bytes=DEFAULT_EXPORT_CACHE_BYTES):
+    global _export_cache
+    if _export_cache is None:
+        _export_cache = BoundedCache(
+            max_bytes=max_bytes, sizeof=lambda result: len(result["data"])
+        )
+    return _export_cache
+
+
+def export_cache_key(export_name, merged_df, **options):
+    """
+    Hash of everything an export depends on: the solution, the export
+    options (column configs, start date, ...) and the export type.
+    """
+    return hash_values(export_name, hash_dataframe(merged_df), options)
+
+
+@traced()
+def build_mealplan_export(
+    merged_df,
+    spreadsheet_columns,
+    output_path,
+    meal_targets,
+    meal_compatibility=None,
+    portions=4,
+    export_format=STYLED_XLSX,
+):
+    # The builders load openpyxl, PIL and requests, imported on the first
+    # export instead of at the start of every session
+    from src.sheets.mealplan_spreadsheet import (
+        create_mealplan_spreadsheet,
+        create_mealplan_table,
+    )
+
+    if export_format != STYLED_XLSX:
+        df = create_mealplan_table(
+            merged_df,
+            spreadsheet_columns=spreadsheet_columns,
+            meal_targets=meal_targets,
+            meal_compatibility=meal_compatibility,
+            portions=portions,
+        )
+        return write_table(df, export_format, sheet_name="Meal Plan")
+
+    wb = create_mealplan_spreadsheet(
+        merged_df,
+        spreadsheet_columns=spreadsheet_columns,
+        output_path=output_path,
+        meal_targets=meal_targets,
+        meal_compatibility=meal_compatibility,
+        portions=portions,
+    )
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+@traced()
+def build_shopping_list_export(
+    merged_df,
+    shopping_list_columns,
+    output_path,
+    image_options=None,
+    weeks=2,
+    start_date=None,
+    export_format=STYLED_XLSX,
+):
+    from src.sheets.shoppinglist_spreadsheet import (
+        create_shopping_list_sheet,
+        create_shopping_list_table,
+    )
+
+    if export_format != STYLED_XLSX:
+        # Data formats skip the images, the start date only names the sheets
+        df = create_shopping_list_table(
+            merged_df, shopping_list_columns=shopping_list_columns, weeks=weeks
+        )
+        return write_table(df, export_format, sheet_name="Shopping List")
+
+    wb_io = create_shopping_list_sheet(
+        merged_df,
+        shopping_list_columns=shopping_list_columns,
+        output_path=output_path,
+        image_options=image_options,
+        weeks=weeks,
+        start_date=start_date,
+    )
+    return wb_io.getvalue()
+
+
+def traced_export(build_export, *args, **kwargs):
+    """
+    Run timed_export as its own trace, the build outlives the rerun that
+    submitted it.
+
+    Returns:
+    - dict: The result of timed_export with the "trace" of the build.
+    """
+    trace = Trace("export", builder=build_export.__name__)
+    result = run_in_trace(trace, timed_export, build_export, *args, **kwargs)
+    return dict(result, trace=trace)
+
+
+def submit_export(build_export, *args, cache_key=None, **kwargs):
+    """
+    Start building an export in the background worker pool.
+
+    The builders must not call streamlit, they only return the file bytes.
+    Exports with a cache_key are served from the export cache, and concurrent
+    requests for the same key share one build.
+
+    Returns:
+    - concurrent.futures.Future: Resolves to a dict with the bytes of the
+      exported file as "data", the build time as "seconds" and the trace of
+      the build as "trace". Results of the export cache have "cached" set.
+    """
+    if cache_key is None:
+        return get_export_executor().submit(
+            traced_export, build_export, *args, **kwargs
+        )
+
+    export_cache = get_export_cache()
+    result = export_cache.get(cache_key)
+    if result is not None:
+        # Marked so the original build time is not shown as the current one
+        future = Future()
+        future.set_result(dict(result, cached=True))
+        return future
+
+    with _pending_exports_lock:
+        if cache_key in _pending_exports:
+            return _pending_exports[cache_key]
+
+        future = get_export_executor().submit(
+            traced_export, build_export, *args, **kwargs
+        )
+        _pending_exports[cache_key] = future
+
+    def store_export(future):
+        with _pending_exports_lock:
+            _pending_exports.pop(cache_key, None)
+        if future.exception() is None:
+            export_cache.put(cache_key, future.result())
+
+    future.add_done_callback(store_export)
+    return future
@@ -5,31 +5,61 @@ from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import Font, PatternFill
 from openpyxl.worksheet.table import Table, TableStyleInfo
 from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.utils import get_column_letter
 from openpyxl.chart import BarChart, Reference, Series
 from openpyxl.chart.label import DataLabelList
+from src.nutrition.meal_assignment import assign_meal_times
+from src.utils.tracing import traced
 
 # Load the data
 
 
-def create_mealplan_spreadsheet(optimization_path, spreadsheet_columns, output_path):
-    df = pd.read_csv(optimization_path)
-    df = df[spreadsheet_columns]
+@traced()
+def create_mealplan_table(
+    optimization_result,
+    spreadsheet_columns,
+    meal_targets,
+    meal_compatibility=None,
+    portions=4,
+):
+    # The merged optimization result as a DataFrame or the path of its csv
+    if not isinstance(optimization_result, pd.DataFrame):
+        optimization_result = pd.read_csv(optimization_result)
+    optimization_result = optimization_result.reset_index(drop=True)
+    df = optimization_result[spreadsheet_columns]
 
     # Rename columns by dropping the string before the '.'
     df.columns = [col.split(".")[-1] for col in df.columns]
     df.columns = ["Food", "KCAL", "C (g)", "P (g)", "F (g)"]
 
-    # Add a column for Meal Time
-    df["Meal Time"] = ""
+    # Split the foods over the meals to match the kcal and macro share of
+    # every meal, some food categories only fit certain meals
+    categories = optimization_result.get("Non Nutrient Data.Food Category")
+    return assign_meal_times(
+        df,
+        meal_targets=meal_targets,
+        meal_compatibility=meal_compatibility,
+        categories=categories,
+        portions=portions,
+    )
 
-    # Default assignment function
-    def default_assign_meal_time(df):
-        meal_times = ["Breakfast", "Lunch", "Dinner"]
-        for i in range(len(df)):
-            df.at[i, "Meal Time"] = meal_times[i % len(meal_times)]
 
-    # Assign default meal times
-    default_assign_meal_time(df)
+@traced()
+def create_mealplan_spreadsheet(
+    optimization_result,
+    spreadsheet_columns,
+    output_path,
+    meal_targets,
+    meal_compatibility=None,
+    portions=4,
+):
+    df = create_mealplan_table(
+        optimization_result,
+        spreadsheet_columns,
+        meal_targets=meal_targets,
+        meal_compatibility=meal_compatibility,
+        portions=portions,
+    )
 
     # Create a new Excel workbook and select the active worksheet
     wb = openpyxl.Workbook()
@@ -40,8 +70,8 @@ def create_mealplan_spreadsheet(optimization_path, spreadsheet_columns, output_p
     for r in dataframe_to_rows(df, index=False, header=True):
         ws.append(r)
 
-    # Define data validation for Meal Time
-    meal_times = ["Breakfast", "Lunch", "Dinner"]
+    # Define data validation for Meal Time, the meals of the meal targets
+    meal_times = list(meal_targets)
     dv = DataValidation(
         type="list", formula1='"{}"'.format(",".join(meal_times)), allow_blank=True
     )
@@ -56,7 +86,7 @@ def create_mealplan_spreadsheet(optimization_path, spreadsheet_columns, output_p
     ws.add_data_validation(dv)
 
     # Convert the initial data to a table
-    table_range = f"A1:{chr(64+meal_time_col)}{ws.max_row}"
+    table_range = f"A1:{get_column_letter(meal_time_col)}{ws.max_row}"
     table = Table(displayName="MealplanTable", ref=table_range)
     style = TableStyleInfo(
         name="TableStyleMedium2",
@@ -94,7 +124,10 @@ def create_mealplan_spreadsheet(optimization_path, spreadsheet_columns, output_p
                     )
 
         # Define the range for the table
-        table_range = f"{chr(64+start_col)}3:{chr(64+start_col + df.shape[1] - 1)}{df.shape[0] + 3}"
+        table_range = (
+            f"{get_column_letter(start_col)}3:"
+            f"{get_column_letter(start_col + df.shape[1] - 1)}{df.shape[0] + 3}"
+        )
 
         # Create and style the table
         table = Table(displayName=table_name, ref=table_range)
@@ -148,41 +181,25 @@ def create_mealplan_spreadsheet(optimization_path, spreadsheet_columns, output_p
         # Adjust the position and size of the chart
         chart.width = 8  # Adjusted width
         chart.height = 6  # Adjusted height
-        chart_position = f"{chr(64+start_col)}{total_row_index + 3}"
+        chart_position = f"{get_column_letter(start_col)}{total_row_index + 3}"
         ws.add_chart(chart, chart_position)
 
-    # Filter data for each meal time
-    breakfast_df = df[df["Meal Time"] == "Breakfast"].drop(columns=["Meal Time"])
-    lunch_df = df[df["Meal Time"] == "Lunch"].drop(columns=["Meal Time"])
-    dinner_df = df[df["Meal Time"] == "Dinner"].drop(columns=["Meal Time"])
-
-    # Calculate the starting columns dynamically
-    breakfast_cols = breakfast_df.shape[1]
-    lunch_start_col = breakfast_cols + 3
-    lunch_cols = lunch_df.shape[1]
-    dinner_start_col = lunch_start_col + lunch_cols + 3
-
-    # Add tables to the separate sheet, ensuring data is placed correctly
-    ws_separate.cell(row=1, column=1, value="Breakfast").font = Font(bold=True)
-    add_table(ws_separate, breakfast_df, 1, "Breakfast", "BreakfastTable")
-
-    ws_separate.cell(row=1, column=lunch_start_col, value="Lunch").font = Font(
-        bold=True
-    )
-    add_table(ws_separate, lunch_df, lunch_start_col, "Lunch", "LunchTable")
-
-    ws_separate.cell(row=1, column=dinner_start_col, value="Dinner").font = Font(
-        bold=True
-    )
-    add_table(ws_separate, dinner_df, dinner_start_col, "Dinner", "DinnerTable")
+    # One table per meal side by side, in the order of the meal targets
+    start_col = 1
+    for meal_idx, meal in enumerate(meal_times):
+        meal_df = df[df["Meal Time"] == meal].drop(columns=["Meal Time"])
+        ws_separate.cell(row=1, column=start_col, value=meal).font = Font(bold=True)
+        # Meal names may hold characters table names do not allow
+        add_table(ws_separate, meal_df, start_col, meal, f"MealTable{meal_idx + 1}")
+        start_col += meal_df.shape[1] + 3
 
-    # Save the workbook
-    directory = os.path.dirname(output_path)
+    # Save the workbook, without an output path it is only returned
+    if output_path is not None:
+        directory = os.path.dirname(output_path)
 
-    # Check if the directory exists, if not, create it
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+        # Check if the directory exists, if not, create it
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
 
-    # Save the workbook
-    wb.save(output_path)
+        wb.save(output_path)
     return wb
@@ -0,0 +1,191 @@
+import datetime
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import openpyxl
+from openpyxl.drawing.image import Image
+from openpyxl.packaging.relationship import get_rels_path
+from openpyxl.utils.cell import coordinate_to_tuple
+from openpyxl.utils.units import pixels_to_EMU
+from openpyxl.writer.excel import ExcelWriter
+from PIL import Image as PILImage
+
+# The writer below overrides private parts of openpyxl (ExcelWriter._write_drawing
+# and _write_images, Image._path, the _images and _drawings of the writer),
+# which are only known to work with these versions. requirements.txt pins one of
+# them, which tests/test_shared_images.py checks. With any other version the
+# images are added as regular openpyxl images, one media file per anchor.
+SUPPORTED_OPENPYXL_VERSIONS = ("3.1.",)
+SHARED_IMAGES_SUPPORTED = openpyxl.__version__.startswith(SUPPORTED_OPENPYXL_VERSIONS)
+
+# Same markup openpyxl generates for images anchored to a single cell
+DRAWING_XML = (
+    '<wsDr xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns="http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing">'
+    "{anchors}</wsDr>"
+)
+ANCHOR_XML = (
+    "<oneCellAnchor><from><col>{col}</col><colOff>0</colOff>"
+    "<row>{row}</row><rowOff>0</rowOff></from>"
+    '<ext cx="{cx}" cy="{cy}" /><pic><nvPicPr>'
+    '<cNvPr id="{idx}" name="Image {idx}" descr="Picture" /><cNvPicPr /></nvPicPr>'
+    '<blipFill><a:blip cstate="print" r:embed="{rel_id}" />'
+    "<a:stretch><a:fillRect /></a:stretch></blipFill>"
+    '<spPr><a:prstGeom prst="rect" /></spPr></pic><clientData /></oneCellAnchor>'
+)
+RELATIONSHIPS_XML = (
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    "{relationships}</Relationships>"
+)
+IMAGE_RELATIONSHIP_XML = (
+    '<Relationship Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships/image" Target="{target}" Id="{rel_id}" />'
+)
+
+
+class SharedImagePart:
+    """
+    Media file stored once in the xlsx package and referenced by any number
+    of anchored images on any sheet.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        # The image header is read once per distinct image
+        with PILImage.open(BytesIO(data)) as img:
+            self.width, self.height = img.size
+            self.format = img.format.lower()
+        self.id = None
+
+    @property
+    def path(self):
+        return Image._path.format(self.id, self.format)
+
+
+class SharedImage(Image):
+    """
+    Anchored image whose media file is a SharedImagePart.
+
+    ExcelWriter assigns a new id to every anchored image it writes, only the
+    first one is kept so that all anchors point to the same media file.
+    """
+
+    def __init__(self, part):
+        self.ref = None
+        self.part = part
+        self.width, self.height = part.width, part.height
+        self.format = part.format
+
+    @property
+    def _id(self):
+        return self.part.id
+
+    @_id.setter
+    def _id(self, value):
+        if self.part.id is None:
+            self.part.id = value
+
+    def _data(self):
+        return self.part.data
+
+
+class SharedImageExcelWriter(ExcelWriter):
+    def _write_drawing(self, drawing):
+        """
+        Write drawings that only hold SharedImages from string templates, with
+        one relationship per distinct media file instead of one per anchor.
+        """
+        if drawing.charts or not all(
+            isinstance(img, SharedImage) and isinstance(img.anchor, str)
+            for img in drawing.images
+        ):
+            return super()._write_drawing(drawing)
+
+        self._drawings.append(drawing)
+        drawing._id = len(self._drawings)
+
+        rel_ids = {}
+        anchors = []
+        for idx, img in enumerate(drawing.images, 1):
+            if img.part.id is None:
+                self._images.append(img)
+                img._id = len(self._images)
+            rel_id = rel_ids.setdefault(img.part, f"rId{len(rel_ids) + 1}")
+            row, col = coordinate_to_tuple(img.anchor)
+            anchors.append(
+                ANCHOR_XML.format(
+                    col=col - 1,
+                    row=row - 1,
+                    cx=pixels_to_EMU(img.width),
+                    cy=pixels_to_EMU(img.height),
+                    idx=idx,
+                    rel_id=rel_id,
+                )
+            )
+
+        relationships = "".join(
+            IMAGE_RELATIONSHIP_XML.format(target=part.path, rel_id=rel_id)
+            for part, rel_id in rel_ids.items()
+        )
+        self._archive.writestr(
+            drawing.path[1:], DRAWING_XML.format(anchors="".join(anchors))
+        )
+        self._archive.writestr(
+            get_rels_path(drawing.path)[1:],
+            RELATIONSHIPS_XML.format(relationships=relationships),
+        )
+        self.manifest.append(drawing)
+
+    def _write_images(self):
+        # Every media file once, no matter how many sheets reference it
+        written_paths = set()
+        for img in self._images:
+            if img.path in written_paths:
+                continue
+            written_paths.add(img.path)
+            self._archive.writestr(img.path[1:], img._data())
+
+
+def create_shared_image_parts(images):
+    """
+    Wrap encoded images into shared media parts, identical images share a part.
+
+    Parameters:
+    - images (dict): Encoded image bytes (or None) by key, e.g. the image url.
+
+    Returns:
+    - dict: SharedImagePart by key, keys without an image are left out.
+    """
+    parts_by_data = {}
+    parts = {}
+    for key, data in images.items():
+        if not data:
+            continue
+        if data not in parts_by_data:
+            parts_by_data[data] = SharedImagePart(data)
+        parts[key] = parts_by_data[data]
+    return parts
+
+
+def add_shared_image(ws, part, anchor):
+    if part is None:
+        return
+    if SHARED_IMAGES_SUPPORTED:
+        ws.add_image(SharedImage(part), anchor)
+    else:
+        ws.add_image(Image(BytesIO(part.data)), anchor)
+
+
+def save_workbook_with_shared_images(wb, fileobj):
+    # Same as Workbook.save, but deduplicates the media files of SharedImages
+    if not SHARED_IMAGES_SUPPORTED:
+        wb.save(fileobj)
+        return
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    archive = ZipFile(fileobj, "w", ZIP_DEFLATED, allowZip64=True)
+    wb.properties.modified = datetime.datetime.now(
+        tz=datetime.timezone.utc
+    ).replace(tzinfo=None)
+    SharedImageExcelWriter(wb, archive).save()
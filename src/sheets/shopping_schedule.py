@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Tolerance against floating point noise, e.g. 3 * 0.1 / 0.3 = 1.0000000000000002
+ROUNDING_DECIMALS = 9
+
+
+def compute_purchase_schedule(weekly_quantity_g, package_weight_g, weeks=2):
+    """
+    Compute how many packages of every item to buy at the start of each week.
+
+    Packages are bought as late as possible: at the start of week w the
+    stock carried over from the previous weeks is topped up until it covers
+    the consumption of week w. This is computed for all items and weeks at
+    once from the cumulative consumption.
+
+    Parameters:
+    - weekly_quantity_g (array-like): Weekly consumption of each item in grams.
+    - package_weight_g (array-like): Package weight of each item in grams.
+    - weeks (int): Planning horizon in weeks.
+
+    Returns:
+    - purchases (np.ndarray): Packages bought per item (rows) and week (columns).
+    - leftover_g (np.ndarray): Stock in grams left at the end of each week.
+    """
+    if weeks < 1:
+        raise ValueError(f"The shopping horizon must be at least one week, got {weeks}.")
+
+    weekly_quantity_g = np.asarray(weekly_quantity_g, dtype=float)[:, None]
+    package_weight_g = np.asarray(package_weight_g, dtype=float)[:, None]
+    valid = (package_weight_g > 0) & (weekly_quantity_g > 0)
+
+    cumulative_need_g = weekly_quantity_g * np.arange(1, weeks + 1)[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative_packages = np.where(
+            valid,
+            np.ceil(np.round(cumulative_need_g / package_weight_g, ROUNDING_DECIMALS)),
+            0,
+        )
+
+    purchases = np.diff(cumulative_packages, axis=1, prepend=0).astype(int)
+    leftover_g = np.where(
+        valid, cumulative_packages * package_weight_g - cumulative_need_g, 0
+    )
+    return purchases, leftover_g
+
+
+def create_shopping_schedule(df, weeks=2):
+    """
+    Item x week matrix of packages to buy for a flat column mealplan.
+
+    Returns:
+    - pd.DataFrame: Packages to buy, indexed like df with one column per week.
+    - pd.Series: Stock in grams left over at the end of the last week,
+      carried over into the next shopping horizon.
+    """
+    purchases, leftover_g = compute_purchase_schedule(
+        df["Shopping List.Optimal Weekly Quantity (g)"],
+        df["Shopping List.Product Package Weight (g)"],
+        weeks=weeks,
+    )
+    schedule = pd.DataFrame(
+        purchases,
+        index=df.index,
+        columns=[f"Week {week}" for week in range(1, weeks + 1)],
+    )
+    return schedule, pd.Series(leftover_g[:, -1], index=df.index)
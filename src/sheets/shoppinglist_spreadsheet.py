@@ -1,109 +1,156 @@
+import numpy as np
 import pandas as pd
-import requests
 import io
-from io import BytesIO
-import openpyxl
 from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Font, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
 from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.formatting import Rule
 from openpyxl.styles.differential import DifferentialStyle
 from datetime import datetime, timedelta
+from src.images.cache import load_thumbnails
+from src.sheets.shared_images import (
+    add_shared_image,
+    create_shared_image_parts,
+    save_workbook_with_shared_images,
+)
+from src.sheets.shopping_schedule import create_shopping_schedule
+from src.utils.tracing import traced
+
+STANDARD_ROW_HEIGHT = 15
+IMAGE_ROW_HEIGHT = STANDARD_ROW_HEIGHT * 2  # Twice the standard height
+
+HEADER_STYLE = "Shopping List Header"
+EVEN_ROW_STYLE = "Shopping List Even Row"
+TOTAL_STYLE = "Shopping List Total"
+
+PACKAGES_TO_BUY_COLUMN = "Packages To Buy (units)"
+LEFTOVER_COLUMN = "Leftover After Last Week (g)"
+PRICE_COLUMN = "Average Weekly Price (EUR)"
+
+
+def register_shopping_list_styles(wb):
+    # Named styles are stored once in the workbook and referenced by every cell
+    header_style = NamedStyle(name=HEADER_STYLE)
+    header_style.font = Font(bold=True, color="FFFFFF")
+    header_style.fill = PatternFill(
+        start_color="000000", end_color="000000", fill_type="solid"
+    )
 
+    even_row_style = NamedStyle(name=EVEN_ROW_STYLE)
+    even_row_style.fill = PatternFill(
+        start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
+    )
 
-def create_weekly_shopping_list(wb, df, start_date, shopping_day):
-    current_date = start_date
-    max_weeks = 2  # df['Shopping Period (weeks)'].max()
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(
-        start_color="000000", end_color="000000", fill_type="solid"
+    total_style = NamedStyle(name=TOTAL_STYLE)
+    total_style.font = Font(bold=True)
+
+    for style in [header_style, even_row_style, total_style]:
+        wb.add_named_style(style)
+
+
+def styled_row(ws, values, style=None, min_col=1):
+    # Wrap the values from min_col onwards into cells carrying a named style
+    if style is None:
+        return list(values)
+    row = list(values[: min_col - 1])
+    for value in values[min_col - 1 :]:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        row.append(cell)
+    return row
+
+
+def append_row(ws, row, row_idx, height=None):
+    # Write-only sheets read the row height while the row is streamed out
+    if height is None:
+        ws.append(row)
+        return
+    ws.row_dimensions[row_idx].height = height
+    ws.append(row)
+    del ws.row_dimensions[row_idx]
+
+
+def create_schedule_sheet(wb, df, schedule, leftover_g, start_date):
+    # Overview of the full item x week purchase matrix and the stock carried
+    # over into the next shopping horizon
+    ws_schedule = wb.create_sheet(title="Schedule")
+    headers = (
+        ["Product Name"]
+        + [
+            (start_date + timedelta(weeks=week)).strftime("%Y-%m-%d")
+            for week in range(schedule.shape[1])
+        ]
+        + [LEFTOVER_COLUMN]
     )
-    even_fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
+    ws_schedule.append(styled_row(ws_schedule, headers, HEADER_STYLE))
+
+    for row_idx, (product_name, purchases, leftover) in enumerate(
+        zip(
+            df["Product Name"],
+            schedule.itertuples(index=False, name=None),
+            leftover_g.round().astype(int),
+        ),
+        start=2,
+    ):
+        row = (
+            [product_name]
+            + [count if count else None for count in purchases]
+            + [leftover]
+        )
+        style = EVEN_ROW_STYLE if row_idx % 2 == 0 else None
+        ws_schedule.append(styled_row(ws_schedule, row, style))
+
 
-    for week in range(1, max_weeks + 1):
+def create_weekly_shopping_list(wb, df, schedule, start_date, shopping_day, image_parts):
+    current_date = start_date
+
+    # Remove the URL column for weekly sheets, rows are shared by all weeks
+    image_urls = df["Non Nutrient Data.Image URL"].tolist()
+    df_no_url = df.drop(columns=["Non Nutrient Data.Image URL"])
+    rows = list(df_no_url.itertuples(index=False, name=None))
+    headers = ["", "Status"] + list(df_no_url.columns) + [PACKAGES_TO_BUY_COLUMN]
+    purchases = schedule.to_numpy()
+
+    for week in range(1, purchases.shape[1] + 1):
         ws_week = wb.create_sheet(
             title=f"Week {week} ({(current_date + timedelta(weeks=week - 1)).strftime('%Y-%m-%d')})"
         )
         shopping_date = current_date + timedelta(weeks=week - 1)
 
-        # Filter items for the current week, include all items for week 1
-        if week == 1:
-            week_df = df.copy()
-        else:
-            week_df = df[
-                (df["Shopping Period (weeks)"] == 1)
-                | ((week - 1) % df["Shopping Period (weeks)"] == 0)
-            ].copy()
-
-        # Remove the URL column for weekly sheets
-        week_df_no_url = week_df.drop(columns=["Non Nutrient Data.Image URL"])
+        # Items with a purchase in the current week, week 1 buys every item
+        week_items = np.flatnonzero(purchases[:, week - 1])
+        last_row = len(week_items) + 3
 
         # Add shopping date at the top
         ws_week.append(["Shopping Date:", shopping_date.strftime("%Y-%m-%d")])
         ws_week.append([])
 
-        # Add column headers with the "Status" column
-        headers = ["Status"] + list(week_df_no_url.columns)
-        ws_week.append(headers)
-
-        # Style the header
-        for cell in ws_week[3]:
-            cell.font = header_font
-            cell.fill = header_fill
-
-        # Add DataFrame to the weekly sheet, shifting columns by one to the right
-        for r in dataframe_to_rows(week_df_no_url, index=False, header=False):
-            ws_week.append([""] + r)
-
-        # Add images to the weekly sheet
-        image_urls_week = week_df["Non Nutrient Data.Image URL"]
-        image_row_week = 4  # Start from row 4 (row 1-3 contain headers)
-
-        for image_url in image_urls_week:
-            # Download the image
-            response = requests.get(image_url)
-            image_data = BytesIO(response.content)
-
-            standard_row_height = 15
-            ws_week.row_dimensions[image_row_week].height = (
-                standard_row_height * 2
-            )  # Set the height of the row to twice the standard height
-
-            # Insert the image into the worksheet with offsets
-            img = openpyxl.drawing.image.Image(image_data)
-            img.width, img.height = (
-                img.width * 0.22,
-                img.height * 0.22,
-            )  # Scale the image
-            ws_week.add_image(img, f"A{image_row_week}")
-
-            # Move to the next row
-            image_row_week += 1
+        # Add column headers, column A holds the images and column B the status
+        ws_week.append(styled_row(ws_week, headers, HEADER_STYLE))
+
+        # Stream the items, starting from row 4 (row 1-3 contain headers)
+        for row_idx, item in enumerate(week_items, start=4):
+            row = ["", "MISSING"] + list(rows[item]) + [purchases[item, week - 1]]
+            style = EVEN_ROW_STYLE if row_idx % 2 == 0 else None
+            append_row(
+                ws_week,
+                styled_row(ws_week, row, style, min_col=2),
+                row_idx,
+                height=IMAGE_ROW_HEIGHT,
+            )
+            add_shared_image(ws_week, image_parts.get(image_urls[item]), f"A{row_idx}")
+
+        # A week without purchases has no status cells to validate or format
+        if last_row < 4:
+            continue
 
         # Add data validation for "MISSING" and "GOT IT"
         dv_missing_gotit = DataValidation(
             type="list", formula1='"MISSING,GOT IT"', allow_blank=True
         )
-        ws_week.add_data_validation(dv_missing_gotit)
-
-        for row in range(4, len(week_df) + 4):
-            cell_number = f"B{row}"
-            cell = ws_week[cell_number]
-            cell.value = "MISSING"
-            dv_missing_gotit.add(cell)
-
-        # Apply alternating row colors
-        for row in ws_week.iter_rows(
-            min_row=4,
-            max_row=len(week_df) + 3,
-            min_col=2,
-            max_col=len(week_df_no_url.columns) + 1,
-        ):
-            for cell in row:
-                if cell.row % 2 == 0:
-                    cell.fill = even_fill
+        dv_missing_gotit.add(f"B4:B{last_row}")
+        ws_week.data_validations.append(dv_missing_gotit)
 
         # Apply dynamic conditional formatting for the "MISSING" and "GOT IT" statuses
         red_fill = PatternFill(
@@ -119,110 +166,96 @@ def create_weekly_shopping_list(wb, df, start_date, shopping_day):
         green_rule = Rule(type="expression", dxf=DifferentialStyle(fill=green_fill))
         green_rule.formula = ['B4="GOT IT"']
 
-        ws_week.conditional_formatting.add(f"B4:B{len(week_df) + 3}", red_rule)
-        ws_week.conditional_formatting.add(f"B4:B{len(week_df) + 3}", green_rule)
+        ws_week.conditional_formatting.add(f"B4:B{last_row}", red_rule)
+        ws_week.conditional_formatting.add(f"B4:B{last_row}", green_rule)
 
-        # Adjust column widths
-        for col in ws_week.columns:
-            max_length = 0
-            column = col[0].column_letter  # Get the column name
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = max_length  # + 2
-            # ws_week.column_dimensions[column].width = adjusted_width
+
+@traced()
+def create_shopping_list_table(df, shopping_list_columns, weeks=2):
+    # Shopping list data with the packages to buy per week, without styling
+    schedule, leftover_g = create_shopping_schedule(df, weeks=weeks)
+    df = df[shopping_list_columns]
+    df.columns = [col.replace("Shopping List.", "") for col in df.columns]
+    return pd.concat(
+        [df, schedule, leftover_g.round().astype(int).rename(LEFTOVER_COLUMN)],
+        axis=1,
+    ).reset_index(drop=True)
 
 
 # Read the CSV file into a DataFrame
-def create_shopping_list_sheet(df, shopping_list_columns, output_path):
+@traced()
+def create_shopping_list_sheet(
+    df,
+    shopping_list_columns,
+    output_path,
+    image_options=None,
+    weeks=2,
+    start_date=None,
+):
+
+    # Packages to buy per item and week, the weekly sheets only read this matrix
+    schedule, leftover_g = create_shopping_schedule(df, weeks=weeks)
 
     df = df[shopping_list_columns]
     df.columns = [col.replace("Shopping List.", "") for col in df.columns]
 
-    # Initialize a new workbook
-    wb = Workbook()
-    ws_overview = wb.active
-    ws_overview.title = "Overview"
+    # Initialize a new workbook, rows are streamed to disk as they are added
+    wb = Workbook(write_only=True)
+    register_shopping_list_styles(wb)
+    ws_overview = wb.create_sheet(title="Overview")
 
     # Create a DataFrame without the URL column for the sheet
     df_no_url = df.drop(columns=["Non Nutrient Data.Image URL"])
+    image_urls = df["Non Nutrient Data.Image URL"]
 
-    # Add DataFrame to "Overview" sheet, shifting columns by one to the right
-    for r_idx, row in enumerate(dataframe_to_rows(df_no_url, index=False, header=True)):
-        ws_overview.append([""] + row)
-
-    # Style the header
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(
-        start_color="000000", end_color="000000", fill_type="solid"
+    # Load every distinct thumbnail once, it is stored once in the workbook
+    # and referenced from the overview and every weekly sheet
+    unique_urls = list(dict.fromkeys(image_urls))
+    image_parts = create_shared_image_parts(
+        dict(
+            zip(
+                unique_urls,
+                load_thumbnails(unique_urls, "sheet", **(image_options or {})),
+            )
+        )
     )
 
-    for cell in ws_overview[1]:
-        cell.font = header_font
-        cell.fill = header_fill
+    # Add the header to the "Overview" sheet, shifting columns by one to the right
+    ws_overview.append(
+        styled_row(ws_overview, [""] + list(df_no_url.columns), HEADER_STYLE)
+    )
 
-    # Insert images into column A of the "Overview" sheet
-    image_urls = df["Non Nutrient Data.Image URL"]
-    image_row = 2  # Start from row 2 (row 1 contains headers)
-
-    for image_url in image_urls:
-        # Download the image
-        response = requests.get(image_url)
-        image_data = BytesIO(response.content)
-
-        standard_row_height = 15
-        ws_overview.row_dimensions[image_row].height = (
-            standard_row_height * 2
-        )  # Set the height of the row to twice the standard height
-
-        # Insert the image into the worksheet with offsets
-        img = openpyxl.drawing.image.Image(image_data)
-        img.width, img.height = img.width * 0.22, img.height * 0.22  # Scale the image
-        ws_overview.add_image(img, f"A{image_row}")
-
-        # Move to the next row
-        image_row += 1
-
-    # Add total average weekly price at the bottom
-    total_price = df["Average Weekly Price (EUR)"].sum()
-    ws_overview.append(["", "", "", "", "", "Total", total_price])
-
-    # Style the total row
-    ws_overview[f"F{len(df) + 2}"].font = Font(bold=True)
-
-    # Adjust column widths
-    for col in ws_overview.columns:
-        max_length = 0
-        column = col[0].column_letter  # Get the column name
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = max_length  # + 2
-        # ws_overview.column_dimensions[column].width = adjusted_width
-
-    # Apply alternating row colors
-    even_fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-
-    for row in ws_overview.iter_rows(
-        min_row=2, max_row=len(df) + 1, min_col=2, max_col=len(df_no_url.columns) + 1
+    # Stream the items with their images in column A, starting from row 2
+    for row_idx, (image_url, values) in enumerate(
+        zip(image_urls, df_no_url.itertuples(index=False, name=None)), start=2
     ):
-        for cell in row:
-            if cell.row % 2 == 0:
-                cell.fill = even_fill
+        style = EVEN_ROW_STYLE if row_idx % 2 == 0 else None
+        append_row(
+            ws_overview,
+            styled_row(ws_overview, [""] + list(values), style, min_col=2),
+            row_idx,
+            height=IMAGE_ROW_HEIGHT,
+        )
+        add_shared_image(ws_overview, image_parts.get(image_url), f"A{row_idx}")
+
+    # Add total average weekly price at the bottom, below the price column
+    total_price = df[PRICE_COLUMN].sum()
+    total_label = WriteOnlyCell(ws_overview, value="Total")
+    total_label.style = TOTAL_STYLE
+    price_col = list(df_no_url.columns).index(PRICE_COLUMN) + 1
+    ws_overview.append([""] * (price_col - 1) + [total_label, total_price])
 
     # Save the workbook
     preferred_day = "Monday"
-    start_date = datetime.now()
+    if start_date is None:
+        start_date = datetime.now()
 
-    create_weekly_shopping_list(wb, df, start_date, preferred_day)
+    create_schedule_sheet(wb, df, schedule, leftover_g, start_date)
+    create_weekly_shopping_list(
+        wb, df, schedule, start_date, preferred_day, image_parts
+    )
 
     wb_io = io.BytesIO()
-    wb.save(wb_io)
+    save_workbook_with_shared_images(wb, wb_io)
     wb_io.seek(0)
     return wb_io
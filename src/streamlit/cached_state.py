@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import streamlit as st
+import yaml
+
+from src.nutrition.formulas import calculate_nutrient_goals
+
+
+@st.cache_resource(show_spinner=False)
+def _load_yaml_config(path, modified_time):
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def load_yaml_config(path):
+    """
+    Parse a YAML config once per process instead of on every rerun.
+
+    The config is shared by all sessions and must not be modified, an edited
+    file is parsed again.
+    """
+    return _load_yaml_config(os.path.abspath(path), os.path.getmtime(path))
+
+
+@st.cache_data(show_spinner=False)
+def _load_csv(path, modified_time):
+    return pd.read_csv(path)
+
+
+def load_csv(path):
+    # Read again only after the file changed, every caller gets a copy
+    return _load_csv(os.path.abspath(path), os.path.getmtime(path))
+
+
+@st.cache_data(show_spinner=False)
+def cached_nutrient_goals(
+    weight, height, age, calorie_adjustment, activity_scale, gender
+):
+    # Every session gets its own copy of the goals, they are edited later on
+    return calculate_nutrient_goals(
+        weight=weight,
+        height=height,
+        age=age,
+        calorie_adjustment=calorie_adjustment,
+        activity_scale=activity_scale,
+        gender=gender,
+    )
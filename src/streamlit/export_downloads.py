@@ -0,0 +1,56 @@
+import streamlit as st
+
+from src.sheets.export_formats import XLSX_MIME
+from src.streamlit.rerun_profile import track_background_trace
+
+
+def create_pending_download(future, file_name, mime=XLSX_MIME):
+    # Reserve the spot of the download button until the export is finished
+    placeholder = st.empty()
+    placeholder.caption(f"Preparing {file_name} ...")
+    return {
+        "future": future,
+        "file_name": file_name,
+        "mime": mime,
+        "placeholder": placeholder,
+    }
+
+
+def attach_ready_downloads(pending_downloads):
+    """
+    Replace the placeholders of finished exports by their download buttons,
+    without waiting for the others.
+
+    Parameters:
+    - pending_downloads (list): Entries created by create_pending_download,
+      attached entries are removed from the list.
+    """
+    for download in list(pending_downloads):
+        future = download["future"]
+        if not future.done():
+            continue
+
+        pending_downloads.remove(download)
+        try:
+            result = future.result()
+        except Exception as e:
+            download["placeholder"].error(
+                f"Failed to create {download['file_name']}: {e}"
+            )
+            continue
+
+        # The trace of a cached export belongs to an earlier rerun
+        if "trace" in result and not result.get("cached"):
+            track_background_trace(result["trace"])
+        container = download["placeholder"].container()
+        container.download_button(
+            label=f"CLICK HERE TO DOWNLOAD: {download['file_name']}",
+            data=result["data"],
+            file_name=download["file_name"],
+            mime=download["mime"],
+        )
+        if result.get("cached"):
+            built = "from the export cache"
+        else:
+            built = f"built in {result['seconds']:.2f} s"
+        container.caption(f"{len(result['data']) / 1024:.0f} KiB, {built}")
@@ -0,0 +1,121 @@
+import time
+
+import streamlit as st
+
+from src.nutrition.solver_jobs import SolverJob, solution_values
+from src.streamlit.result_sections import fragment
+from src.streamlit.rerun_profile import track_background_trace
+from src.streamlit.solver_progress import SOLVER_JOB_KEY
+from src.utils.hashing import hash_values
+
+MODEL_TEMPLATE_KEY = "model_template"
+LIVE_REQUEST_KEY = "live_request"
+LIVE_SETTINGS_KEY = "live_settings"
+START_VALUES_KEY = "live_start_values"
+LIVE_POLL_INTERVAL = 0.1  # seconds between two checks of the debounce timer
+# Cuts at the root node take up most of a short time limit, without them CBC
+# finds a plan within 0.1 % of the optimum in ~0.3 s
+LIVE_CBC_OPTIONS = ["-cuts", "off"]
+
+
+def get_model_template(df, optimization_unit_size, rdi_dict):
+    # Rebuilt only for a new catalog, unit size or set of constrained nutrients,
+    # imported here as it loads pulp which the page only needs in live mode
+    from src.nutrition.model_template import DietModelTemplate
+
+    template = st.session_state.get(MODEL_TEMPLATE_KEY)
+    if template is None or not template.matches(df, optimization_unit_size, rdi_dict):
+        template = DietModelTemplate(df, optimization_unit_size, rdi_dict)
+        st.session_state[MODEL_TEMPLATE_KEY] = template
+    return template
+
+
+def live_settings_key(settings):
+    # The catalog is compared by identity, hashing it on every rerun is too slow
+    return hash_values(
+        id(settings["df"]), {k: v for k, v in settings.items() if k != "df"}
+    )
+
+
+def request_live_solve(settings):
+    """
+    Queue a live solve of the current settings.
+
+    A request replaces the queued one, so only the settings the sliders
+    rest on are solved once the debounce time has passed.
+
+    Parameters:
+    - settings (dict): The keyword arguments of build_diet_model.
+    """
+    settings_key = live_settings_key(settings)
+    if settings_key == st.session_state.get(LIVE_SETTINGS_KEY):
+        return
+    request = st.session_state.get(LIVE_REQUEST_KEY)
+    if request is None or request["key"] != settings_key:
+        st.session_state[LIVE_REQUEST_KEY] = {
+            "key": settings_key,
+            "settings": settings,
+            "time": time.monotonic(),
+        }
+
+
+def store_start_solution(food_vars):
+    # The last mealplan found is the start solution of the next live solve
+    st.session_state[START_VALUES_KEY] = solution_values(food_vars)
+
+
+def start_live_job(settings, time_limit, telemetry=None):
+    # Reuses the model and starts CBC from the last mealplan, which still
+    # is a solution after most changes of the factors and the budget
+    template = get_model_template(
+        settings["df"], settings["optimization_unit_size"], settings["rdi_dict"]
+    )
+    return SolverJob(
+        template.build_model,
+        time_limit=time_limit,
+        start_values=st.session_state.get(START_VALUES_KEY),
+        options=LIVE_CBC_OPTIONS,
+        lock=template.lock,
+        telemetry=telemetry,
+        telemetry_source="live",
+        **settings,
+    ).start()
+
+
+def live_solver_section(debounce_seconds, time_limit, telemetry=None):
+    """
+    Start the queued live solve once the settings were unchanged for
+    debounce_seconds, cancelling a solve of superseded settings.
+
+    The section only polls while a request is queued or a job runs, the
+    page is rerun once the job is done so the results can be rendered.
+    """
+    if LIVE_REQUEST_KEY in st.session_state or SOLVER_JOB_KEY in st.session_state:
+        polling_live_solver_section(debounce_seconds, time_limit, telemetry)
+    else:
+        st.caption("Live mode: the mealplan is up to date.")
+
+
+@fragment(run_every=LIVE_POLL_INTERVAL)
+def polling_live_solver_section(debounce_seconds, time_limit, telemetry=None):
+    job = st.session_state.get(SOLVER_JOB_KEY)
+    request = st.session_state.get(LIVE_REQUEST_KEY)
+
+    if request is not None and time.monotonic() - request["time"] >= debounce_seconds:
+        if job is not None:
+            job.cancel()
+        job = start_live_job(request["settings"], time_limit, telemetry)
+        track_background_trace(job.trace)
+        st.session_state[SOLVER_JOB_KEY] = job
+        st.session_state[LIVE_SETTINGS_KEY] = request["key"]
+        del st.session_state[LIVE_REQUEST_KEY]
+        request = None
+    elif request is None and (job is None or job.done()):
+        # Nothing left to poll for, the page renders the results
+        st.rerun()
+
+    if request is not None:
+        st.caption("Live mode: waiting for the sliders to settle ...")
+    else:
+        elapsed = job.progress.get("elapsed", 0)
+        st.caption(f"Live mode: searching for a mealplan ({elapsed:.1f} s) ...")
@@ -1,9 +1,7 @@
 import pandas as pd
-import requests
-from PIL import Image
-from io import BytesIO
 import os
 import streamlit as st
+from src.utils.tracing import traced
 
 
 def display_mealplan_in_streamlit(dataframe):
@@ -24,7 +22,7 @@ def display_mealplan_in_streamlit(dataframe):
             columns = st.columns([1, 6, 1, 1])  # Adjust column widths as necessary
             with columns[0]:
                 if row["Image"]:
-                    st.image(row["Image"], width=60)  # Adjust width to fit the layout
+                    st.image(row["Image"])  # Thumbnails are pre-rendered at 60px
                 else:
                     st.write("No image available")
             with columns[1]:
@@ -59,40 +57,17 @@ def create_shopping_list_inplace(merged_df):
         / merged_df["Shopping List.Product Package Weight (g)"]
     )
 
-    import math
-
-    def calculate_packages_and_weeks(row):
-        quantity = row["Shopping List.Product Package Quantity (units)"]
-        if quantity >= 1:
-            packages = math.ceil(quantity)
-            weeks = 1
-        else:
-            packages = 1
-            weeks = math.floor(1 / quantity)
-        return pd.Series([packages, weeks])
-
-    # Apply the function to create new columns
-    merged_df[
-        [
-            "Shopping List.Product Package Quantity Per Period (units / week)",
-            "Shopping List.Shopping Period (weeks)",
-        ]
-    ] = merged_df.apply(calculate_packages_and_weeks, axis=1)
+    # The packages to buy every week are computed by create_shopping_schedule
     return merged_df
 
 
-def create_meaplan_from_optimizer_results(
+@traced()
+def merge_optimizer_results(
     df,
     flat_column_normalized_result_df,
     optimization_unit_size=100,
     directory="data/processed",
     file_name="merged_optimization_result.csv",
-    streamlit_mealplan_columns=[
-        "FDC Name",
-        "Optimal Quantity (g)",
-        "Price (EUR)",
-        "Image",
-    ],
 ):
 
     flat_column_df = df.copy()
@@ -121,10 +96,39 @@ def create_meaplan_from_optimizer_results(
 
     merged_df = create_shopping_list_inplace(merged_df)
 
-    file_path = os.path.join(directory, file_name)
-    os.makedirs(directory, exist_ok=True)
-    merged_df.to_csv(file_path, index=False)
-    merged_df = merged_df[streamlit_mealplan_columns]
+    # Without a directory the merged results only stay in memory
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+        merged_df.to_csv(os.path.join(directory, file_name), index=False)
+    return merged_df
+
+
+@traced()
+def create_meaplan_from_optimizer_results(
+    df,
+    flat_column_normalized_result_df,
+    optimization_unit_size=100,
+    directory="data/processed",
+    file_name="merged_optimization_result.csv",
+    streamlit_mealplan_columns=[
+        "FDC Name",
+        "Optimal Quantity (g)",
+        "Price (EUR)",
+        "Image",
+    ],
+    image_options=None,
+    merged_df=None,
+):
+    # The merged results can be passed in if they were already computed
+    if merged_df is None:
+        merged_df = merge_optimizer_results(
+            df,
+            flat_column_normalized_result_df,
+            optimization_unit_size,
+            directory=directory,
+            file_name=file_name,
+        )
+    merged_df = merged_df[streamlit_mealplan_columns].copy()
 
     merged_df.columns = [
         col.replace("Non Nutrient Data.", "") for col in merged_df.columns
@@ -134,16 +138,16 @@ def create_meaplan_from_optimizer_results(
         col.replace("Daily Mealplan.", "") for col in merged_df.columns
     ]
 
-    # Assuming 'merged_df' is your DataFrame that has already been loaded elsewhere in your script
-
-    def load_image(url):
-        try:
-            response = requests.get(url)
-            img = Image.open(BytesIO(response.content))
-            return img
-        except Exception as e:
-            return None  # Returns None if there's an issue loading the image
-
-    # Convert Image URLs to actual images
-    merged_df["Image"] = merged_df["Image URL"].apply(load_image)
+    # Convert Image URLs to pre-rendered thumbnails, served from the image cache.
+    # The image modules load PIL and requests, only needed once a plan is shown
+    from src.images.cache import load_thumbnails
+    from src.images.thumbnails import create_placeholder_thumbnail
+
+    placeholder = create_placeholder_thumbnail("ui")
+    merged_df["Image"] = [
+        thumbnail if thumbnail is not None else placeholder
+        for thumbnail in load_thumbnails(
+            merged_df["Image URL"], "ui", **(image_options or {})
+        )
+    ]
     return merged_df
@@ -1,20 +1,29 @@
+import copy
 import streamlit as st
 import os
 import pandas as pd
-from PIL import Image
+from src.streamlit.cached_state import load_csv
+
+
+MACRO_GOALS_KEY = "macro_goals"
 
 
 def initialize_macro_rdi_session_state(rdi_dict):
+    # The macro ranges start from the goals and are reset to the new goals
+    # once they change, e.g. for another weight, age or activity
+    goals_changed = st.session_state.get(MACRO_GOALS_KEY) != rdi_dict["Macronutrient"]
+    st.session_state[MACRO_GOALS_KEY] = copy.deepcopy(rdi_dict["Macronutrient"])
+
     for nutrient in rdi_dict["Macronutrient"]:
         if nutrient in ["Sugars, added [G]", "Saturated Fat [G]", "Fiber [G]"]:
             continue
         lower_key = f"{nutrient}_lower"
         upper_key = f"{nutrient}_upper"
-        if lower_key not in st.session_state:
+        if goals_changed or lower_key not in st.session_state:
             st.session_state[lower_key] = rdi_dict["Macronutrient"][nutrient].get(
                 "lower_bound", 0
             )
-        if upper_key not in st.session_state:
+        if goals_changed or upper_key not in st.session_state:
             st.session_state[upper_key] = rdi_dict["Macronutrient"][nutrient].get(
                 "upper_bound", 0
             )
@@ -22,11 +31,11 @@ def initialize_macro_rdi_session_state(rdi_dict):
     for nutrient in ["Saturated Fat [G]", "Sugars, added [G]", "Fiber [G]"]:
         lower_key = f"{nutrient}_lower"
         upper_key = f"{nutrient}_upper"
-        if lower_key not in st.session_state:
+        if goals_changed or lower_key not in st.session_state:
             st.session_state[lower_key] = (
                 rdi_dict["Macronutrient"].get(nutrient, {}).get("lower_bound", 0)
             )
-        if upper_key not in st.session_state:
+        if goals_changed or upper_key not in st.session_state:
             st.session_state[upper_key] = (
                 rdi_dict["Macronutrient"].get(nutrient, {}).get("upper_bound", 0)
             )
@@ -37,8 +46,8 @@ def user_input_body_type(image_dir):
     def display_body_type(image_path, label, column):
         with column:
             checkbox = st.checkbox(label)
-            image = Image.open(image_path)
-            st.image(image, caption=label, use_column_width=True)
+            # Streamlit serves the file as is, without decoding it with PIL
+            st.image(image_path, caption=label, use_column_width=True)
         return checkbox
 
     # Step 1: Ask for the user's body type
@@ -288,8 +297,39 @@ def user_input_micronutrients(rdi_dict, micro_ranges):
     return micro_ranges
 
 
+def apply_nutrient_ranges(rdi_dict, energy_intake, micro_ranges):
+    """
+    The nutrient goals with the ranges chosen on the sliders.
+
+    Bounds the goals leave open stay open, the sliders only show them as 0
+    or five times the lower bound.
+    """
+    nutrient_goals = copy.deepcopy(rdi_dict)
+    nutrient_goals["Energy"]["Energy [KCAL]"]["lower_bound"] = energy_intake[0]
+    nutrient_goals["Energy"]["Energy [KCAL]"]["upper_bound"] = energy_intake[1]
+
+    macro_ranges = {
+        nutrient: (
+            st.session_state.get(f"{nutrient}_lower"),
+            st.session_state.get(f"{nutrient}_upper"),
+        )
+        for nutrient in nutrient_goals["Macronutrient"]
+    }
+    for category, ranges in [
+        ("Macronutrient", macro_ranges),
+        ("Micronutrient", micro_ranges),
+    ]:
+        for nutrient, (lower, upper) in ranges.items():
+            bounds = nutrient_goals[category][nutrient]
+            if bounds["lower_bound"] is not None and lower is not None:
+                bounds["lower_bound"] = lower
+            if bounds.get("upper_bound") is not None and upper is not None:
+                bounds["upper_bound"] = upper
+    return nutrient_goals
+
+
 def show_micronutrient_health_outcomes(rdi_dict, path):
-    micro_health_df = pd.read_csv(path)
+    micro_health_df = load_csv(path)
     for nutrient, _ in rdi_dict["Micronutrient"].items():
         try:
             health_outcomes = (
@@ -0,0 +1,92 @@
+import streamlit as st
+
+from src.utils.tracing import end_trace, span, start_trace, waterfall_rows
+
+RERUN_PROFILE_KEY = "rerun_profile"
+BACKGROUND_TRACES_KEY = "background_traces"
+INPUT_SNAPSHOT_KEY = "rerun_input_snapshot"
+INPUT_TYPES = (bool, int, float, str, tuple, list)
+MAX_BACKGROUND_TRACES = 5
+WATERFALL_WIDTH = 40  # characters of the timeline column
+
+
+def start_rerun_profile():
+    # Called at the top of the page, every rerun is traced as one request
+    previous = st.session_state.get(RERUN_PROFILE_KEY)
+    if previous is not None:
+        # A rerun stopped by st.rerun never reaches show_rerun_profile
+        end_trace(previous)
+    st.session_state[RERUN_PROFILE_KEY] = start_trace("rerun")
+
+
+def profile_step(name):
+    """
+    Time a part of the page as a span of the rerun trace, the spans of the
+    traced functions it calls are nested in it.
+    """
+    return span(name)
+
+
+def track_background_trace(trace):
+    # Solver jobs and exports finish after the rerun that started them, their
+    # traces are shown next to the rerun in debug mode
+    traces = st.session_state.setdefault(BACKGROUND_TRACES_KEY, [])
+    if trace not in traces:
+        traces.append(trace)
+        del traces[:-MAX_BACKGROUND_TRACES]
+
+
+def changed_inputs():
+    # Widget values that differ from the previous rerun
+    snapshot = {
+        key: value
+        for key, value in st.session_state.items()
+        if isinstance(value, INPUT_TYPES) and key != INPUT_SNAPSHOT_KEY
+    }
+    previous = st.session_state.get(INPUT_SNAPSHOT_KEY, {})
+    st.session_state[INPUT_SNAPSHOT_KEY] = snapshot
+    return sorted(key for key in snapshot if previous.get(key) != snapshot[key])
+
+
+def format_waterfall(trace):
+    # Markdown table with one row per span and a text timeline
+    rows = waterfall_rows(trace)
+    total = max([trace.duration] + [row["offset"] + row["duration"] for row in rows])
+    lines = [
+        "| Span | Start [ms] | Duration [ms] | Timeline |",
+        "| --- | ---: | ---: | --- |",
+    ]
+    for row in rows:
+        offset = int(WATERFALL_WIDTH * row["offset"] / total) if total else 0
+        width = max(int(WATERFALL_WIDTH * row["duration"] / total) if total else 0, 1)
+        lines.append(
+            f"| {'&nbsp;' * 4 * row['depth']}{row['name']} "
+            f"| {row['offset'] * 1000:.1f} | {row['duration'] * 1000:.1f} "
+            f"| `{'░' * offset}{'█' * width}` |"
+        )
+    return "\n".join(lines)
+
+
+def show_rerun_profile():
+    """
+    End the rerun trace and show its waterfall, the traces of recent
+    background jobs and which inputs changed, only in debug mode.
+    """
+    trace = st.session_state.get(RERUN_PROFILE_KEY)
+    if trace is not None:
+        end_trace(trace)
+    if not st.session_state.get("debug") or trace is None:
+        return
+    with st.expander("Rerun Profile"):
+        st.write(f"Changed inputs: {', '.join(changed_inputs()) or 'none'}")
+        st.markdown(format_waterfall(trace))
+        st.caption(f"Total rerun time: {trace.duration:.3f} s")
+        for background_trace in reversed(
+            st.session_state.get(BACKGROUND_TRACES_KEY, [])
+        ):
+            state = "running" if background_trace.end is None else "finished"
+            st.markdown(
+                f"**{background_trace.name}** ({state}, "
+                f"{background_trace.duration:.3f} s)"
+            )
+            st.markdown(format_waterfall(background_trace))
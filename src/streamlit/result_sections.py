@@ -0,0 +1,217 @@
+import json
+from datetime import date, datetime, time
+
+import streamlit as st
+from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+
+from src.sheets.export_formats import export_file_name, export_mime
+from src.sheets.export_jobs import (
+    build_mealplan_export,
+    build_shopping_list_export,
+    export_cache_key,
+    submit_export,
+)
+from src.streamlit.export_downloads import (
+    attach_ready_downloads,
+    create_pending_download,
+)
+from src.streamlit.session_workspace import get_session_workspace
+from src.streamlit.mealplan_output import (
+    create_meaplan_from_optimizer_results,
+    display_mealplan_in_streamlit,
+)
+from src.visualization.dashboard import (
+    create_absolute_stacked_macronutrient_figure,
+    create_absolute_summed_macronutrient_figure,
+    create_normalized_stacked_micronutrient_figure,
+    create_normalized_summed_micronutrient_figure,
+)
+from src.visualization.figure_cache import cached_figure
+
+# Interacting with a fragment only reruns that fragment, not the whole page
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+OPTIMIZATION_RESULT_KEY = "optimization_result"
+EXPORT_POLL_INTERVAL = 0.5  # seconds between two checks of building exports
+# The config st.plotly_chart sends without further options
+PLOTLY_CHART_CONFIG = json.dumps({"showLink": False, "linkText": False})
+
+
+def store_optimization_result(**result):
+    # The last solution survives reruns, the sections render from it on demand
+    st.session_state[OPTIMIZATION_RESULT_KEY] = result
+
+
+def get_optimization_result():
+    return st.session_state.get(OPTIMIZATION_RESULT_KEY)
+
+
+def submit_mealplan_exports(merged_df, config, spreadsheet_config, export_formats):
+    """
+    Start building the mealplan exports of a solution in the background.
+
+    Returns:
+    - list: (future, file name, mime type) of every export format, see
+      show_downloads.
+    """
+    workspace = get_session_workspace(config["session_workspace"])
+    submitted_exports = []
+    for export_format in export_formats:
+        file_name = export_file_name("mealplan", export_format)
+        future = submit_export(
+            build_mealplan_export,
+            merged_df,
+            spreadsheet_columns=spreadsheet_config["columns"],
+            output_path=workspace.path(config["output_path"]),
+            meal_targets=spreadsheet_config["meal_targets"],
+            meal_compatibility=spreadsheet_config["meal_compatibility"],
+            portions=spreadsheet_config["meal_portions"],
+            export_format=export_format,
+            cache_key=export_cache_key(
+                file_name,
+                merged_df,
+                columns=spreadsheet_config["columns"],
+                meal_targets=spreadsheet_config["meal_targets"],
+                meal_compatibility=spreadsheet_config["meal_compatibility"],
+                portions=spreadsheet_config["meal_portions"],
+            ),
+        )
+        submitted_exports.append((future, file_name, export_mime(export_format)))
+    return submitted_exports
+
+
+def submit_shopping_list_exports(merged_df, config, shopping_config, export_formats):
+    workspace = get_session_workspace(config["session_workspace"])
+    # The weekly sheets are dated, so the start date is part of the export
+    start_date = datetime.combine(date.today(), time())
+    submitted_exports = []
+    for export_format in export_formats:
+        file_name = export_file_name("shopping_list", export_format)
+        future = submit_export(
+            build_shopping_list_export,
+            merged_df,
+            shopping_list_columns=shopping_config["columns"],
+            output_path=workspace.path(shopping_config["paths"]["output"]),
+            image_options=config["images"],
+            weeks=shopping_config["weeks"],
+            start_date=start_date,
+            export_format=export_format,
+            cache_key=export_cache_key(
+                file_name,
+                merged_df,
+                columns=shopping_config["columns"],
+                weeks=shopping_config["weeks"],
+                start_date=start_date.isoformat(),
+            ),
+        )
+        submitted_exports.append((future, file_name, export_mime(export_format)))
+    return submitted_exports
+
+
+def show_downloads(label, toggle_key, submitted_exports, polling):
+    # Exports still building keep their placeholder until a later run
+    building = any(not future.done() for future, _, _ in submitted_exports)
+    if st.toggle(label, key=toggle_key):
+        pending_downloads = [
+            create_pending_download(future, file_name, mime)
+            for future, file_name, mime in submitted_exports
+        ]
+        attach_ready_downloads(pending_downloads)
+    if polling and not building:
+        # Every export is shown, the page reruns the section without polling
+        st.rerun()
+
+
+@fragment
+def downloads_section(label, toggle_key, submitted_exports):
+    show_downloads(label, toggle_key, submitted_exports, polling=False)
+
+
+@fragment(run_every=EXPORT_POLL_INTERVAL)
+def polling_downloads_section(label, toggle_key, submitted_exports):
+    show_downloads(label, toggle_key, submitted_exports, polling=True)
+
+
+def exports_section(label, toggle_key, submitted_exports):
+    """
+    Show the download buttons of submitted exports once the toggle is on.
+
+    Never waits for an export, the section polls only while one of them is
+    still being built.
+    """
+    if all(future.done() for future, _, _ in submitted_exports):
+        downloads_section(label, toggle_key, submitted_exports)
+    else:
+        polling_downloads_section(label, toggle_key, submitted_exports)
+
+
+@fragment
+def mealplan_section(result, df, config):
+    if not st.toggle("Your Optimized Daily Food Plan", key="show_mealplan_section"):
+        return
+    mealplan_df = create_meaplan_from_optimizer_results(
+        df,
+        result["flat_column_normalized_result_df"],
+        result["optimization_unit_size"],
+        directory=get_session_workspace(config["session_workspace"]).path(
+            config["mealplan_path"]
+        ),
+        streamlit_mealplan_columns=config["streamlit_mealplan_columns"],
+        image_options=config["images"],
+        merged_df=result["merged_df"],
+    )
+    display_mealplan_in_streamlit(mealplan_df)
+
+
+def plotly_chart_from_json(figure_json):
+    # st.plotly_chart validates and serializes the figure again on every run,
+    # even a cached one, so the chart message is filled from the cached JSON
+    proto = PlotlyChartProto()
+    proto.figure.spec = figure_json
+    proto.figure.config = PLOTLY_CHART_CONFIG
+    proto.theme = "streamlit"
+    st._main._enqueue("plotly_chart", proto)
+
+
+@fragment
+def nutritional_breakdown_section(result):
+    if not st.toggle("Nutritional Breakdown", key="show_breakdown_section"):
+        return
+    for build_figure in [
+        create_absolute_summed_macronutrient_figure,
+        create_normalized_summed_micronutrient_figure,
+    ]:
+        figure_json = cached_figure(
+            build_figure, result["result_hash"], result["contributions"]
+        )
+        plotly_chart_from_json(figure_json)
+
+
+@fragment
+def detailed_breakdown_section(result, max_foods):
+    if not st.toggle(
+        "Fully Detailed Nutritional Breakdown", key="show_detailed_breakdown_section"
+    ):
+        return
+    for build_figure in [
+        create_absolute_stacked_macronutrient_figure,
+        create_normalized_stacked_micronutrient_figure,
+    ]:
+        figure_json = cached_figure(
+            build_figure,
+            result["result_hash"],
+            result["contributions"],
+            max_foods=max_foods,
+        )
+        plotly_chart_from_json(figure_json)
+
+
+def spreadsheet_section(submitted_exports):
+    # The exports were submitted with the solution, see submit_mealplan_exports
+    exports_section(
+        "Mealplan Spreadsheet", "show_spreadsheet_section", submitted_exports
+    )
+
+
+def shopping_list_section(submitted_exports):
+    exports_section("Shopping List", "show_shopping_list_section", submitted_exports)
@@ -0,0 +1,24 @@
+import streamlit as st
+
+from src.utils.workspace import Workspace, remove_stale_workspaces
+
+WORKSPACE_KEY = "workspace"
+
+
+def get_session_workspace(workspace_config):
+    """
+    The workspace of the current session, created on its first rerun.
+
+    The workspace is removed with the session state, workspaces left behind
+    by a crashed process are removed after max_age_hours.
+    """
+    workspace = st.session_state.get(WORKSPACE_KEY)
+    if workspace is None:
+        remove_stale_workspaces(
+            workspace_config["root"], workspace_config["max_age_hours"] * 3600
+        )
+        workspace = Workspace(
+            workspace_config["root"], write_files=workspace_config["write_files"]
+        )
+        st.session_state[WORKSPACE_KEY] = workspace
+    return workspace
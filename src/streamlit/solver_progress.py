@@ -0,0 +1,91 @@
+import streamlit as st
+
+from src.nutrition.solver_jobs import BUILDING, QUEUED
+from src.streamlit.result_sections import fragment
+
+SOLVER_JOB_KEY = "solver_job"
+PROGRESS_INTERVAL = 1  # seconds between two progress updates
+
+
+def format_progress_value(value, fmt):
+    return "-" if value is None else fmt.format(value)
+
+
+@fragment(run_every=PROGRESS_INTERVAL)
+def solver_progress_section(job):
+    """
+    Show the progress of a running solver job with a cancel button.
+
+    Only this fragment reruns while the solver works, the page is rerun once
+    the job is done so the results can be rendered.
+    """
+    if job.done():
+        st.rerun()
+
+    progress = job.progress
+    if progress["state"] == QUEUED:
+        st.info("Waiting for a free solver ...")
+    elif progress["state"] == BUILDING:
+        st.info("Building the optimization model ...")
+    else:
+        st.info("Searching for the optimal mealplan ...")
+
+    col_1, col_2, col_3, col_4 = st.columns(4)
+    col_1.metric(
+        "Model Size",
+        f"{progress['rows']} x {progress['columns']}" if "rows" in progress else "-",
+        help="Constraints x foods",
+    )
+    col_2.metric(
+        "Elapsed", format_progress_value(progress.get("elapsed"), "{:.0f} s")
+    )
+    col_3.metric(
+        "Best Objective", format_progress_value(progress.get("incumbent"), "{:.1f}")
+    )
+    col_4.metric(
+        "Gap",
+        format_progress_value(progress.get("gap"), "{:.2%}"),
+        help="Distance of the best mealplan found so far to the best possible one",
+    )
+
+    if st.button("Cancel Optimization"):
+        job.cancel()
+        st.rerun()
+
+
+def finished_solver_result(job):
+    """
+    Report how a finished solver job ended.
+
+    Returns:
+    - dict: The job result if it found a mealplan, None otherwise.
+    """
+    try:
+        result = job.result()
+    except Exception as e:
+        st.error(f"The optimization failed: {e}")
+        return None
+
+    if result is None:
+        st.warning("The optimization was cancelled.")
+        return None
+    if result["status"] == "Not Solved":
+        st.warning(
+            f"No mealplan was found within the time limit of {job.time_limit} seconds."
+        )
+        return None
+    if result["status"] != "Optimal":
+        st.error(
+            "Your desired constraints are impossible to satisfy. "
+            "Please relax the constraints and try again."
+        )
+        return None
+
+    if result["solution_status"] != "Optimal Solution Found":
+        st.warning(
+            "The solver time limit was reached, this is the best mealplan found "
+            f"within {job.time_limit} seconds."
+        )
+    else:
+        st.write("Optimization completed successfully!")
+    return result
@@ -0,0 +1,29 @@
+import hashlib
+import json
+
+import pandas as pd
+
+
+def hash_dataframe(df):
+    # Content hash of the values, index and column names of a DataFrame
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def hash_values(*values):
+    """
+    Stable hash of json-like values, e.g. config dictionaries.
+
+    DataFrames are replaced by their content hash, other values that are not
+    json serializable by their string representation.
+    """
+
+    def default(value):
+        if isinstance(value, pd.DataFrame):
+            return hash_dataframe(value)
+        return str(value)
+
+    serialized = json.dumps(values, sort_keys=True, default=default)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """
+    Thread-safe least recently used cache bounded by entry count and size.
+
+    Parameters:
+    - max_entries (int): Maximum number of entries, None for no limit.
+    - max_bytes (int): Maximum summed size of the entries, None for no limit.
+    - sizeof (callable): Size of a value in bytes, used for max_bytes.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            # Values that could never fit would only flush the whole cache
+            if self.max_bytes is not None and size > self.max_bytes:
+                self._remove(key)
+                return
+
+            self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def _remove(self, key):
+        if key in self._entries:
+            del self._entries[key]
+            self._total_bytes -= self._sizes.pop(key)
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
@@ -0,0 +1,219 @@
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Spans beyond this are dropped, e.g. of a trace that stays current while a
+# fragment polls
+MAX_SPANS = 1000
+
+logger = logging.getLogger("mealplan.tracing")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """
+    The timed spans of one request, e.g. a rerun of a page or a solver job.
+
+    Spans can be added from several threads, a background job adds its spans
+    after activating the trace with use_trace.
+
+    Parameters:
+    - name (str): Name of the request.
+    - attributes: Written to the JSON logs of the trace.
+    """
+
+    def __init__(self, name, **attributes):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self._span_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def next_span_id(self):
+        with self._lock:
+            return next(self._span_ids)
+
+    def add_span(self, span):
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def start_trace(name, **attributes):
+    """
+    Start a trace and make it the current one of this thread, the spans
+    opened until end_trace belong to it.
+
+    Returns:
+    - Trace: The new trace.
+    """
+    trace = Trace(name, **attributes)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def end_trace(trace):
+    if trace.end is not None:
+        return
+    trace.end = time.perf_counter()
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    if logger.isEnabledFor(logging.INFO):
+        log_event(
+            "trace",
+            trace_id=trace.id,
+            trace=trace.name,
+            duration_ms=round(trace.duration * 1000, 3),
+            spans=len(trace.spans),
+            **trace.attributes,
+        )
+
+
+@contextmanager
+def use_trace(trace):
+    # Make a trace created elsewhere current, e.g. in a worker thread
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def run_in_trace(trace, function, *args, **kwargs):
+    # Run a background job in its own trace, which ends with the job
+    with use_trace(trace):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end_trace(trace)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span of the current trace, nested in the enclosing
+    span. Without a current trace nothing is recorded.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    span_id = trace.next_span_id()
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        record = {
+            "id": span_id,
+            "parent": parent_id,
+            "name": name,
+            "start": start,
+            "end": end,
+            "thread": threading.current_thread().name,
+            "attributes": attributes,
+        }
+        trace.add_span(record)
+        if logger.isEnabledFor(logging.INFO):
+            log_event(
+                "span",
+                trace_id=trace.id,
+                trace=trace.name,
+                span_id=span_id,
+                parent_id=parent_id,
+                name=name,
+                start_ms=round((start - trace.start) * 1000, 3),
+                duration_ms=round((end - start) * 1000, 3),
+                thread=record["thread"],
+                **attributes,
+            )
+
+
+def traced(name=None):
+    """
+    Decorator recording every call of a function as a span, named after the
+    function unless a name is given.
+    """
+
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def log_event(event, **fields):
+    logger.info(json.dumps(dict(event=event, **fields), default=str))
+
+
+def configure_json_logs(enabled, stream=None):
+    """
+    Write every finished span and trace as one JSON line, to stderr by
+    default. Without it the spans are only kept for the debug panel.
+    """
+    if not enabled:
+        logger.setLevel(logging.WARNING)
+        return
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+
+def waterfall_rows(trace):
+    """
+    The spans of a trace in start order, for a waterfall view.
+
+    Returns:
+    - list: Dicts with the span name, its nesting depth and its start offset
+      and duration in seconds. Offsets are relative to the trace start.
+    """
+    spans = sorted(trace.spans, key=lambda span: span["start"])
+    depths = {}
+    rows = []
+    for span_record in spans:
+        depth = depths.get(span_record["parent"], -1) + 1
+        depths[span_record["id"]] = depth
+        rows.append(
+            {
+                "name": span_record["name"],
+                "depth": depth,
+                "offset": span_record["start"] - trace.start,
+                "duration": span_record["end"] - span_record["start"],
+            }
+        )
+    return rows
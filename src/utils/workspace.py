@@ -0,0 +1,56 @@
+import os
+import shutil
+import time
+import uuid
+import weakref
+
+DEFAULT_WORKSPACE_ROOT = "output/sessions"
+
+
+class Workspace:
+    """
+    Output directory of one session or request, so concurrent sessions never
+    read or overwrite each other's files.
+
+    Results are passed around in memory, files are only written for
+    inspection if write_files is set. The directory is removed by cleanup or
+    once the workspace is garbage collected, e.g. when its session ends.
+
+    Parameters:
+    - root (str): Directory holding the workspaces of all sessions.
+    - write_files (bool): Whether path returns paths to write to.
+    """
+
+    def __init__(self, root=DEFAULT_WORKSPACE_ROOT, write_files=False):
+        self.id = uuid.uuid4().hex
+        self.directory = os.path.join(root, self.id)
+        self.write_files = write_files
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, self.directory, ignore_errors=True
+        )
+
+    def path(self, relative_path):
+        """
+        Returns:
+        - str: The path inside the workspace, None if no files are written
+          so the caller skips the write.
+        """
+        if not self.write_files:
+            return None
+        return os.path.join(self.directory, relative_path)
+
+    def cleanup(self):
+        self._finalizer()
+
+
+def remove_stale_workspaces(root=DEFAULT_WORKSPACE_ROOT, max_age_seconds=24 * 3600):
+    # Workspaces of processes that ended without cleaning up
+    if not os.path.isdir(root):
+        return
+    now = time.time()
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            continue
+        if now - os.path.getmtime(directory) > max_age_seconds:
+            shutil.rmtree(directory, ignore_errors=True)
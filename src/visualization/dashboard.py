@@ -1,11 +1,14 @@
 import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
+from src.utils.tracing import traced
+
+# plotly takes longer to import than the rest of the app, it is imported by
+# the figure functions so sessions that show no chart never load it
 
 
 def visualize_optimization_result_nutrient_breakdown(results_df):
+    import plotly.express as px
+
     macro_df = pd.concat(
         [
             results_df[["Macronutrient"]],
@@ -70,6 +73,8 @@ def visualize_optimization_result_nutrient_breakdown(results_df):
 
 
 def visualize_polar_chart(df, names):
+    import plotly.graph_objects as go
+
     macro_df = df.copy()
     macro_df.columns = macro_df.columns.get_level_values(1)
     macro_df = macro_df[
@@ -134,6 +139,8 @@ def visualize_polar_chart(df, names):
 
 
 def visualize_micronutrient_polar_chart(relative_df, names):
+    import plotly.graph_objects as go
+
     macro_df = relative_df.copy()
     macro_df.columns = macro_df.columns.get_level_values(1)
     macro_df = macro_df[["FDC Name"] + relative_df["Micronutrient"].columns.to_list()]
@@ -182,69 +189,334 @@ def visualize_micronutrient_polar_chart(relative_df, names):
     return fig
 
 
-def nutrition_scatter_plot(df, x_col, y_col, z_col, title, delimiter=", "):
+def solver_telemetry_figure(telemetry_df, column, outliers_df):
+    """
+    A telemetry column of every recorded solve over time, colored by the
+    solver status, with the outliers circled.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for status, status_df in telemetry_df.groupby("status"):
+        fig.add_trace(
+            go.Scattergl(
+                x=status_df["recorded_at"],
+                y=status_df[column],
+                mode="markers",
+                name=status,
+                customdata=status_df[["source", "input_hash", "nodes"]],
+                hovertemplate=(
+                    "%{y:.3f}<br>%{customdata[0]}, input %{customdata[1]}"
+                    "<br>%{customdata[2]} nodes<extra></extra>"
+                ),
+            )
+        )
+    fig.add_trace(
+        go.Scattergl(
+            x=outliers_df["recorded_at"],
+            y=outliers_df[column],
+            mode="markers",
+            name="Outlier",
+            marker=dict(
+                size=14, color="rgba(0,0,0,0)", line=dict(width=2, color="red")
+            ),
+            hoverinfo="skip",
+        )
+    )
+    fig.update_layout(xaxis_title="Recorded at", yaxis_title=column)
+    return fig
+
+
+DEFAULT_MAX_SCATTER_POINTS = 20000
+DEFAULT_SCATTER_BINS = 150
+
+
+def aggregate_scatter_points(x, y, z, bins=DEFAULT_SCATTER_BINS):
+    """
+    Aggregate points into a bins x bins grid over the x and y range.
+
+    Returns:
+    - tuple: Centroid x and y, mean z and point count of every occupied cell.
+    """
+
+    def bin_index(values):
+        low, high = values.min(), values.max()
+        span = high - low if high > low else 1.0
+        return np.minimum(((values - low) / span * bins).astype(int), bins - 1)
+
+    cells = bin_index(x) * bins + bin_index(y)
+    counts = np.bincount(cells, minlength=bins * bins)
+    occupied = counts > 0
+    counts = counts[occupied]
+
+    def cell_mean(values):
+        return np.bincount(cells, weights=values, minlength=bins * bins)[occupied] / counts
+
+    return cell_mean(x), cell_mean(y), cell_mean(z), counts
+
+
+@traced()
+def nutrition_scatter_plot(
+    df,
+    x_col,
+    y_col,
+    z_col,
+    title,
+    delimiter=", ",
+    max_points=DEFAULT_MAX_SCATTER_POINTS,
+    bins=DEFAULT_SCATTER_BINS,
+    mask=None,
+):
+    """
+    WebGL scatter plot of two catalog columns colored by a third.
+
+    Only the three plotted columns and the food names are read from df.
+    Above max_points the points are aggregated into a bins x bins grid, each
+    marker then shows the mean color value and the number of foods of a cell.
+
+    Parameters:
+    - x_col, y_col, z_col (tuple): MultiIndex columns to plot.
+    - mask (np.ndarray): Optional boolean filter over the rows of df.
+    """
+    import plotly.graph_objects as go
+
     x_col_str = delimiter.join(x_col).strip()
     y_col_str = delimiter.join(y_col).strip()
     z_col_str = delimiter.join(z_col).strip()
 
-    plotly_df = df.copy()
-    plotly_df.columns = [", ".join(col).strip() for col in df.columns.values]
-    fig = px.scatter(
-        plotly_df,
-        x=x_col_str,
-        y=y_col_str,
-        color=z_col_str,
-        color_continuous_scale=px.colors.sequential.Viridis,
-        hover_name="Non Nutrient Data, FDC Name",
-        hover_data={x_col_str: True, y_col_str: True},
-        labels={x_col_str: x_col_str, y_col_str: y_col_str},
-        title=title,
-    )
+    x = df[x_col].to_numpy(dtype=float)
+    y = df[y_col].to_numpy(dtype=float)
+    z = df[z_col].to_numpy(dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+    if mask is not None:
+        keep &= mask
+    x, y, z = x[keep], y[keep], z[keep]
+
+    colorbar = dict(title=z_col_str)
+    if len(x) <= max_points:
+        names = df[("Non Nutrient Data", "FDC Name")].to_numpy()[keep]
+        trace = go.Scattergl(
+            x=x,
+            y=y,
+            mode="markers",
+            hovertext=names,
+            marker=dict(
+                color=z, colorscale="Viridis", colorbar=colorbar, size=6, opacity=0.8
+            ),
+            hovertemplate=(
+                f"<b>%{{hovertext}}</b><br>{x_col_str}: %{{x:.2f}}<br>"
+                f"{y_col_str}: %{{y:.2f}}<br>{z_col_str}: %{{marker.color:.2f}}"
+                "<extra></extra>"
+            ),
+        )
+        subtitle = f"{len(x)} foods"
+    else:
+        x_mean, y_mean, z_mean, counts = aggregate_scatter_points(x, y, z, bins=bins)
+        trace = go.Scattergl(
+            x=x_mean,
+            y=y_mean,
+            mode="markers",
+            customdata=counts,
+            marker=dict(
+                color=z_mean,
+                colorscale="Viridis",
+                colorbar=colorbar,
+                # Marker area grows with the number of foods in the cell
+                size=4 + 2 * np.log2(counts),
+                opacity=0.8,
+            ),
+            hovertemplate=(
+                f"%{{customdata}} foods<br>{x_col_str}: %{{x:.2f}}<br>"
+                f"{y_col_str}: %{{y:.2f}}<br>mean {z_col_str}: %{{marker.color:.2f}}"
+                "<extra></extra>"
+            ),
+        )
+        subtitle = f"{len(x)} foods in {len(counts)} cells, narrow the filter to see single foods"
 
+    fig = go.Figure(trace)
+    fig.update_layout(
+        title=f"{title} ({subtitle})",
+        xaxis_title=x_col_str,
+        yaxis_title=y_col_str,
+    )
     return fig
 
 
-def create_normalized_summed_micronutrient_figure(
-    absolute_raw_output_path, normalized_raw_output_path
-):
-    # Load your data
-    df_abs = pd.read_csv(absolute_raw_output_path)
-    df_abs.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_abs.columns]
-    )
-    df_abs_micro = df_abs["Micronutrient"].sum().to_frame().T
-
-    df_norm = pd.read_csv(normalized_raw_output_path)
-    df_norm.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_norm.columns]
-    )
-    df_norm_micro = df_norm["Micronutrient"].sum().to_frame().T
-
-    # Define categories for micronutrients
-    micronutrient_categories = {
-        "Vitamins": [
-            "Vitamin A [UG]",
-            "Vitamin B-12 [UG]",
-            "Vitamin B-6 [MG]",
-            "Vitamin C [MG]",
-            "Vitamin E [MG]",
-            "Vitamin K [UG]",
-        ],
-        "Minerals": [
-            "Calcium [MG]",
-            "Copper [MG]",
-            "Iron [MG]",
-            "Magnesium [MG]",
-            "Manganese [MG]",
-            "Phosphorus [MG]",
-            "Potassium [MG]",
-            "Selenium [UG]",
-            "Sodium [MG]",
-            "Zinc [MG]",
-        ],
-        "Other Micronutrients": ["Choline [MG]", "Folate [UG]", "Niacin [MG]"],
+# Nutrients shown per subplot of the dashboard figures
+MICRONUTRIENT_CATEGORIES = {
+    "Vitamins": [
+        "Vitamin A [UG]",
+        "Vitamin B-12 [UG]",
+        "Vitamin B-6 [MG]",
+        "Vitamin C [MG]",
+        "Vitamin E [MG]",
+        "Vitamin K [UG]",
+    ],
+    "Minerals": [
+        "Calcium [MG]",
+        "Copper [MG]",
+        "Iron [MG]",
+        "Magnesium [MG]",
+        "Manganese [MG]",
+        "Phosphorus [MG]",
+        "Potassium [MG]",
+        "Selenium [UG]",
+        "Sodium [MG]",
+        "Zinc [MG]",
+    ],
+    "Other Micronutrients": ["Choline [MG]", "Folate [UG]", "Niacin [MG]"],
+}
+
+MACRONUTRIENT_CATEGORIES = {
+    "Macronutrients": ["Carbohydrate [G]", "Total Fat [G]", "Protein [G]"],
+    "Fiber": ["Fiber [G]"],
+}
+
+
+def _nutrient_group(results_df, group):
+    # Columns of one group, from flat "Group.Name" or (Group, Name) columns
+    columns = [
+        col
+        for col in results_df.columns
+        if (col[0] if isinstance(col, tuple) else col.split(".")[0]) == group
+    ]
+    nutrients = results_df[columns]
+    nutrients.columns = [
+        col[1] if isinstance(col, tuple) else col.split(".", 1)[1] for col in columns
+    ]
+    return nutrients.reset_index(drop=True).astype(float)
+
+
+@traced()
+def aggregate_nutrient_contributions(absolute_results_df, normalized_results_df):
+    """
+    Compute the per-food and total nutrient matrices of a solution once, all
+    dashboard figures are assembled from this aggregate.
+
+    Parameters:
+    - absolute_results_df (pd.DataFrame): Absolute nutrients per food, with
+      flat "Group.Name" or (Group, Name) columns.
+    - normalized_results_df (pd.DataFrame): The same foods in % of the RDI.
+
+    Returns:
+    - dict: Food names, the per-food macro and micro matrices (foods x
+      nutrients) and their totals.
+    """
+    name_column = next(
+        col
+        for col in absolute_results_df.columns
+        if col in ("Non Nutrient Data.FDC Name", ("Non Nutrient Data", "FDC Name"))
+    )
+    food_names = absolute_results_df[name_column].astype(str).tolist()
+
+    macro_abs = _nutrient_group(absolute_results_df, "Macronutrient")
+    micro_abs = _nutrient_group(absolute_results_df, "Micronutrient")
+    micro_norm = _nutrient_group(normalized_results_df, "Micronutrient")
+    return {
+        "food_names": food_names,
+        "macro_abs": macro_abs,
+        "micro_abs": micro_abs,
+        "micro_norm": micro_norm,
+        "macro_abs_total": macro_abs.sum(),
+        "micro_abs_total": micro_abs.sum(),
+        "micro_norm_total": micro_norm.sum(),
     }
 
+
+def load_nutrient_contributions(absolute_raw_output_path, normalized_raw_output_path):
+    # Aggregate of the solution csv files written by save_optimization_results
+    return aggregate_nutrient_contributions(
+        pd.read_csv(absolute_raw_output_path), pd.read_csv(normalized_raw_output_path)
+    )
+
+
+DEFAULT_MAX_STACKED_FOODS = 12
+OTHER_FOODS_LABEL = "Other"
+OTHER_FOODS_COLOR = "lightgrey"
+
+
+def group_small_contributors(food_names, shares, values, max_foods=None):
+    """
+    Keep the foods with the largest contribution and sum the rest into one
+    "Other" row, so stacked charts have a bounded number of traces.
+
+    Parameters:
+    - food_names (list): Food name per row.
+    - shares (np.ndarray): Foods x nutrients, used to rank the foods by their
+      largest share of any nutrient.
+    - values (list of np.ndarray): Foods x nutrients matrices to group.
+    - max_foods (int): Number of foods kept, None keeps every food.
+
+    Returns:
+    - tuple: Food names and the grouped matrices, foods keep their order.
+    """
+    if max_foods is None or len(food_names) <= max_foods:
+        return list(food_names), values
+
+    kept = np.sort(np.argsort(-shares.max(axis=1), kind="stable")[:max_foods])
+    other = np.ones(len(food_names), dtype=bool)
+    other[kept] = False
+    grouped = [
+        np.vstack([matrix[kept], matrix[other].sum(axis=0, keepdims=True)])
+        for matrix in values
+    ]
+    return [food_names[idx] for idx in kept] + [OTHER_FOODS_LABEL], grouped
+
+
+def food_colors(food_names):
+    import plotly.express as px
+
+    # One color per food across all subplots, "Other" stays grey
+    palette = px.colors.qualitative.Plotly
+    return [
+        OTHER_FOODS_COLOR if name == OTHER_FOODS_LABEL else palette[idx % len(palette)]
+        for idx, name in enumerate(food_names)
+    ]
+
+
+# Attributes shared by every stacked bar, set on the traces so the bar
+# defaults of the active template are kept
+STACKED_BAR_DEFAULTS = dict(
+    orientation="h",
+    hovertemplate="%{fullData.name}<br>%{y}: %{customdata:.2f}<extra></extra>",
+)
+
+
+def add_stacked_food_traces(fig, food_names, x_values, hover_values, nutrients, row):
+    """
+    Add one bar per food to a stacked subplot. The hover text is rendered
+    from customdata by plotly.js instead of one string per bar.
+    """
+    import plotly.graph_objects as go
+
+    traces = [
+        go.Bar(
+            **STACKED_BAR_DEFAULTS,
+            x=x,
+            y=nutrients,
+            customdata=customdata,
+            name=food_name,
+            legendgroup=food_name,  # One legend entry toggles every subplot
+            showlegend=row == 1,
+            marker=dict(color=color),
+        )
+        for food_name, color, x, customdata in zip(
+            food_names, food_colors(food_names), x_values, hover_values
+        )
+    ]
+    # Adding the traces in one call validates the figure once
+    fig.add_traces(traces, rows=row, cols=1)
+
+
+@traced()
+def create_normalized_summed_micronutrient_figure(contributions):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    micronutrient_categories = MICRONUTRIENT_CATEGORIES
+    micro_norm_total = contributions["micro_norm_total"]
+    micro_abs_total = contributions["micro_abs_total"]
+
     BAR_HEIGHT = 40  # Bar height in pixels
     total_bars = sum(
         [len(nutrients) for nutrients in micronutrient_categories.values()]
@@ -265,10 +537,8 @@ def create_normalized_summed_micronutrient_figure(
 
     # Add a bar chart for each category
     for i, (category, nutrients) in enumerate(micronutrient_categories.items(), 1):
-        percentages = df_norm_micro.loc[
-            :, nutrients
-        ].values.flatten()  # Get normalized values
-        abs_values = df_abs_micro.loc[:, nutrients].values.flatten()
+        percentages = micro_norm_total[nutrients].values  # Get normalized values
+        abs_values = micro_abs_total[nutrients].values
 
         # Convert to percentage and to int
         percentages_int = (percentages).astype(
@@ -323,49 +593,26 @@ def create_normalized_summed_micronutrient_figure(
     return fig
 
 
+@traced()
 def create_normalized_stacked_micronutrient_figure(
-    absolute_raw_output_path, normalized_raw_output_path
+    contributions, max_foods=DEFAULT_MAX_STACKED_FOODS
 ):
-    # Load your data
-    df_abs = pd.read_csv(absolute_raw_output_path)
-    df_abs.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_abs.columns]
-    )
-    df_abs_micro = df_abs["Micronutrient"]  # Keep individual food contributions
-
-    df_norm = pd.read_csv(normalized_raw_output_path)
-    df_norm.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_norm.columns]
-    )
-    df_norm_micro = df_norm["Micronutrient"]  # Keep individual food contributions
-
-    # Extract food names for the legend and hovertext
-    food_names = df_abs["Non Nutrient Data"]["FDC Name"]
-
-    # Define categories for micronutrients
-    micronutrient_categories = {
-        "Vitamins": [
-            "Vitamin A [UG]",
-            "Vitamin B-12 [UG]",
-            "Vitamin B-6 [MG]",
-            "Vitamin C [MG]",
-            "Vitamin E [MG]",
-            "Vitamin K [UG]",
-        ],
-        "Minerals": [
-            "Calcium [MG]",
-            "Copper [MG]",
-            "Iron [MG]",
-            "Magnesium [MG]",
-            "Manganese [MG]",
-            "Phosphorus [MG]",
-            "Potassium [MG]",
-            "Selenium [UG]",
-            "Sodium [MG]",
-            "Zinc [MG]",
+    from plotly.subplots import make_subplots
+
+    micronutrient_categories = MICRONUTRIENT_CATEGORIES
+    nutrients = [n for category in micronutrient_categories.values() for n in category]
+
+    # Individual food contributions, small contributors are grouped into "Other"
+    food_names, (percentages_by_food, abs_values_by_food) = group_small_contributors(
+        contributions["food_names"],
+        contributions["micro_norm"][nutrients].values,
+        [
+            contributions["micro_norm"][nutrients].values,
+            contributions["micro_abs"][nutrients].values,
         ],
-        "Other Micronutrients": ["Choline [MG]", "Folate [UG]", "Niacin [MG]"],
-    }
+        max_foods=max_foods,
+    )
+    columns = {nutrient: idx for idx, nutrient in enumerate(nutrients)}
 
     BAR_HEIGHT = 40  # Bar height in pixels
     total_bars = sum(
@@ -387,34 +634,16 @@ def create_normalized_stacked_micronutrient_figure(
 
     # Add a stacked bar chart for each category
     for i, (category, nutrients) in enumerate(micronutrient_categories.items(), 1):
-        for food_idx, food in enumerate(
-            df_abs_micro.index
-        ):  # Iterate over foods to stack the bars
-            percentages = df_norm_micro.loc[
-                food, nutrients
-            ].values.flatten()  # Get normalized values for each food
-            abs_values = df_abs_micro.loc[
-                food, nutrients
-            ].values.flatten()  # Get absolute values for each food
-
-            # Use food name for the legend and hovertext
-            food_name = food_names[food_idx]
-
-            fig.add_trace(
-                go.Bar(
-                    x=percentages,  # Use normalized percentages for stacking
-                    y=nutrients,
-                    orientation="h",
-                    hoverinfo="text",  # Show hover information
-                    hovertext=[
-                        f"{food_name}: {val:.2f} mg / µg" for val in abs_values
-                    ],  # Absolute values with food names in hover
-                    name=food_name,  # Use food name from the "Non Nutrient Data.FDC Name" column
-                    showlegend=True,  # Enable legend to show food contributions
-                ),
-                row=i,
-                col=1,
-            )
+        # Stack the normalized percentages, hover shows the absolute amounts
+        idx = [columns[nutrient] for nutrient in nutrients]
+        add_stacked_food_traces(
+            fig,
+            food_names,
+            percentages_by_food[:, idx],
+            abs_values_by_food[:, idx],
+            nutrients,
+            row=i,
+        )
 
         # Add a 100% reference line
         fig.add_shape(
@@ -443,23 +672,16 @@ def create_normalized_stacked_micronutrient_figure(
     return fig
 
 
-def create_absolute_summed_macronutrient_figure(absolute_raw_output_path):
-    # Read and structure absolute data
-    df_abs = pd.read_csv(absolute_raw_output_path)
-    df_abs = df_abs.apply(
-        lambda col: col.astype("int") if pd.api.types.is_numeric_dtype(col) else col
-    )
-    df_abs.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_abs.columns]
-    )
+@traced()
+def create_absolute_summed_macronutrient_figure(contributions):
+    import plotly.graph_objects as go
 
-    df_abs_micro = df_abs["Micronutrient"].sum().to_frame().T
-    df_abs_macro = df_abs["Macronutrient"].sum().to_frame().T
+    macro_abs_total = contributions["macro_abs_total"]
 
     # Get absolute values for Protein, Total Fat, and Carbohydrate
-    protein_g = df_abs_macro["Protein [G]"].values[0]
-    total_fat_g = df_abs_macro["Total Fat [G]"].values[0]
-    carbohydrate_g = df_abs_macro["Carbohydrate [G]"].values[0]
+    protein_g = int(macro_abs_total["Protein [G]"])
+    total_fat_g = int(macro_abs_total["Total Fat [G]"])
+    carbohydrate_g = int(macro_abs_total["Carbohydrate [G]"])
 
     # Calculate kcalories
     protein_kcal = protein_g * 4
@@ -531,24 +753,25 @@ def create_absolute_summed_macronutrient_figure(absolute_raw_output_path):
     return fig_macro
 
 
-def create_absolute_stacked_macronutrient_figure(absolute_raw_output_path):
-    # Load your data
-    df_abs = pd.read_csv(absolute_raw_output_path)
-    df_abs.columns = pd.MultiIndex.from_tuples(
-        [tuple(c.split(".")) for c in df_abs.columns]
-    )
-    df_abs_macro = df_abs[
-        "Macronutrient"
-    ]  # Keep individual food contributions for macronutrients
+@traced()
+def create_absolute_stacked_macronutrient_figure(
+    contributions, max_foods=DEFAULT_MAX_STACKED_FOODS
+):
+    from plotly.subplots import make_subplots
 
-    # Extract food names for the legend and hovertext
-    food_names = df_abs["Non Nutrient Data"]["FDC Name"]
+    macronutrient_categories = MACRONUTRIENT_CATEGORIES
+    nutrients = [n for category in macronutrient_categories.values() for n in category]
 
-    # Define macronutrients and fiber
-    macronutrient_categories = {
-        "Macronutrients": ["Carbohydrate [G]", "Total Fat [G]", "Protein [G]"],
-        "Fiber": ["Fiber [G]"],
-    }
+    # Individual food contributions, ranked by their share of each nutrient
+    abs_values = contributions["macro_abs"][nutrients].values
+    totals = abs_values.sum(axis=0)
+    shares = np.divide(
+        abs_values, totals, out=np.zeros_like(abs_values), where=totals != 0
+    )
+    food_names, (abs_values_by_food,) = group_small_contributors(
+        contributions["food_names"], shares, [abs_values], max_foods=max_foods
+    )
+    columns = {nutrient: idx for idx, nutrient in enumerate(nutrients)}
 
     BAR_HEIGHT = 100  # Bar height in pixels
     total_bars = sum(
@@ -570,31 +793,16 @@ def create_absolute_stacked_macronutrient_figure(absolute_raw_output_path):
 
     # Add a stacked bar chart for Macronutrients and Fiber
     for i, (category, nutrients) in enumerate(macronutrient_categories.items(), 1):
-        for food_idx, food in enumerate(
-            df_abs_macro.index
-        ):  # Iterate over foods to stack the bars
-            abs_values = df_abs_macro.loc[
-                food, nutrients
-            ].values.flatten()  # Get absolute values for each food
-
-            # Use food name for the legend and hovertext
-            food_name = food_names[food_idx]
-
-            fig.add_trace(
-                go.Bar(
-                    x=abs_values,  # Use absolute values for stacking
-                    y=nutrients,
-                    orientation="h",
-                    hoverinfo="text",  # Show hover information
-                    hovertext=[
-                        f"{food_name}: {val:.2f} g" for val in abs_values
-                    ],  # Absolute values with food names in hover
-                    name=food_name,  # Use food name from the "Non Nutrient Data.FDC Name" column
-                    showlegend=True,  # Enable legend to show food contributions
-                ),
-                row=i,
-                col=1,
-            )
+        # Stack the absolute values, which are also shown on hover
+        idx = [columns[nutrient] for nutrient in nutrients]
+        add_stacked_food_traces(
+            fig,
+            food_names,
+            abs_values_by_food[:, idx],
+            abs_values_by_food[:, idx],
+            nutrients,
+            row=i,
+        )
 
         # Set y-axis title for the current subplot
         fig.update_yaxes(title_text=category, row=i, col=1)
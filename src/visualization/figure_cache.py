@@ -0,0 +1,47 @@
+from src.utils.hashing import hash_values
+from src.utils.lru_cache import BoundedCache
+
+DEFAULT_FIGURE_CACHE_BYTES = 32 * 1024 * 1024
+DEFAULT_FIGURE_CACHE_ENTRIES = 256
+
+# Serialized figures by result hash, shared by all sessions of the process
+_figure_cache = None
+
+
+def get_figure_cache(
+    max_bytes=DEFAULT_FIGURE_CACHE_BYTES, max_entries=DEFAULT_FIGURE_CACHE_ENTRIES
+):
+    global _figure_cache
+    if _figure_cache is None:
+        _figure_cache = BoundedCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=len,
+        )
+    return _figure_cache
+
+
+def figure_cache_key(figure_name, result_hash, **layout_options):
+    return hash_values(figure_name, result_hash, layout_options)
+
+
+def cached_figure(build_figure, result_hash, data, **layout_options):
+    """
+    Build and serialize a figure once per solution and layout options.
+
+    Parameters:
+    - build_figure (callable): Figure function called as
+      build_figure(data, **layout_options).
+    - result_hash (str): Hash of the solution the data was computed from.
+    - data: Input of the figure function, e.g. the nutrient aggregate.
+
+    Returns:
+    - str: The figure as plotly JSON, see plotly_chart_from_json.
+    """
+    figure_cache = get_figure_cache()
+    key = figure_cache_key(build_figure.__name__, result_hash, **layout_options)
+    figure_json = figure_cache.get(key)
+    if figure_json is None:
+        figure_json = build_figure(data, **layout_options).to_json()
+        figure_cache.put(key, figure_json)
+    return figure_json
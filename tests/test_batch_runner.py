@@ -0,0 +1,50 @@
+import json
+
+from src.service.batch_runner import read_profiles, run_batch
+
+DATA_PATH = "data/nutrition_data.csv"
+
+
+def test_profiles_sharing_a_name_get_unique_names(tmp_path):
+    path = tmp_path / "profiles.jsonl"
+    profiles = [
+        {"name": "anna", "weight": 60},
+        {"name": "anna", "weight": 65},
+        {"name": "anna_2"},
+        {"name": "anna?"},
+        {"name": "anna!"},
+        {},
+    ]
+    path.write_text("\n".join(json.dumps(profile) for profile in profiles))
+
+    named_profiles = read_profiles(str(path))
+
+    assert [name for name, _ in named_profiles] == [
+        "anna",
+        "anna_2",
+        "anna_2_2",
+        "anna_",
+        "anna__2",
+        "profile_6",
+    ]
+    assert named_profiles[1][1] == {"weight": 65}
+
+
+def test_invalid_json_lines_are_reported_as_errors(tmp_path):
+    path = tmp_path / "profiles.jsonl"
+    path.write_text(
+        '{"name": "broken", "weight": \n'
+        '{"name": "valid", "cost_factor": 1, "time_factor": 0}\n'
+    )
+
+    summary_df = run_batch(
+        read_profiles(str(path)),
+        DATA_PATH,
+        str(tmp_path / "batch"),
+        workers=1,
+        time_limit=30,
+    )
+
+    assert summary_df["name"].tolist() == ["profile_1", "valid"]
+    assert summary_df["status"].tolist() == ["Error", "Optimal"]
+    assert summary_df["error"][0].startswith("Invalid JSON")
@@ -0,0 +1,39 @@
+import sys
+import time
+from concurrent.futures import Future
+
+from src.sheets import export_formats, export_jobs
+from src.sheets.export_formats import available_export_formats
+
+
+def test_formats_with_a_missing_package_are_hidden(monkeypatch):
+    # A None entry in sys.modules makes the import fail
+    monkeypatch.setitem(sys.modules, "xlsxwriter", None)
+    export_formats.export_format_available.cache_clear()
+    try:
+        assert available_export_formats(["xlsx", "json", "xlsx_fast"]) == [
+            "xlsx",
+            "json",
+        ]
+    finally:
+        export_formats.export_format_available.cache_clear()
+
+
+def test_cached_exports_are_marked(monkeypatch):
+    monkeypatch.setattr(export_jobs, "_export_cache", None)
+    monkeypatch.setattr(export_jobs, "_export_executor", None)
+
+    def build_export(value):
+        return value
+
+    first = export_jobs.submit_export(build_export, b"data", cache_key="key").result()
+    # The result is cached by a done callback right after the build
+    deadline = time.monotonic() + 5
+    while export_jobs.get_export_cache().get("key") is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    second = export_jobs.submit_export(build_export, b"data", cache_key="key")
+
+    assert not first.get("cached")
+    assert isinstance(second, Future)
+    assert second.result()["cached"] and second.result()["data"] == b"data"
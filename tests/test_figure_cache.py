@@ -0,0 +1,23 @@
+import json
+
+import plotly.graph_objects as go
+
+from src.visualization import figure_cache
+from src.visualization.figure_cache import cached_figure
+
+
+def test_figures_are_built_once_per_result(monkeypatch):
+    monkeypatch.setattr(figure_cache, "_figure_cache", None)
+    calls = []
+
+    def build_figure(data, max_foods=None):
+        calls.append(max_foods)
+        return go.Figure(go.Bar(x=data, y=list(range(len(data)))))
+
+    first = cached_figure(build_figure, "result", [1.0, 2.0], max_foods=5)
+    second = cached_figure(build_figure, "result", [1.0, 2.0], max_foods=5)
+    cached_figure(build_figure, "result", [1.0, 2.0], max_foods=10)
+
+    assert first is second
+    assert calls == [5, 10]
+    assert json.loads(first)["data"][0]["x"] == [1.0, 2.0]
@@ -0,0 +1,35 @@
+import os
+
+from src.images.cache import (
+    evict_cached_thumbnails,
+    read_cached_thumbnail,
+    thumbnail_path,
+    write_cached_thumbnails,
+)
+
+
+def test_eviction_keeps_temporary_files_of_other_sessions(tmp_path):
+    cache_dir = str(tmp_path)
+    write_cached_thumbnails(cache_dir, "https://example.invalid/a.jpg", {"ui": b"a"})
+    tmp_file = thumbnail_path(cache_dir, "https://example.invalid/b.jpg", "ui")
+    tmp_file += ".0123456789abcdef.tmp"
+    os.makedirs(os.path.dirname(tmp_file), exist_ok=True)
+    with open(tmp_file, "wb") as f:
+        f.write(b"partially written")
+
+    evict_cached_thumbnails(cache_dir, max_cache_bytes=0)
+
+    assert os.path.exists(tmp_file)
+    assert read_cached_thumbnail(cache_dir, "https://example.invalid/a.jpg", "ui") is None
+
+
+def test_write_survives_a_removed_temporary_file(tmp_path, monkeypatch):
+    # An eviction of another session removing the file before it is renamed
+    def replace(src, dst):
+        os.remove(src)
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(os, "replace", replace)
+    write_cached_thumbnails(str(tmp_path), "https://example.invalid/a.jpg", {"ui": b"a"})
+
+    assert read_cached_thumbnail(str(tmp_path), "https://example.invalid/a.jpg", "ui") is None
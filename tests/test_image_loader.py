@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.images.loader import fetch_image_contents
+
+SLOW_SECONDS = 2
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    # /image/<name> serves the name as the image bytes, /slow answers after
+    # SLOW_SECONDS and every other path fails
+    def do_GET(self):
+        self.server.requests[self.path] += 1
+        if self.path.startswith("/image/"):
+            body = self.path[len("/image/") :].encode()
+        elif self.path == "/slow":
+            time.sleep(SLOW_SECONDS)
+            body = b"slow"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    server.requests = Counter()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_duplicate_urls_are_downloaded_once(image_server):
+    urls = [url(image_server, path) for path in ["/image/a", "/image/b", "/image/a"]]
+
+    contents = fetch_image_contents(urls, max_workers=4)
+
+    assert contents == [b"a", b"b", b"a"]
+    assert image_server.requests == Counter({"/image/a": 1, "/image/b": 1})
+
+
+def test_failing_and_missing_urls_return_none(image_server):
+    urls = [url(image_server, "/image/a"), url(image_server, "/missing"), None, ""]
+
+    contents = fetch_image_contents(urls)
+
+    assert contents == [b"a", None, None, None]
+
+
+def test_timeout_returns_none_without_blocking_the_others(image_server):
+    urls = [url(image_server, "/slow"), url(image_server, "/image/a")]
+
+    start = time.perf_counter()
+    contents = fetch_image_contents(urls, timeout=(1, 0.2), max_workers=2)
+
+    assert contents == [None, b"a"]
+    assert time.perf_counter() - start < SLOW_SECONDS
@@ -0,0 +1,72 @@
+import pandas as pd
+import yaml
+
+from src.nutrition.meal_assignment import assign_meal_times
+from src.sheets.mealplan_spreadsheet import create_mealplan_spreadsheet
+
+SPREADSHEET_COLUMNS = [
+    "Non Nutrient Data.FDC Name",
+    "Energy.Energy [KCAL]",
+    "Macronutrient.Carbohydrate [G]",
+    "Macronutrient.Protein [G]",
+    "Macronutrient.Total Fat [G]",
+]
+MEAL_TARGETS = {
+    "Breakfast": {"KCAL": 0.25, "C (g)": 0.25, "P (g)": 0.25, "F (g)": 0.25},
+    "Lunch": {"KCAL": 0.3, "C (g)": 0.3, "P (g)": 0.3, "F (g)": 0.3},
+    "Snack": {"KCAL": 0.15, "C (g)": 0.15, "P (g)": 0.15, "F (g)": 0.15},
+    "Dinner": {"KCAL": 0.3, "C (g)": 0.3, "P (g)": 0.3, "F (g)": 0.3},
+}
+
+
+def optimization_result(n_foods=8):
+    return pd.DataFrame(
+        {
+            "Non Nutrient Data.FDC Name": [f"Food {i}" for i in range(n_foods)],
+            "Non Nutrient Data.Food Category": ["Breakfast Cereals"]
+            + [None] * (n_foods - 1),
+            "Energy.Energy [KCAL]": [300.0 + 50 * i for i in range(n_foods)],
+            "Macronutrient.Carbohydrate [G]": [40.0 - 3 * i for i in range(n_foods)],
+            "Macronutrient.Protein [G]": [10.0 + 2 * i for i in range(n_foods)],
+            "Macronutrient.Total Fat [G]": [5.0 + i for i in range(n_foods)],
+        }
+    )
+
+
+def test_every_food_is_fully_assigned_to_compatible_meals():
+    with open("config/spreadsheet_config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    df = optimization_result()[SPREADSHEET_COLUMNS]
+    df.columns = ["Food", "KCAL", "C (g)", "P (g)", "F (g)"]
+
+    assigned_df = assign_meal_times(
+        df,
+        config["meal_targets"],
+        meal_compatibility=config["meal_compatibility"],
+        categories=optimization_result()["Non Nutrient Data.Food Category"],
+        portions=config["meal_portions"],
+    )
+
+    totals = assigned_df.groupby("Food")["KCAL"].sum()
+    pd.testing.assert_series_equal(totals, df.set_index("Food")["KCAL"])
+    assert set(assigned_df["Meal Time"]) <= set(config["meal_targets"])
+    assert set(assigned_df.loc[assigned_df["Food"] == "Food 0", "Meal Time"]) == {
+        "Breakfast"
+    }
+
+
+def test_spreadsheet_follows_the_configured_meals():
+    wb = create_mealplan_spreadsheet(
+        optimization_result(), SPREADSHEET_COLUMNS, None, MEAL_TARGETS
+    )
+
+    validation = wb["Mealplan"].data_validations.dataValidation[0]
+    assert validation.formula1 == '"Breakfast,Lunch,Snack,Dinner"'
+
+    breakdown = wb["Meals Breakdown"]
+    titles = [cell.value for cell in breakdown[1] if cell.value]
+    assert titles == list(MEAL_TARGETS)
+    assert len(breakdown.tables) == len(MEAL_TARGETS)
+    assert "Snack" in set(
+        cell.value for row in wb["Mealplan"].iter_rows(min_row=2) for cell in row
+    )
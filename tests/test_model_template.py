@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+
+from src.nutrition.formulas import calculate_nutrient_goals
+from src.nutrition.model_template import DietModelTemplate
+from src.nutrition.optimization import build_diet_model
+from src.service.optimization_worker import load_catalog
+
+COLUMNS = [
+    ("Non Nutrient Data", "FDC Name"),
+    ("Non Nutrient Data", "Price per 100g"),
+    ("Non Nutrient Data", "Preparation Time"),
+    ("Non Nutrient Data", "Insulin Index"),
+    ("Non Nutrient Data", "Fullness Factor"),
+    ("Energy", "Energy [KCAL]"),
+]
+RDI_DICT = {"Energy": {"Energy [KCAL]": {"lower_bound": 2000, "upper_bound": 2500}}}
+
+
+def catalog():
+    return pd.DataFrame(
+        [
+            ["Oats", 0.2, 1, 50, 100, 380],
+            ["Milk", 0.1, 1, 90, 150, 60],
+        ],
+        columns=pd.MultiIndex.from_tuples(COLUMNS),
+    )
+
+
+def build_settings(df):
+    return dict(
+        daily_food_budget=10,
+        cost_factor=1,
+        time_factor=0,
+        insulin_factor=0,
+        fullness_factor=0,
+        df=df,
+        rdi_dict=RDI_DICT,
+        food_constraints={"Milk": [None, 2]},
+        optimization_unit_size=100,
+    )
+
+
+def test_a_build_clears_the_values_of_an_earlier_solve():
+    df = catalog()
+    template = DietModelTemplate(df, 100, RDI_DICT)
+    _, _, food_vars = template.build_model(**build_settings(df))
+    for variable in food_vars.values():
+        variable.varValue = 3
+
+    _, _, food_vars = template.build_model(**build_settings(df))
+
+    assert all(variable.varValue is None for variable in food_vars.values())
+    assert food_vars[1].upBound == 2
+    assert food_vars[0].upBound is None
+
+
+def relaxed_optimum(model):
+    # The LP relaxation solves in well under a second and compares the
+    # objective and every constraint of the two models
+    import pulp as pl
+
+    for variable in model.variables():
+        variable.cat = pl.LpContinuous
+    model.solve(pl.PULP_CBC_CMD(msg=False))
+    assert pl.LpStatus[model.status] == "Optimal"
+    return pl.value(model.objective)
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {},
+        dict(
+            daily_food_budget=15,
+            insulin_factor=1,
+            fullness_factor=1,
+            macro_tolerance=5,
+            micro_tolerance=10,
+            food_constraints={"Bananas, raw": [1, None], "Buckwheat": [None, 2]},
+        ),
+    ],
+)
+def test_template_reaches_the_optimum_of_build_diet_model(settings):
+    df = load_catalog("data/nutrition_data.csv")
+    rdi_dict = calculate_nutrient_goals(
+        weight=86, height=180, age=24, calorie_adjustment=0, activity_scale=0.5
+    )
+    settings = dict(
+        dict(
+            daily_food_budget=10,
+            cost_factor=5,
+            time_factor=3,
+            insulin_factor=0,
+            fullness_factor=0,
+            df=df,
+            rdi_dict=rdi_dict,
+            food_constraints={},
+            optimization_unit_size=1,
+        ),
+        **settings,
+    )
+
+    model, _, _ = build_diet_model(**settings)
+    template = DietModelTemplate(df, 1, rdi_dict)
+    template_model, _, _ = template.build_model(**settings)
+
+    assert relaxed_optimum(template_model) == pytest.approx(relaxed_optimum(model))
@@ -0,0 +1,28 @@
+from benchmarks.pipeline_benchmark import compare_to_baseline
+
+
+def regressed_stages(stages, baseline_stages):
+    return [
+        row["stage"]
+        for row in compare_to_baseline(stages, baseline_stages, max_ratio=1.5)
+        if row["regressed"]
+    ]
+
+
+def test_only_slowdowns_beyond_the_noise_regress():
+    baseline_stages = {
+        "fast": [0.002, 0.002, 0.002],
+        "noisy": [0.2, 0.4, 0.3],
+        "steady": [0.2, 0.21, 0.2],
+    }
+    stages = {
+        # Three times slower, but by less than the noise floor
+        "fast": [0.006, 0.006, 0.006],
+        # The median is slower by less than three times the spread
+        "noisy": [0.5, 0.3, 0.6],
+        "steady": [0.4, 0.41, 0.4],
+        "new": [1.0],
+    }
+
+    assert regressed_stages(stages, baseline_stages) == ["steady"]
+    assert regressed_stages(stages, {}) == []
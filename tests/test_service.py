@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.service import server
+from src.service.latency import LatencyHistogram
+from src.service.optimization_worker import DEFAULT_PROFILE, parse_profile
+from src.service.server import OptimizationService, create_server
+
+DATA_PATH = "data/nutrition_data.csv"
+FOOD_NAMES = {"Oats", "Milk"}
+
+
+def test_parse_profile_fills_in_the_defaults():
+    profile = parse_profile(
+        {"weight": 70, "food_constraints": {"Oats": [1, None]}}, FOOD_NAMES
+    )
+
+    assert profile == dict(
+        DEFAULT_PROFILE, weight=70, food_constraints={"Oats": [1, None]}
+    )
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        ([], "must be a JSON object"),
+        ({"height_cm": 180}, "Unknown profile fields: height_cm"),
+        ({"weight": "80"}, "weight must be a number"),
+        ({"age": True}, "age must be a number"),
+        ({"gender": "other"}, "gender must be"),
+        ({"optimization_unit_size": 0}, "optimization_unit_size must be positive"),
+        ({"food_constraints": [["Oats", 1, 2]]}, "food_constraints must map"),
+        ({"food_constraints": {"Oats": [1]}}, r"Oats must be \[min, max\]"),
+        ({"food_constraints": {"NotAFood": [0, 10]}}, "Unknown foods.*NotAFood"),
+    ],
+)
+def test_parse_profile_rejects_invalid_profiles(payload, message):
+    with pytest.raises(ValueError, match=message):
+        parse_profile(payload, FOOD_NAMES)
+
+
+def test_latency_percentiles_are_bucket_bounds():
+    histogram = LatencyHistogram(buckets_ms=[10, 100, 1000])
+    assert histogram.percentile(0.5) is None
+
+    for seconds in [0.005, 0.005, 0.05, 0.5, 5]:
+        histogram.observe(seconds)
+
+    assert histogram.percentile(0.4) == 10
+    assert histogram.percentile(0.5) == 100
+    assert histogram.percentile(0.8) == 1000
+    # The overflow bucket has no upper bound
+    assert histogram.percentile(0.99) is None
+    assert histogram.snapshot()["count"] == 5
+
+
+@pytest.fixture
+def blocking_service(monkeypatch):
+    # Workers in threads whose optimizations wait for release to be set
+    release = threading.Event()
+
+    def optimize_profile(profile, time_limit):
+        release.wait()
+        return {"status": "Optimal", "timings": {"total": 0}}
+
+    monkeypatch.setattr(server, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(server, "optimize_profile", optimize_profile)
+    service = OptimizationService(DATA_PATH, workers=1, max_queue=1)
+    service.release = release
+    yield service
+    release.set()
+    service.shutdown()
+
+
+def wait_for_in_flight(service, in_flight, timeout=5):
+    deadline = time.monotonic() + timeout
+    while service.health()["in_flight"] != in_flight:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_requests_beyond_workers_and_queue_are_rejected(blocking_service):
+    responses = []
+    threads = [
+        threading.Thread(
+            target=lambda: responses.append(blocking_service.optimize({})[0])
+        )
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for_in_flight(blocking_service, 2)
+
+    assert blocking_service.optimize({})[0] == 503
+
+    blocking_service.release.set()
+    for thread in threads:
+        thread.join()
+    assert responses == [200, 200]
+    wait_for_in_flight(blocking_service, 0)
+    assert blocking_service.optimize({})[0] == 200
+
+
+def test_requests_exceeding_the_time_limit_time_out(blocking_service, monkeypatch):
+    monkeypatch.setattr(server, "TIMEOUT_GRACE", 0)
+
+    status_code, body = blocking_service.optimize({"time_limit": 0.1})
+
+    assert status_code == 504
+    assert "0.1 seconds" in body["error"]
+    assert blocking_service.latency_metrics()["responses"] == {"504": 1}
+
+
+def test_the_time_limit_starts_when_a_worker_is_free(blocking_service, monkeypatch):
+    monkeypatch.setattr(server, "TIMEOUT_GRACE", 0)
+    running = threading.Thread(target=blocking_service.optimize, args=({},))
+    running.start()
+    wait_for_in_flight(blocking_service, 1)
+    # Free the worker after longer than the time limit of the waiting request
+    threading.Timer(0.3, blocking_service.release.set).start()
+
+    status_code, body = blocking_service.optimize({"time_limit": 0.1})
+
+    running.join()
+    assert status_code == 200
+    assert body["timings"]["queue"] >= 0.3
+
+
+def test_requests_waiting_for_a_worker_time_out(blocking_service):
+    blocking_service.request_timeout = 0.1
+    running = threading.Thread(target=blocking_service.optimize, args=({},))
+    running.start()
+    wait_for_in_flight(blocking_service, 1)
+
+    status_code, body = blocking_service.optimize({})
+
+    assert status_code == 504
+    assert "No free worker" in body["error"]
+    assert blocking_service.health()["in_flight"] == 1
+    blocking_service.release.set()
+    running.join()
+
+
+@pytest.fixture(scope="module")
+def service_url():
+    service = OptimizationService(DATA_PATH, workers=1, max_queue=1)
+    http_server = create_server(service, port=0)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{http_server.server_port}"
+    http_server.shutdown()
+    http_server.server_close()
+    service.shutdown()
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_optimize_over_http(service_url):
+    status_code, body = post_json(f"{service_url}/optimize", {"time_limit": 5})
+
+    assert status_code == 200
+    assert body["plan"] and body["totals"]["Energy"]["Energy [KCAL]"] > 0
+    assert {"goals", "build", "solve", "queue", "request"} <= set(body["timings"])
+
+    status_code, body = post_json(
+        f"{service_url}/optimize", {"food_constraints": {"NotAFood": [0, 10]}}
+    )
+    assert status_code == 400
+    assert "NotAFood" in body["error"]
+
+    with urllib.request.urlopen(f"{service_url}/metrics/latency") as response:
+        assert json.load(response)["responses"] == {"200": 1, "400": 1}
@@ -0,0 +1,93 @@
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZipFile
+
+import openpyxl
+import pytest
+from openpyxl import Workbook
+from PIL import Image
+
+from src.sheets import shared_images
+from src.sheets.shared_images import (
+    add_shared_image,
+    create_shared_image_parts,
+    save_workbook_with_shared_images,
+)
+
+REQUIREMENTS_PATH = Path(__file__).resolve().parents[1] / "requirements.txt"
+COLORS = {"red": (255, 0, 0), "green": (0, 255, 0), "blue": (0, 0, 255)}
+
+
+def encoded_image(color, size=(20, 10)):
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def build_workbook():
+    # Two sheets anchoring three distinct images, the red one twice per sheet
+    # and once through a second url with the same bytes
+    images = {name: encoded_image(color) for name, color in COLORS.items()}
+    images["red copy"] = images["red"]
+    parts = create_shared_image_parts(images)
+
+    wb = Workbook(write_only=True)
+    anchors = {
+        "Overview": ["red", "green", "blue", "red"],
+        "Week 1": ["blue", "red copy", "red"],
+    }
+    for title, names in anchors.items():
+        ws = wb.create_sheet(title=title)
+        for row_idx, name in enumerate(names, start=1):
+            ws.append([name])
+            add_shared_image(ws, parts[name], f"B{row_idx}")
+
+    output = BytesIO()
+    save_workbook_with_shared_images(wb, output)
+    return output, images, anchors
+
+
+def loaded_images(ws):
+    return {
+        (image.anchor._from.row + 1, image.anchor._from.col + 1): image._data()
+        for image in ws._images
+    }
+
+
+def test_the_pinned_openpyxl_is_supported():
+    # The writer overrides private parts of openpyxl, an upgrade must not
+    # silently fall back to one media file per anchor
+    pinned = [
+        line.split("==")[1].strip()
+        for line in REQUIREMENTS_PATH.read_text().splitlines()
+        if line.lower().startswith("openpyxl==")
+    ]
+    supported = shared_images.SUPPORTED_OPENPYXL_VERSIONS
+    assert pinned and pinned[0].startswith(supported), (
+        f"requirements.txt pins openpyxl {pinned}, shared images support {supported}"
+    )
+    assert shared_images.SHARED_IMAGES_SUPPORTED, (
+        f"openpyxl {openpyxl.__version__} is installed, shared images support "
+        f"{supported}, see requirements.txt"
+    )
+
+
+def test_every_distinct_image_is_stored_once():
+    output, _, _ = build_workbook()
+
+    media = [
+        name for name in ZipFile(output).namelist() if name.startswith("xl/media/")
+    ]
+    assert len(media) == len(COLORS)
+
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_images_round_trip_on_every_sheet(monkeypatch, supported):
+    monkeypatch.setattr(shared_images, "SHARED_IMAGES_SUPPORTED", supported)
+    output, images, anchors = build_workbook()
+
+    wb = openpyxl.load_workbook(output)
+    for title, names in anchors.items():
+        assert loaded_images(wb[title]) == {
+            (row_idx, 2): images[name] for row_idx, name in enumerate(names, start=1)
+        }
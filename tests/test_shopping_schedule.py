@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from src.sheets.shopping_schedule import compute_purchase_schedule, create_shopping_schedule
+from src.sheets.shoppinglist_spreadsheet import (
+    LEFTOVER_COLUMN,
+    create_shopping_list_sheet,
+    create_shopping_list_table,
+)
+
+COLUMNS = [
+    "Non Nutrient Data.Image URL",
+    "Shopping List.Product Name",
+    "Shopping List.Optimal Weekly Quantity (g)",
+    "Shopping List.Product Package Weight (g)",
+    "Shopping List.Average Weekly Price (EUR)",
+]
+
+
+def shopping_plan():
+    return pd.DataFrame(
+        {
+            "Non Nutrient Data.Image URL": [None, None],
+            "Shopping List.Product Name": ["Oats", "Milk"],
+            "Shopping List.Optimal Weekly Quantity (g)": [300, 1500],
+            "Shopping List.Product Package Weight (g)": [500, 1000],
+            "Shopping List.Average Weekly Price (EUR)": [0.5, 2.0],
+        }
+    )
+
+
+def test_packages_are_bought_as_late_as_possible():
+    purchases, leftover_g = compute_purchase_schedule([300, 1500], [500, 1000], weeks=3)
+
+    np.testing.assert_array_equal(purchases, [[1, 1, 0], [2, 1, 2]])
+    np.testing.assert_allclose(leftover_g, [[200, 400, 100], [500, 0, 500]])
+
+
+def test_schedule_carries_the_leftover_of_the_last_week():
+    schedule, leftover_g = create_shopping_schedule(shopping_plan(), weeks=2)
+
+    assert list(schedule.columns) == ["Week 1", "Week 2"]
+    assert leftover_g.tolist() == [400, 0]
+
+
+def test_table_and_workbook_show_the_leftover():
+    table = create_shopping_list_table(shopping_plan(), COLUMNS, weeks=2)
+    assert table[LEFTOVER_COLUMN].tolist() == [400, 0]
+
+    wb_io = create_shopping_list_sheet(
+        shopping_plan(), COLUMNS, None, weeks=2, start_date=datetime(2024, 1, 1)
+    )
+    wb = openpyxl.load_workbook(wb_io)
+    rows = list(wb["Schedule"].iter_rows(values_only=True))
+    assert rows[0] == ("Product Name", "2024-01-01", "2024-01-08", LEFTOVER_COLUMN)
+    assert rows[1:] == [("Oats", 1, 1, 400), ("Milk", 2, 1, 0)]
+
+
+def test_a_week_without_purchases_has_no_status_rules():
+    # One package of oats lasts both weeks
+    plan = shopping_plan().iloc[:1].copy()
+    plan["Shopping List.Product Package Weight (g)"] = 1000
+
+    wb_io = create_shopping_list_sheet(
+        plan, COLUMNS, None, weeks=2, start_date=datetime(2024, 1, 1)
+    )
+    wb = openpyxl.load_workbook(wb_io)
+    first_week, second_week = wb.worksheets[-2:]
+    assert [str(rule.sqref) for rule in first_week.conditional_formatting] == ["B4"]
+    assert list(second_week.conditional_formatting) == []
+    assert second_week.data_validations.dataValidation == []
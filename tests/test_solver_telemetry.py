@@ -0,0 +1,83 @@
+import pandas as pd
+
+from src.nutrition import solver_telemetry
+from src.nutrition.model_template import DietModelTemplate
+from src.nutrition.solver_jobs import SolverJob
+from src.nutrition.solver_telemetry import TelemetryStore, input_hashes
+
+COLUMNS = [
+    ("Non Nutrient Data", "FDC Name"),
+    ("Non Nutrient Data", "Price per 100g"),
+    ("Non Nutrient Data", "Preparation Time"),
+    ("Non Nutrient Data", "Insulin Index"),
+    ("Non Nutrient Data", "Fullness Factor"),
+    ("Energy", "Energy [KCAL]"),
+]
+RDI_DICT = {"Energy": {"Energy [KCAL]": {"lower_bound": 2000, "upper_bound": 2500}}}
+
+
+def catalog():
+    return pd.DataFrame(
+        [["Oats", 0.2, 1, 50, 100, 380], ["Milk", 0.1, 1, 90, 150, 60]],
+        columns=pd.MultiIndex.from_tuples(COLUMNS),
+    )
+
+
+def build_settings(df):
+    return dict(
+        daily_food_budget=10,
+        cost_factor=1,
+        time_factor=0,
+        insulin_factor=0,
+        fullness_factor=0,
+        df=df,
+        rdi_dict=RDI_DICT,
+        food_constraints={},
+        optimization_unit_size=100,
+    )
+
+
+def test_every_catalog_is_hashed_once(monkeypatch):
+    hashed = []
+
+    def hash_dataframe(df):
+        hashed.append(df)
+        return f"{len(hashed):016d}"
+
+    monkeypatch.setattr(solver_telemetry, "hash_dataframe", hash_dataframe)
+    df = catalog()
+    first = input_hashes(build_settings(df))
+    second = input_hashes(dict(build_settings(df), daily_food_budget=20))
+    other = input_hashes(build_settings(catalog()))
+
+    assert first["dataset_hash"] == second["dataset_hash"]
+    assert first["input_hash"] != second["input_hash"]
+    assert other["dataset_hash"] != first["dataset_hash"]
+    assert len(hashed) == 2
+
+
+def test_jobs_record_after_releasing_the_template_lock(tmp_path):
+    df = catalog()
+    template = DietModelTemplate(df, 100, RDI_DICT)
+    store = TelemetryStore(str(tmp_path / "telemetry.sqlite"))
+    lock_held = []
+    record = store.record
+
+    def record_and_check_lock(**values):
+        lock_held.append(template.lock.locked())
+        record(**values)
+
+    store.record = record_and_check_lock
+    job = SolverJob(
+        template.build_model,
+        lock=template.lock,
+        telemetry=store,
+        **build_settings(df),
+    ).start()
+    job.result(timeout=60)
+
+    assert lock_held == [False]
+    recorded = store.load()
+    assert recorded["status"].tolist() == ["Optimal"]
+    assert recorded["objective"].notna().all()
+    assert recorded["variables"].tolist() == [len(df)]